@@ -1,55 +1,273 @@
-from backend.services.openai_service import OpenAIService
-from backend.services.document_service import DocumentService
-from typing import List, Tuple
-import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+from backend.services.index_service import IndexService, get_index_service
+from backend.services.answer_cache import AnswerCache, CachedAnswer, normalize_question
+from backend.services.single_flight import SingleFlight, AsyncSingleFlight, AsyncStreamFlight
+from backend.services.context_assembler import ContextAssembler
+from backend.models.schemas import DocumentChunk, TokenUsage
+from backend.db.usage_writer import usage_writer
+from typing import AsyncIterator, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import os
+from backend.services.observability import UPSTREAM_TOKENS, get_logger, timed
+
+logger = get_logger(__name__)
 
 class QAChain:
-    def __init__(self):
-        self.openai_service = OpenAIService()
-        self.document_service = DocumentService()
-        self.documents: List[Tuple[str, List[float]]] = []
-        self._initialize_documents()
-    
+    def __init__(self, index_service: IndexService = None):
+        # Índice compartilhado com as rotas de documentos
+        self.index_service = index_service or get_index_service()
+        self.openai_service = self.index_service.openai_service
+        self.answer_cache = AnswerCache()
+        # Limita o contexto enviado ao modelo a CONTEXT_MAX_TOKENS
+        self.context_assembler = ContextAssembler(model=self.openai_service.chat_model)
+        # "vector", "hybrid" (vetorial + BM25, padrão) ou "lexical"
+        self.retrieval_mode = os.getenv("RETRIEVAL_MODE", "hybrid").lower()
+        if self.retrieval_mode not in ("vector", "hybrid", "lexical"):
+            raise ValueError(f"RETRIEVAL_MODE desconhecido: {self.retrieval_mode}")
+        # Acima deste tempo (em segundos) a pergunta é respondida só com a busca lexical
+        self.embedding_timeout = float(os.getenv("EMBEDDING_TIMEOUT", "10"))
+        # No caminho síncrono, o limite de tempo vale para a espera pelo embedding gerado nestas threads
+        self._embed_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("EMBEDDING_QUERY_WORKERS", "8")), thread_name_prefix="embed-query"
+        )
+        # Perguntas idênticas simultâneas compartilham uma única geração de resposta
+        self._answer_flight = SingleFlight()
+        self._async_answer_flight = AsyncSingleFlight()
+        self._stream_flight = AsyncStreamFlight()
+
     def _initialize_documents(self):
-        """Carrega e processa todos os documentos"""
-        # Recarregar documentos a cada consulta para garantir dados atualizados
-        self.documents = []
-        for doc in self.document_service.get_all_documents():
-            self.add_document(doc)
-    
-    def add_document(self, text: str):
-        """Adiciona um documento à base de conhecimento"""
-        embedding = self.openai_service.get_embedding(text)
-        self.documents.append((text, embedding))
-    
-    def get_relevant_context(self, query: str, top_k: int = 3) -> List[str]:
-        """Recupera os documentos mais relevantes para a query"""
-        # Recarregar documentos para garantir que temos os mais recentes
+        """Aplica ao índice as alterações feitas no disco (no máximo a cada INDEX_SYNC_INTERVAL)"""
+        with timed("sync"):
+            self.index_service.sync()
+
+    async def _ainitialize_documents(self):
+        # A leitura dos arquivos é bloqueante e roda fora do event loop, apenas quando necessária
+        if self.index_service.sync_due():
+            with timed("sync"):
+                await asyncio.to_thread(self.index_service.sync)
+
+    def _lexical_first(self, query: str, top_k: int) -> Optional[List[DocumentChunk]]:
+        """Chunks obtidos sem o embedding da pergunta, quando o modo de recuperação permite"""
+        with timed("lexical_search"):
+            if self.retrieval_mode == "lexical":
+                return self.index_service.lexical_search(query, top_k)
+            if self.retrieval_mode == "hybrid":
+                return self.index_service.lexical_shortcut(query, top_k)
+            return None
+
+    def _lexical_fallback(self, query: str, top_k: int, error: Exception) -> List[DocumentChunk]:
+        """Responde apenas com a busca lexical quando o serviço de embeddings falha ou demora"""
+        chunks = self.index_service.lexical_search(query, top_k)
+        if not chunks:
+            raise error
+        logger.warning(f"Embedding indisponível ({error!r}); usando apenas a busca lexical")
+        return chunks
+
+    def _rank(self, query: str, query_embedding: List[float], top_k: int) -> List[DocumentChunk]:
+        with timed("similarity_search"):
+            if self.retrieval_mode == "hybrid":
+                return self.index_service.hybrid_search(query_embedding, query, top_k)
+            return self.index_service.search(query_embedding, top_k, query)
+
+    def _embed_query(self, query: str) -> List[float]:
+        """Embedding da pergunta com limite de tempo (EMBEDDING_TIMEOUT)
+
+        Depois do limite, a requisição continua em segundo plano e o embedding
+        fica no cache do OpenAIService para a próxima pergunta igual.
+        """
+        with timed("embed_query"):
+            future = self._embed_executor.submit(self.index_service.embed_query, query)
+            return future.result(timeout=self.embedding_timeout)
+
+    def get_relevant_context(self, query: str, top_k: int = 3) -> List[DocumentChunk]:
+        """Recupera os chunks mais relevantes para a query"""
         self._initialize_documents()
-        
-        if not self.documents:
+
+        if not len(self.index_service):
+            return []
+
+        chunks = self._lexical_first(query, top_k)
+        if chunks is not None:
+            return chunks
+        try:
+            query_embedding = self._embed_query(query)
+        except Exception as e:
+            return self._lexical_fallback(query, top_k, e)
+        return self._rank(query, query_embedding, top_k)
+
+    async def _aembed_query(self, query: str) -> List[float]:
+        """Embedding da pergunta com limite de tempo (EMBEDDING_TIMEOUT)"""
+        with timed("embed_query"):
+            return await asyncio.wait_for(self.index_service.aembed_query(query), self.embedding_timeout)
+
+    async def aget_relevant_context(self, query: str, top_k: int = 3) -> List[DocumentChunk]:
+        """Versão assíncrona de get_relevant_context"""
+        await self._ainitialize_documents()
+
+        if not len(self.index_service):
             return []
-            
-        query_embedding = self.openai_service.get_embedding(query)
-        
-        # Calcular similaridade com todos os documentos
-        similarities = []
-        for _, doc_embedding in self.documents:
-            similarity = cosine_similarity(
-                np.array(query_embedding).reshape(1, -1),
-                np.array(doc_embedding).reshape(1, -1)
-            )[0][0]
-            similarities.append(similarity)
-        
-        # Pegar os top_k documentos mais similares
-        top_indices = np.argsort(similarities)[-top_k:][::-1]  # Ordem decrescente
-        return [self.documents[i][0] for i in top_indices]
-    
-    def get_answer(self, question: str) -> Tuple[str, List[str], int]:
+
+        chunks = self._lexical_first(query, top_k)
+        if chunks is not None:
+            return chunks
+        try:
+            query_embedding = await self._aembed_query(query)
+        except Exception as e:
+            return self._lexical_fallback(query, top_k, e)
+        return self._rank(query, query_embedding, top_k)
+
+    def _retrieve(self, question: str, top_k: int = 3) -> Tuple[Optional[CachedAnswer], List[DocumentChunk], Optional[List[float]], int, bool]:
+        """Atualiza o índice, consulta o cache de respostas e recupera o contexto
+
+        Retorna (resposta em cache ou None, chunks, embedding da pergunta,
+        versão da base, se a resposta pode ir para o cache). Respostas geradas
+        com o contexto da busca lexical de contingência (embedding indisponível)
+        não vão para o cache, para não sobreviverem à falha.
+        """
+        self._initialize_documents()
+        version = self.index_service.corpus_version
+
+        with timed("answer_cache"):
+            cached = self.answer_cache.get_exact(question, version)
+        if cached is not None or not len(self.index_service):
+            return cached, [], None, version, True
+
+        chunks = self._lexical_first(question, top_k)
+        if chunks is not None:
+            return None, chunks, None, version, True
+        try:
+            query_embedding = self._embed_query(question)
+        except Exception as e:
+            return None, self._lexical_fallback(question, top_k, e), None, version, False
+
+        with timed("answer_cache"):
+            cached = self.answer_cache.get_similar(query_embedding, version)
+        if cached is not None:
+            return cached, [], query_embedding, version, True
+        return None, self._rank(question, query_embedding, top_k), query_embedding, version, True
+
+    async def _aretrieve(self, question: str, top_k: int = 3) -> Tuple[Optional[CachedAnswer], List[DocumentChunk], Optional[List[float]], int, bool]:
+        """Versão assíncrona de _retrieve"""
+        await self._ainitialize_documents()
+        version = self.index_service.corpus_version
+
+        with timed("answer_cache"):
+            cached = self.answer_cache.get_exact(question, version)
+        if cached is not None or not len(self.index_service):
+            return cached, [], None, version, True
+
+        chunks = self._lexical_first(question, top_k)
+        if chunks is not None:
+            return None, chunks, None, version, True
+        try:
+            query_embedding = await self._aembed_query(question)
+        except Exception as e:
+            return None, self._lexical_fallback(question, top_k, e), None, version, False
+
+        with timed("answer_cache"):
+            cached = self.answer_cache.get_similar(query_embedding, version)
+        if cached is not None:
+            return cached, [], query_embedding, version, True
+        return None, self._rank(question, query_embedding, top_k), query_embedding, version, True
+
+    def get_answer(self, question: str) -> Tuple[str, List[DocumentChunk], TokenUsage]:
         """Gera uma resposta para a pergunta usando o contexto relevante"""
-        relevant_docs = self.get_relevant_context(question)
-        context = "\n".join(relevant_docs) if relevant_docs else ""
-        
-        answer, tokens_used = self.openai_service.get_completion(question, context)
-        return answer, relevant_docs, tokens_used 
+        (answer, chunks, usage), shared = self._answer_flight.do(
+            normalize_question(question), lambda: self._generate_answer(question)
+        )
+        # Quem reaproveitou a resposta de outra requisição não consumiu tokens
+        return answer, chunks, TokenUsage() if shared else usage
+
+    async def aget_answer(self, question: str) -> Tuple[str, List[DocumentChunk], TokenUsage]:
+        """Versão assíncrona de get_answer, sem ocupar uma thread durante as chamadas à API"""
+        (answer, chunks, usage), shared = await self._async_answer_flight.do(
+            normalize_question(question), lambda: self._agenerate_answer(question)
+        )
+        return answer, chunks, TokenUsage() if shared else usage
+
+    @staticmethod
+    def _count_tokens(usage: TokenUsage):
+        UPSTREAM_TOKENS.inc(usage.prompt_tokens, kind="prompt")
+        UPSTREAM_TOKENS.inc(usage.completion_tokens, kind="completion")
+
+    def _generate_answer(self, question: str) -> Tuple[str, List[DocumentChunk], TokenUsage]:
+        cached, relevant_chunks, query_embedding, version, cacheable = self._retrieve(question)
+        if cached is not None:
+            # Respostas em cache não consomem tokens
+            return cached.answer, cached.chunks, TokenUsage()
+
+        with timed("assemble_context"):
+            context, relevant_chunks = self.context_assembler.assemble(relevant_chunks)
+        with timed("completion"):
+            answer, usage = self.openai_service.get_completion(question, context)
+        self._count_tokens(usage)
+        if cacheable:
+            self.answer_cache.put(question, query_embedding, answer, relevant_chunks, usage.total_tokens, version)
+        return answer, relevant_chunks, usage
+
+    async def _agenerate_answer(self, question: str) -> Tuple[str, List[DocumentChunk], TokenUsage]:
+        cached, relevant_chunks, query_embedding, version, cacheable = await self._aretrieve(question)
+        if cached is not None:
+            return cached.answer, cached.chunks, TokenUsage()
+
+        with timed("assemble_context"):
+            context, relevant_chunks = self.context_assembler.assemble(relevant_chunks)
+        with timed("completion"):
+            answer, usage = await self.openai_service.aget_completion(question, context)
+        self._count_tokens(usage)
+        if cacheable:
+            self.answer_cache.put(question, query_embedding, answer, relevant_chunks, usage.total_tokens, version)
+        return answer, relevant_chunks, usage
+
+    async def astream_answer(self, question: str) -> AsyncIterator[Tuple[str, object]]:
+        """Gera a resposta em streaming
+
+        Produz ("context", chunks) assim que a recuperação termina, depois
+        ("token", trecho) para cada trecho da resposta e, por fim,
+        ("done", (resposta completa, TokenUsage)). Perguntas idênticas
+        simultâneas compartilham a mesma recuperação e o mesmo stream da API.
+        O uso é registrado uma única vez pelo produtor do stream, mesmo que os
+        clientes se desconectem antes do fim.
+        """
+        async for (event, data), shared in self._stream_flight.stream(
+            normalize_question(question), lambda: self._astream_generate(question)
+        ):
+            if event == "done" and shared:
+                # Quem reaproveitou o stream de outra requisição não consumiu tokens
+                data = (data[0], TokenUsage())
+            yield event, data
+
+    async def _astream_generate(self, question: str) -> AsyncIterator[Tuple[str, object]]:
+        cached, relevant_chunks, query_embedding, version, cacheable = await self._aretrieve(question)
+        if cached is not None:
+            yield "context", cached.chunks
+            yield "token", cached.answer
+            self._log_usage(question, cached.answer, TokenUsage())
+            yield "done", (cached.answer, TokenUsage())
+            return
+
+        with timed("assemble_context"):
+            context, relevant_chunks = self.context_assembler.assemble(relevant_chunks)
+        yield "context", relevant_chunks
+
+        answer = []
+        usage = TokenUsage()
+        # Inclui o tempo em que o cliente consome os trechos
+        with timed("completion"):
+            async for event, data in self.openai_service.astream_completion(question, context):
+                if event == "token":
+                    answer.append(data)
+                    yield "token", data
+                elif event == "usage":
+                    usage = data
+        self._count_tokens(usage)
+        answer = "".join(answer)
+        if cacheable:
+            self.answer_cache.put(question, query_embedding, answer, relevant_chunks, usage.total_tokens, version)
+        self._log_usage(question, answer, usage)
+        yield "done", (answer, usage)
+
+    @staticmethod
+    def _log_usage(question: str, answer: str, usage: TokenUsage):
+        with timed("usage_log"):
+            usage_writer.log(question, answer, usage.total_tokens, usage.prompt_tokens, usage.completion_tokens)
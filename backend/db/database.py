@@ -1,11 +1,17 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, func
+from sqlalchemy import create_engine, event, Column, Integer, String, DateTime, func, inspect, text, select, delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy.orm import Session
 import os
 import json
+import threading
 from datetime import datetime
+from typing import Iterable, List
 from backend.models.schemas import UsageLog
 from dotenv import load_dotenv
+from backend.services.observability import get_logger
+
+logger = get_logger(__name__)
 
 load_dotenv()
 
@@ -17,6 +23,17 @@ engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL: leituras não esperam pelas gravações e cada commit não exige fsync do banco inteiro"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    # Em WAL, NORMAL só sincroniza o disco nos checkpoints, sem risco de corromper o banco
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
 class Usage(Base):
     __tablename__ = "usage_logs"
 
@@ -24,11 +41,147 @@ class Usage(Base):
     prompt = Column(String)
     response = Column(String)
     tokens_used = Column(Integer)
-    timestamp = Column(DateTime)
+    prompt_tokens = Column(Integer)
+    completion_tokens = Column(Integer)
+    timestamp = Column(DateTime, index=True)
+
+class UsageRollup(Base):
+    """Totais de uso por hora, por dia e geral (period = "hour", "day" ou "total")"""
+    __tablename__ = "usage_rollups"
+
+    period = Column(String, primary_key=True)
+    bucket = Column(DateTime, primary_key=True)
+    requests = Column(Integer, nullable=False, default=0)
+    tokens_used = Column(Integer, nullable=False, default=0)
+    prompt_tokens = Column(Integer, nullable=False, default=0)
+    completion_tokens = Column(Integer, nullable=False, default=0)
+
+class QuestionRollup(Base):
+    """Totais de uso por pergunta normalizada"""
+    __tablename__ = "usage_questions"
+
+    question = Column(String, primary_key=True)
+    example = Column(String)
+    requests = Column(Integer, nullable=False, default=0, index=True)
+    tokens_used = Column(Integer, nullable=False, default=0)
+    last_seen = Column(DateTime)
+
+# Bucket único da linha de totais gerais
+TOTAL_BUCKET = datetime(1970, 1, 1)
+_rollups_lock = threading.Lock()
 
 # Cria as tabelas no banco
 Base.metadata.create_all(bind=engine)
 
+def _add_missing_columns():
+    """Adiciona aos bancos existentes as colunas criadas depois da tabela"""
+    existing = {column["name"] for column in inspect(engine).get_columns(Usage.__tablename__)}
+    with engine.begin() as connection:
+        for column in Usage.__table__.columns:
+            if column.name not in existing:
+                connection.execute(text(
+                    f"ALTER TABLE {Usage.__tablename__} ADD COLUMN {column.name} "
+                    f"{column.type.compile(dialect=engine.dialect)}"
+                ))
+    # Índices declarados depois da criação da tabela (como o de timestamp)
+    for index in Usage.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+
+_add_missing_columns()
+
+def apply_rollups(connection, records: Iterable[dict]):
+    """Soma os registros de uso às tabelas de totais, na transação de quem os grava
+
+    Os registros são agregados em memória, de modo que um lote vira poucas
+    atualizações (uma por hora, dia e pergunta distintos).
+    """
+    # Importado aqui para que o banco não dependa do numpy na inicialização da API
+    from backend.services.answer_cache import normalize_question
+
+    buckets = {}
+    questions = {}
+    for record in records:
+        timestamp = record["timestamp"]
+        values = (
+            1,
+            record.get("tokens_used") or 0,
+            record.get("prompt_tokens") or 0,
+            record.get("completion_tokens") or 0,
+        )
+        for key in (
+            ("hour", timestamp.replace(minute=0, second=0, microsecond=0)),
+            ("day", timestamp.replace(hour=0, minute=0, second=0, microsecond=0)),
+            ("total", TOTAL_BUCKET),
+        ):
+            current = buckets.get(key, (0, 0, 0, 0))
+            buckets[key] = tuple(a + b for a, b in zip(current, values))
+
+        question = normalize_question(record.get("prompt") or "")
+        entry = questions.setdefault(question, {
+            "question": question, "example": record.get("prompt"), "requests": 0,
+            "tokens_used": 0, "last_seen": timestamp
+        })
+        entry["requests"] += 1
+        entry["tokens_used"] += values[1]
+        entry["last_seen"] = max(entry["last_seen"], timestamp)
+
+    if not buckets:
+        return
+
+    statement = sqlite_insert(UsageRollup)
+    connection.execute(
+        statement.on_conflict_do_update(
+            index_elements=[UsageRollup.period, UsageRollup.bucket],
+            set_={
+                "requests": UsageRollup.requests + statement.excluded.requests,
+                "tokens_used": UsageRollup.tokens_used + statement.excluded.tokens_used,
+                "prompt_tokens": UsageRollup.prompt_tokens + statement.excluded.prompt_tokens,
+                "completion_tokens": UsageRollup.completion_tokens + statement.excluded.completion_tokens,
+            }
+        ),
+        [
+            {"period": period, "bucket": bucket, "requests": requests, "tokens_used": tokens,
+             "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}
+            for (period, bucket), (requests, tokens, prompt_tokens, completion_tokens) in buckets.items()
+        ]
+    )
+
+    statement = sqlite_insert(QuestionRollup)
+    connection.execute(
+        statement.on_conflict_do_update(
+            index_elements=[QuestionRollup.question],
+            set_={
+                "requests": QuestionRollup.requests + statement.excluded.requests,
+                "tokens_used": QuestionRollup.tokens_used + statement.excluded.tokens_used,
+                "last_seen": func.max(QuestionRollup.last_seen, statement.excluded.last_seen),
+            }
+        ),
+        list(questions.values())
+    )
+
+def ensure_rollups(batch_size: int = 10000):
+    """Gera as tabelas de totais a partir do log, se ainda não existirem
+
+    Executado uma única vez em bancos criados antes das tabelas de totais; os
+    registros seguintes atualizam os totais ao serem gravados.
+    """
+    with _rollups_lock, engine.begin() as connection:
+        has_totals = connection.execute(
+            select(UsageRollup.requests).where(UsageRollup.period == "total")
+        ).first() is not None
+        has_logs = connection.execute(select(Usage.id).limit(1)).first() is not None
+        if has_totals or not has_logs:
+            return
+
+        logger.info("Gerando totais de uso a partir do log existente")
+        connection.execute(delete(QuestionRollup))
+        columns = [Usage.prompt, Usage.tokens_used, Usage.prompt_tokens, Usage.completion_tokens, Usage.timestamp]
+        result = connection.execution_options(yield_per=batch_size).execute(
+            select(*columns).where(Usage.timestamp.is_not(None))
+        )
+        for rows in result.partitions():
+            apply_rollups(connection, [row._asdict() for row in rows])
+
 def get_db():
     """Abre e fecha a sessão com o banco de dados"""
     db = SessionLocal()
@@ -37,16 +190,23 @@ def get_db():
     finally:
         db.close()
 
-def log_usage(db: Session, prompt: str, response: str, tokens: int):
+def log_usage(db: Session, prompt: str, response: str, tokens: int,
+              prompt_tokens: int = None, completion_tokens: int = None):
     """Registra o uso da API no banco de dados"""
     try:
         usage_log = Usage(
     prompt=prompt,
     response=response,
     tokens_used=tokens,
+    prompt_tokens=prompt_tokens,
+    completion_tokens=completion_tokens,
     timestamp=datetime.utcnow()  # IMPORTANTE: precisa passar o timestamp também
 )
         db.add(usage_log)
+        apply_rollups(db.connection(), [{
+            "prompt": prompt, "tokens_used": tokens, "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens, "timestamp": usage_log.timestamp
+        }])
         db.commit()
         return usage_log
     except Exception as e:
@@ -54,15 +214,53 @@ def log_usage(db: Session, prompt: str, response: str, tokens: int):
         raise Exception(f"Erro ao registrar uso: {str(e)}")
 
 def get_usage_stats(db: Session):
-    """Retorna estatísticas de uso"""
+    """Retorna estatísticas de uso (da linha de totais, sem percorrer o log)"""
     try:
-        total_requests = db.query(Usage).count()
-        total_tokens = db.query(func.sum(Usage.tokens_used)).scalar() or 0
-        
+        totals = db.get(UsageRollup, ("total", TOTAL_BUCKET))
+        total_requests = totals.requests if totals else 0
+        total_tokens = totals.tokens_used if totals else 0
+
         return {
             "total_requests": total_requests,
             "total_tokens": total_tokens,
+            "prompt_tokens": totals.prompt_tokens if totals else 0,
+            "completion_tokens": totals.completion_tokens if totals else 0,
             "average_tokens": total_tokens / total_requests if total_requests > 0 else 0
         }
     except Exception as e:
         raise Exception(f"Erro ao obter estatísticas: {str(e)}")
+
+def get_usage_series(db: Session, period: str, start: datetime = None, end: datetime = None,
+                     limit: int = 168) -> List[dict]:
+    """Retorna os totais por hora ou por dia, do mais recente para o mais antigo"""
+    query = select(UsageRollup).where(UsageRollup.period == period)
+    if start is not None:
+        query = query.where(UsageRollup.bucket >= start)
+    if end is not None:
+        query = query.where(UsageRollup.bucket < end)
+    rows = db.execute(query.order_by(UsageRollup.bucket.desc()).limit(limit)).scalars()
+    return [
+        {
+            "bucket": row.bucket,
+            "requests": row.requests,
+            "tokens_used": row.tokens_used,
+            "prompt_tokens": row.prompt_tokens,
+            "completion_tokens": row.completion_tokens,
+        }
+        for row in rows
+    ]
+
+def get_top_questions(db: Session, limit: int = 10) -> List[dict]:
+    """Retorna as perguntas mais frequentes"""
+    rows = db.execute(
+        select(QuestionRollup).order_by(QuestionRollup.requests.desc()).limit(limit)
+    ).scalars()
+    return [
+        {
+            "question": row.example,
+            "requests": row.requests,
+            "tokens_used": row.tokens_used,
+            "last_seen": row.last_seen,
+        }
+        for row in rows
+    ]
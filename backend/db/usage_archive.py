@@ -0,0 +1,197 @@
+import os
+import re
+import glob
+import gzip
+import json
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+from sqlalchemy import select, delete, text
+from backend.db.database import engine, Usage, ensure_rollups
+from backend.services.observability import get_logger
+
+logger = get_logger(__name__)
+
+_ARCHIVE_NAME = re.compile(r"usage-(\d{4}-\d{2})\.jsonl\.gz$")
+
+
+class UsageCompactor:
+    """Retenção do log de uso: registros antigos saem do banco para arquivos mensais
+
+    Os totais por hora, dia e pergunta já ficam nas tabelas de totais; a
+    compactação move o texto completo dos registros com mais de
+    USAGE_RETENTION_DAYS dias para arquivos usage-AAAA-MM.jsonl.gz em
+    USAGE_ARCHIVE_DIR (ou apenas os apaga, com USAGE_ARCHIVE=false), de modo
+    que o usage.db guarde só os dias recentes e caiba no cache do sistema.
+    """
+
+    def __init__(self, retention_days: int = None, archive_dir: str = None, interval: float = None,
+                 batch_size: int = None):
+        self.retention_days = retention_days if retention_days is not None else int(
+            os.getenv("USAGE_RETENTION_DAYS", "30")
+        )  # 0 = sem compactação
+        self.archive_dir = archive_dir or os.getenv("USAGE_ARCHIVE_DIR", "backend/db/archive")
+        self.archive = os.getenv("USAGE_ARCHIVE", "true").lower() != "false"
+        self.interval = interval or float(os.getenv("USAGE_COMPACTION_INTERVAL", "3600"))
+        self.batch_size = batch_size or int(os.getenv("USAGE_COMPACTION_BATCH", "5000"))
+
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self.last_run: Optional[datetime] = None
+        self.archived = 0
+        self.deleted = 0
+
+    def start(self):
+        """Inicia a compactação periódica em segundo plano"""
+        if self.retention_days <= 0:
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="usage-compactor", daemon=True)
+                self._thread.start()
+
+    def close(self, timeout: float = 10.0):
+        """Encerra a thread de compactação"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is None:
+            return
+        self._stop.set()
+        thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.compact()
+            except Exception as e:
+                logger.error(f"Erro ao compactar o log de uso: {str(e)}")
+            self._stop.wait(self.interval)
+
+    def archive_path(self, month: str) -> str:
+        return os.path.join(self.archive_dir, f"usage-{month}.jsonl.gz")
+
+    def _archive_rows(self, rows: List[dict]):
+        """Acrescenta os registros aos arquivos dos seus meses
+
+        Cada chamada grava um novo membro gzip no fim do arquivo, e um arquivo
+        com vários membros é lido normalmente pelo gzip.
+        """
+        by_month: Dict[str, List[dict]] = {}
+        for row in rows:
+            by_month.setdefault(row["timestamp"].strftime("%Y-%m"), []).append(row)
+
+        os.makedirs(self.archive_dir, exist_ok=True)
+        for month, month_rows in by_month.items():
+            lines = "".join(
+                json.dumps(dict(row, timestamp=row["timestamp"].isoformat()), ensure_ascii=False) + "\n"
+                for row in month_rows
+            )
+            with open(self.archive_path(month), "ab") as f:
+                f.write(gzip.compress(lines.encode("utf-8")))
+                f.flush()
+                os.fsync(f.fileno())
+
+    def compact(self, now: datetime = None) -> dict:
+        """Move (ou apaga) os registros mais antigos que o período de retenção
+
+        Cada lote é arquivado e só então apagado, na mesma transação; se o
+        processo cair entre as duas etapas, o lote volta a ser arquivado na
+        próxima execução e a leitura dos arquivos descarta a repetição.
+        """
+        if self.retention_days <= 0:
+            return {"archived": 0, "deleted": 0}
+        # Os totais precisam incluir os registros antes que eles saiam do banco
+        ensure_rollups()
+
+        cutoff = (now or datetime.utcnow()) - timedelta(days=self.retention_days)
+        columns = [Usage.id, Usage.prompt, Usage.response, Usage.tokens_used,
+                   Usage.prompt_tokens, Usage.completion_tokens, Usage.timestamp]
+        archived = deleted = 0
+        with self._compact_lock:
+            while True:
+                with engine.begin() as connection:
+                    rows = [
+                        row._asdict() for row in connection.execute(
+                            select(*columns).where(Usage.timestamp < cutoff)
+                            .order_by(Usage.id).limit(self.batch_size)
+                        )
+                    ]
+                    if not rows:
+                        break
+                    if self.archive:
+                        self._archive_rows(rows)
+                        archived += len(rows)
+                    connection.execute(delete(Usage).where(Usage.id.in_([row["id"] for row in rows])))
+                    deleted += len(rows)
+
+            if deleted:
+                logger.info(f"Log de uso compactado: {deleted} registros anteriores a {cutoff:%Y-%m-%d}")
+                self._reclaim_space()
+
+        self.archived += archived
+        self.deleted += deleted
+        self.last_run = datetime.utcnow()
+        return {"archived": archived, "deleted": deleted}
+
+    @staticmethod
+    def _reclaim_space(min_free_ratio: float = 0.25):
+        """Devolve ao disco as páginas livres quando elas passam de min_free_ratio do banco"""
+        with engine.connect() as connection:
+            page_count = connection.execute(text("PRAGMA page_count")).scalar() or 0
+            free_pages = connection.execute(text("PRAGMA freelist_count")).scalar() or 0
+        if page_count and free_pages / page_count >= min_free_ratio:
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+                connection.execute(text("VACUUM"))
+
+    def months(self) -> List[dict]:
+        """Lista os meses arquivados, com o tamanho de cada arquivo"""
+        months = []
+        for path in sorted(glob.glob(os.path.join(glob.escape(self.archive_dir), "usage-*.jsonl.gz"))):
+            match = _ARCHIVE_NAME.search(os.path.basename(path))
+            if match:
+                months.append({"month": match.group(1), "size": os.path.getsize(path)})
+        return months
+
+    def read(self, month: str, start: datetime = None, end: datetime = None,
+             search: str = None) -> Iterator[dict]:
+        """Lê os registros arquivados de um mês, com filtros opcionais
+
+        search filtra pelo texto da pergunta, sem diferenciar maiúsculas.
+        """
+        path = self.archive_path(month)
+        if not _ARCHIVE_NAME.search(os.path.basename(path)) or not os.path.exists(path):
+            return
+        search = search.lower() if search else None
+        seen = set()
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                key = (record["id"], record["timestamp"])
+                if key in seen:
+                    continue
+                seen.add(key)
+                timestamp = datetime.fromisoformat(record["timestamp"])
+                if start is not None and timestamp < start:
+                    continue
+                if end is not None and timestamp >= end:
+                    continue
+                if search and search not in (record.get("prompt") or "").lower():
+                    continue
+                yield record
+
+    def stats(self) -> dict:
+        """Configuração e resultado das compactações"""
+        return {
+            "retention_days": self.retention_days,
+            "archive": self.archive,
+            "last_run": self.last_run,
+            "archived": self.archived,
+            "deleted": self.deleted,
+        }
+
+
+usage_compactor = UsageCompactor()
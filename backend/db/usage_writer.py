@@ -0,0 +1,141 @@
+import os
+import time
+import queue
+import atexit
+import threading
+from datetime import datetime
+from typing import List, Optional, Tuple
+from backend.db.database import engine, Usage, apply_rollups, ensure_rollups
+from backend.services.observability import get_logger, timed
+
+logger = get_logger(__name__)
+
+# Marca de encerramento na fila
+_STOP = object()
+
+
+class UsageWriter:
+    """Grava o log de uso em segundo plano, em lotes
+
+    As requisições apenas colocam o registro em uma fila; uma thread grava os
+    registros em uma única transação quando acumula USAGE_FLUSH_SIZE itens ou
+    quando passa USAGE_FLUSH_INTERVAL segundos desde o primeiro da fila.
+    """
+
+    def __init__(self, flush_size: int = None, flush_interval: float = None, max_queue_size: int = None):
+        self.flush_size = flush_size or int(os.getenv("USAGE_FLUSH_SIZE", "200"))
+        self.flush_interval = flush_interval or float(os.getenv("USAGE_FLUSH_INTERVAL", "1.0"))
+        max_queue_size = max_queue_size or int(os.getenv("USAGE_QUEUE_SIZE", "10000"))
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def start(self):
+        """Inicia a thread de gravação, se ainda não estiver rodando"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="usage-writer", daemon=True)
+                self._thread.start()
+
+    def log(self, prompt: str, response: str, tokens: int,
+            prompt_tokens: int = None, completion_tokens: int = None):
+        """Enfileira um registro de uso sem esperar pelo disco"""
+        self.start()
+        record = {
+            "prompt": prompt,
+            "response": response,
+            "tokens_used": tokens,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "timestamp": datetime.utcnow(),
+        }
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            # Com o disco parado, é melhor perder registros que travar as respostas
+            self.dropped += 1
+            logger.warning("Fila do log de uso cheia; registro descartado")
+
+    def _next_batch(self) -> Tuple[List[object], bool]:
+        """Espera o primeiro registro e junta os seguintes até o tamanho ou o tempo limite
+
+        Retorna (itens retirados da fila, se a thread deve encerrar).
+        """
+        items = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while items[-1] is not _STOP and len(items) < self.flush_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                items.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+
+        stopping = items[-1] is _STOP
+        if stopping:
+            # Grava o que ainda estiver na fila antes de encerrar
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+        return items, stopping
+
+    def _write(self, batch: List[dict]):
+        try:
+            with timed("usage_flush"), engine.begin() as connection:
+                connection.execute(Usage.__table__.insert(), batch)
+                # Totais atualizados na mesma transação do log
+                apply_rollups(connection, batch)
+            self.written += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(f"Erro ao registrar uso: {str(e)}")
+
+    def _run(self):
+        try:
+            ensure_rollups()
+        except Exception as e:
+            logger.error(f"Erro ao gerar totais de uso: {str(e)}")
+        stopping = False
+        while not stopping:
+            items, stopping = self._next_batch()
+            batch = [item for item in items if item is not _STOP]
+            if batch:
+                self._write(batch)
+            for _ in items:
+                self._queue.task_done()
+
+    def flush(self):
+        """Espera até que todos os registros enfileirados sejam gravados"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def close(self, timeout: float = 10.0):
+        """Grava os registros pendentes e encerra a thread"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+
+    def stats(self) -> dict:
+        """Métricas do gravador"""
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+
+usage_writer = UsageWriter()
+# Garante a gravação dos registros pendentes também fora do ciclo de vida da API
+atexit.register(usage_writer.close)
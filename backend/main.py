@@ -1,50 +1,140 @@
 from fastapi import FastAPI, Depends
-from sqlalchemy.orm import Session
-from datetime import datetime
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from backend.models.schemas import QuestionRequest, QuestionResponse
-from backend.db.database import get_db, Usage
-from backend.chains.qa_chain import QAChain
+from backend.db.usage_writer import usage_writer
+from backend.db.usage_archive import usage_compactor
+from backend.services.warmup import warmup
+from backend.routers.dependencies import get_qa_chain
+from backend.services.observability import RequestContextMiddleware, metrics, timed
+from backend.services.profiler import ProfilingMiddleware
 from backend.routers.document_router import router as document_router
+from backend.routers.usage_router import router as usage_router
+from backend.routers.admin_router import router as admin_router
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 import os
+import json
+import asyncio
 
 load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    usage_writer.start()
+    usage_compactor.start()
+    # O índice é carregado em segundo plano; com FAST_START=false a API só
+    # aceita requisições depois de pronto
+    warmup.start()
+    if os.getenv("FAST_START", "true").lower() not in ("1", "true", "yes"):
+        await warmup.await_ready()
+    yield
+    # Grava os registros de uso pendentes antes de encerrar
+    await asyncio.to_thread(usage_writer.close)
+    await asyncio.to_thread(usage_compactor.close)
+
 app = FastAPI(
     title=os.getenv("APP_NAME", "Prova IA Generativa – Backend"),
     version=os.getenv("APP_VERSION", "1.0.0"),
-    description="API para responder perguntas sobre o SENAI usando documentos com RAG"
+    description="API para responder perguntas sobre o SENAI usando documentos com RAG",
+    lifespan=lifespan
 )
 
+# O último middleware adicionado é o mais externo: o profiling roda dentro do
+# contexto da requisição (id e tempo das etapas)
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(RequestContextMiddleware)
+
 # Adicionar o router de documentos
 app.include_router(document_router, tags=["Documents"])
-
-qa_chain = QAChain()
+app.include_router(usage_router, tags=["Usage"])
+app.include_router(admin_router, tags=["Admin"])
 
 @app.get("/health", tags=["Utils"])
-def health_check():
+async def health_check():
     return {"status": "ok"}
 
+@app.get("/ready", tags=["Utils"])
+async def readiness_check():
+    """Andamento do carregamento do índice; 503 até que ele esteja pronto"""
+    return JSONResponse(warmup.progress(), status_code=200 if warmup.status == "ready" else 503)
+
+def _index_metric(attribute):
+    def collect():
+        if warmup.qa_chain is None:
+            return None
+        return attribute(warmup.qa_chain)
+    return collect
+
+metrics.gauge("rag_index_vectors", "Vetores no índice", _index_metric(lambda chain: len(chain.index_service)))
+metrics.gauge("rag_index_documents", "Documentos indexados",
+              _index_metric(lambda chain: len(chain.index_service.indexed_documents)))
+metrics.gauge("rag_index_chunks", "Chunks indexados", _index_metric(lambda chain: len(chain.index_service.chunks)))
+metrics.gauge("rag_answer_cache", "Cache de respostas (acertos, falhas e entradas)", _index_metric(
+    lambda chain: {key: value for key, value in chain.answer_cache.stats().items()
+                   if key in ("entries", "exact_hits", "semantic_hits", "misses")}
+), labelname="kind")
+metrics.gauge("rag_ready", "1 quando o índice está pronto", lambda: int(warmup.status == "ready"))
+metrics.gauge("usage_writer_records", "Gravador do log de uso", usage_writer.stats, labelname="kind")
+
+@app.get("/metrics", tags=["Utils"])
+async def metrics_endpoint():
+    """Métricas no formato de texto do Prometheus"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/cache/stats", tags=["Utils"])
+async def cache_stats(qa_chain=Depends(get_qa_chain)):
+    """Métricas de acerto do cache de respostas"""
+    return qa_chain.answer_cache.stats()
+
 @app.post("/ask", response_model=QuestionResponse, tags=["QA"])
-def answer_question(
-    question_request: QuestionRequest,
-    db: Session = Depends(get_db)
-):
-    # Gerar resposta
-    answer, context_used, tokens_used = qa_chain.get_answer(question_request.question)
+async def answer_question(question_request: QuestionRequest, qa_chain=Depends(get_qa_chain)):
+    # Gerar resposta sem ocupar uma thread durante as chamadas à OpenAI
+    answer, context_used, usage = await qa_chain.aget_answer(question_request.question)
 
     # Registrar uso no banco de dados
-    usage_log = Usage(
-        prompt=question_request.question,
-        response=answer,
-        tokens_used=tokens_used,
-        timestamp=datetime.utcnow()
-    )
-    db.add(usage_log)
-    db.commit()
+    with timed("usage_log"):
+        usage_writer.log(question_request.question, answer, usage.total_tokens,
+                         usage.prompt_tokens, usage.completion_tokens)
 
     return QuestionResponse(
         answer=answer,
-        context_used=context_used,
-        tokens_used=tokens_used
+        context_used=[chunk.text for chunk in context_used],
+        tokens_used=usage.total_tokens,
+        prompt_tokens=usage.prompt_tokens,
+        completion_tokens=usage.completion_tokens,
+        sources=context_used
+    )
+
+def _sse_event(event: str, data) -> str:
+    """Formata um evento Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/ask/stream", tags=["QA"])
+async def answer_question_stream(question_request: QuestionRequest, qa_chain=Depends(get_qa_chain)):
+    """Responde em streaming (SSE): primeiro o contexto, depois os trechos da resposta"""
+    async def event_stream():
+        try:
+            async for event, data in qa_chain.astream_answer(question_request.question):
+                if event == "context":
+                    yield _sse_event("context", {
+                        "context_used": [chunk.text for chunk in data],
+                        "sources": [chunk.model_dump() for chunk in data]
+                    })
+                elif event == "token":
+                    yield _sse_event("token", {"content": data})
+                elif event == "done":
+                    # O uso já foi registrado pelo produtor do stream (QAChain.astream_answer)
+                    _, usage = data
+                    yield _sse_event("done", {
+                        "tokens_used": usage.total_tokens,
+                        "prompt_tokens": usage.prompt_tokens,
+                        "completion_tokens": usage.completion_tokens
+                    })
+        except Exception as e:
+            yield _sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
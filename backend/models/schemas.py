@@ -5,10 +5,32 @@ from datetime import datetime
 class QuestionRequest(BaseModel):
     question: str
 
+class DocumentChunk(BaseModel):
+    filename: str
+    text: str
+    start: int
+    end: int
+    score: Optional[float] = None
+
+    @property
+    def chunk_id(self) -> str:
+        return f"{self.filename}:{self.start}"
+
+class TokenUsage(BaseModel):
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
 class QuestionResponse(BaseModel):
     answer: str
     context_used: List[str]
     tokens_used: int
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    sources: List[DocumentChunk] = []
 
 class UsageLog(BaseModel):
     id: Optional[int] = None
@@ -16,6 +38,19 @@ class UsageLog(BaseModel):
     prompt: str
     response: str
     tokens_used: int
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
 
     class Config:
         from_attributes = True
+
+class IngestionJob(BaseModel):
+    job_id: str
+    status: str = "queued"  # queued | running | done | failed
+    total: int = 0
+    processed: int = 0
+    added: List[str] = []
+    skipped: List[str] = []
+    errors: List[str] = []
+    created_at: datetime
+    finished_at: Optional[datetime] = None
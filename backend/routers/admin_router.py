@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
+from pydantic import BaseModel
+from typing import List, Optional
+from backend.routers.dependencies import require_admin
+from backend.services.profiler import profiler
+
+
+router = APIRouter(prefix="/admin", dependencies=[Depends(require_admin)])
+
+
+class ProfilingSettings(BaseModel):
+    sample_rate: Optional[float] = None
+    slow_ms: Optional[float] = None
+    interval_ms: Optional[float] = None
+    paths: Optional[List[str]] = None
+
+
+@router.get("/profiling")
+async def get_profiling():
+    """Configuração atual do profiling de requisições"""
+    return profiler.settings()
+
+
+@router.put("/profiling")
+async def update_profiling(settings: ProfilingSettings):
+    """Liga, desliga ou ajusta o profiling sem reiniciar o servidor
+
+    sample_rate é a fração das requisições perfiladas (0 a 1); slow_ms
+    captura as que passam desse tempo (0 desativa).
+    """
+    return profiler.configure(**settings.model_dump())
+
+
+@router.get("/profiles")
+async def list_profiles(limit: int = Query(50, ge=1, le=1000)):
+    """Perfis gravados, do mais recente ao mais antigo"""
+    return profiler.list_profiles(limit)
+
+
+@router.get("/profiles/{name}")
+async def download_profile(name: str):
+    """Pilhas "collapsed" do perfil (para flamegraph.pl ou speedscope)"""
+    path = profiler.profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Perfil não encontrado")
+    return FileResponse(path, media_type="text/plain; charset=utf-8", filename=name)
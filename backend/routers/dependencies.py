@@ -0,0 +1,57 @@
+import os
+import secrets
+from typing import Optional
+from fastapi import Header, HTTPException
+from backend.services.warmup import warmup
+
+
+async def get_qa_chain():
+    """QAChain compartilhada; espera o aquecimento por até WARMUP_WAIT segundos"""
+    if not await warmup.await_ready(warmup.wait_timeout):
+        raise HTTPException(
+            status_code=503,
+            detail=warmup.progress(),
+            headers={"Retry-After": "5"}
+        )
+    return warmup.qa_chain
+
+
+async def get_index():
+    """IndexService compartilhado, disponível depois do aquecimento"""
+    qa_chain = await get_qa_chain()
+    return qa_chain.index_service
+
+
+async def get_ready_index():
+    """IndexService compartilhado, ou None enquanto o índice não está pronto (sem esperar)"""
+    if warmup.ready and warmup.qa_chain is not None:
+        return warmup.qa_chain.index_service
+    warmup.start()
+    return None
+
+
+async def get_document_service():
+    """DocumentService compartilhado; disponível assim que os arquivos são lidos, antes do índice"""
+    document_service = warmup.document_service
+    if warmup.ready and warmup.qa_chain is not None:
+        document_service = warmup.qa_chain.index_service.document_service
+    if document_service is None:
+        warmup.start()
+        raise HTTPException(status_code=503, detail=warmup.progress(), headers={"Retry-After": "1"})
+    return document_service
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(None), authorization: Optional[str] = Header(None)):
+    """Restringe o endpoint a quem tem o ADMIN_TOKEN (cabeçalho X-Admin-Token ou Bearer)
+
+    Sem ADMIN_TOKEN configurado, os endpoints administrativos ficam desativados.
+    """
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token:
+        raise HTTPException(status_code=404, detail="Endpoints administrativos desativados (defina ADMIN_TOKEN)")
+    token = x_admin_token
+    if token is None and authorization and authorization.lower().startswith("bearer "):
+        token = authorization[len("bearer "):].strip()
+    if not token or not secrets.compare_digest(token.encode("utf-8"), admin_token.encode("utf-8")):
+        raise HTTPException(status_code=401, detail="Token de administrador inválido",
+                            headers={"WWW-Authenticate": "Bearer"})
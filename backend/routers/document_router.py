@@ -1,76 +1,207 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from pydantic import BaseModel
 from typing import List
 from datetime import datetime
 import os
-from backend.services.document_service import DocumentService
+import shutil
+import asyncio
+from starlette.datastructures import UploadFile
+from backend.models.schemas import IngestionJob
+from backend.routers.dependencies import get_document_service, get_index, get_ready_index
+from backend.services.ingestion_service import get_ingestion_service
+from backend.services.observability import get_logger, timed
+
+logger = get_logger(__name__)
 
 
 router = APIRouter()
-document_service = DocumentService()
 
 class DocumentCreate(BaseModel):
     filename: str
     content: str
 
-class Document(BaseModel):
+class DocumentInfo(BaseModel):
     filename: str
-    content: str
+    size: int
+    hash: str
     added_at: datetime
 
-@router.get("/documents", response_model=List[Document])
-async def get_documents():
-    """Retorna todos os documentos disponíveis"""
+class DocumentPage(BaseModel):
+    total: int
+    offset: int
+    limit: int
+    items: List[DocumentInfo]
+
+class Document(DocumentInfo):
+    content: str
+
+def _not_modified(request: Request, etag: str) -> bool:
+    """Indica se o cliente já tem a versão atual (If-None-Match com o mesmo ETag)"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]
+
+@router.get("/documents", response_model=DocumentPage)
+async def get_documents(
+    request: Request,
+    response: Response,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    document_service=Depends(get_document_service),
+    index_service=Depends(get_ready_index)
+):
+    """Retorna uma página com os metadados dos documentos (sem o conteúdo)
+
+    Não depende do índice: durante o aquecimento, lista os arquivos já lidos.
+    """
+    try:
+        # Aplicar ao índice as alterações feitas diretamente no disco, no máximo
+        # a cada INDEX_SYNC_INTERVAL segundos
+        if index_service is not None and index_service.sync_due():
+            with timed("documents_sync"):
+                await asyncio.to_thread(index_service.sync)
+        with timed("documents_list"):
+            listing, listing_etag = document_service.list_documents()
+
+        etag = f'"{listing_etag}-{offset}-{limit}"'
+        if _not_modified(request, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+
+        items = [
+            DocumentInfo(
+                filename=item["filename"],
+                size=item["size"],
+                hash=item["hash"],
+                added_at=datetime.fromtimestamp(item["added_at"])
+            )
+            for item in listing[offset:offset + limit]
+        ]
+        return DocumentPage(total=len(listing), offset=offset, limit=limit, items=items)
+    except Exception as e:
+        logger.error(f"Erro ao listar documentos: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _upload_path(upload_dir: str, filename: str, position: int) -> str:
+    """Caminho seguro, e único no job, para um arquivo enviado (mantendo o nome original)"""
+    directory = os.path.join(upload_dir, f"{position:05d}")
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, os.path.basename((filename or "upload").replace("\\", "/")) or "upload")
+
+def _save_upload(upload: UploadFile, path: str):
+    upload.file.seek(0)
+    with open(path, "wb") as f:
+        shutil.copyfileobj(upload.file, f, 1024 * 1024)
+
+@router.post("/documents/bulk", response_model=IngestionJob, status_code=202)
+async def create_documents_bulk(request: Request, filename: str = Query(None)):
+    """Adiciona muitos documentos de uma vez, em segundo plano
+
+    Aceita multipart/form-data com vários arquivos (.txt, .zip, .tar, .tar.gz)
+    ou o próprio arquivo compactado no corpo da requisição (informando
+    ?filename=). O corpo é gravado em disco em partes, sem ficar todo em
+    memória, e o progresso é consultado em GET /documents/bulk/{job_id}.
+    """
+    ingestion_service = get_ingestion_service()
+    upload_dir = ingestion_service.new_upload_dir()
     try:
-        # Forçar recarga dos documentos
-        document_service._load_documents()
-        
-        documents = []
-        for filename, content in document_service.documents.items():
+        content_type = request.headers.get("content-type", "")
+        if content_type.startswith("multipart/form-data"):
+            max_files = int(os.getenv("INGESTION_MAX_FILES", "10000"))
+            async with request.form(max_files=max_files) as form:
+                uploads = [value for _, value in form.multi_items() if isinstance(value, UploadFile)]
+                for position, upload in enumerate(uploads):
+                    path = _upload_path(upload_dir, upload.filename, position)
+                    await asyncio.to_thread(_save_upload, upload, path)
+        else:
+            path = _upload_path(upload_dir, filename, 0)
+            size = 0
+            buffer = bytearray()
+            f = await asyncio.to_thread(open, path, "wb")
             try:
-                filepath = os.path.join(document_service.documents_dir, filename)
-                if os.path.exists(filepath):
-                    added_at = datetime.fromtimestamp(os.path.getctime(filepath))
-                    
-                    documents.append(Document(
-                        filename=filename,
-                        content=content,
-                        added_at=added_at
-                    ))
-                else:
-                    print(f"Arquivo não encontrado: {filepath}")  # Debug
-            except Exception as e:
-                print(f"Erro ao processar documento {filename}: {str(e)}")  # Debug
-                continue
-        
-        print(f"Total de documentos retornados: {len(documents)}")  # Debug
-        return documents
+                # As partes do corpo são pequenas: a escrita, fora do event loop, é feita em blocos de 1 MB
+                async for part in request.stream():
+                    buffer += part
+                    size += len(part)
+                    if len(buffer) >= 1024 * 1024:
+                        await asyncio.to_thread(f.write, bytes(buffer))
+                        buffer.clear()
+                if buffer:
+                    await asyncio.to_thread(f.write, bytes(buffer))
+            finally:
+                await asyncio.to_thread(f.close)
+            if size == 0:
+                await asyncio.to_thread(os.remove, path)
+
+        if not any(files for _, _, files in os.walk(upload_dir)):
+            raise HTTPException(status_code=400, detail="Nenhum arquivo enviado")
+        return ingestion_service.submit(upload_dir)
+    except HTTPException:
+        shutil.rmtree(upload_dir, ignore_errors=True)
+        raise
     except Exception as e:
-        print(f"Erro ao listar documentos: {str(e)}")  # Debug
+        shutil.rmtree(upload_dir, ignore_errors=True)
+        logger.error(f"Erro ao receber documentos: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/documents/bulk", response_model=List[IngestionJob])
+async def list_bulk_jobs():
+    """Jobs de ingestão recentes, do mais novo para o mais antigo"""
+    return get_ingestion_service().list_jobs()
+
+@router.get("/documents/bulk/{job_id}", response_model=IngestionJob)
+async def get_bulk_job(job_id: str):
+    """Estado e progresso de um job de ingestão"""
+    job = get_ingestion_service().get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job
+
+@router.get("/documents/{filename}", response_model=Document)
+async def get_document(filename: str, request: Request, response: Response, index_service=Depends(get_index)):
+    """Retorna o conteúdo de um documento"""
+    await asyncio.to_thread(index_service.sync)
+    document = index_service.document_service.get_document(filename)
+    if document is None:
+        raise HTTPException(status_code=404, detail="Documento não encontrado")
+    content, info = document
+
+    etag = f'"{info["hash"][:32]}"'
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return Document(
+        filename=filename,
+        size=info["size"],
+        hash=info["hash"],
+        added_at=datetime.fromtimestamp(info["added_at"]),
+        content=content
+    )
+
 @router.post("/documents")
-async def create_document(document: DocumentCreate):
+async def create_document(document: DocumentCreate, index_service=Depends(get_index)):
     """Adiciona um novo documento"""
     try:
-        document_service.add_document(document.filename, document.content)
+        # Salva o arquivo e gera embeddings apenas para os chunks do novo documento
+        with timed("document_index"):
+            await asyncio.to_thread(index_service.create_document, document.filename, document.content)
         return {"message": "Documento adicionado com sucesso"}
     except Exception as e:
-        print(f"Erro ao criar documento: {str(e)}")  # Debug
+        logger.error(f"Erro ao criar documento: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/documents/{filename}")
-async def delete_document(filename: str):
+async def delete_document(filename: str, index_service=Depends(get_index)):
     """Remove um documento"""
     try:
-        filepath = os.path.join(document_service.documents_dir, filename)
-        if os.path.exists(filepath):
-            os.remove(filepath)
-            # Recarregar documentos
-            document_service._load_documents()
+        # Remove o arquivo e os seus vetores do índice
+        if await asyncio.to_thread(index_service.delete_document, filename):
             return {"message": "Documento removido com sucesso"}
         else:
             raise HTTPException(status_code=404, detail="Documento não encontrado")
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Erro ao excluir documento: {str(e)}")  # Debug
+        logger.error(f"Erro ao excluir documento: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e)) 
@@ -0,0 +1,72 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Optional
+from itertools import islice
+import asyncio
+from backend.db.database import get_db, get_usage_stats, get_usage_series, get_top_questions
+from backend.db.usage_writer import usage_writer
+from backend.db.usage_archive import usage_compactor
+from backend.routers.dependencies import require_admin
+
+
+router = APIRouter()
+
+@router.get("/usage")
+def usage_totals(db: Session = Depends(get_db)):
+    """Totais de requisições e tokens"""
+    try:
+        return get_usage_stats(db)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/usage/series")
+def usage_series(
+    period: str = Query("hour", pattern="^(hour|day)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(168, ge=1, le=5000),
+    db: Session = Depends(get_db)
+):
+    """Requisições e tokens por hora ou por dia (UTC), do mais recente para o mais antigo"""
+    return {"period": period, "series": get_usage_series(db, period, start, end, limit)}
+
+# Como o arquivo, expõe o texto das perguntas dos usuários
+@router.get("/usage/top-questions", dependencies=[Depends(require_admin)])
+def usage_top_questions(limit: int = Query(10, ge=1, le=100), db: Session = Depends(get_db)):
+    """Perguntas mais frequentes (agrupadas sem acentos, caixa e pontuação)"""
+    return {"questions": get_top_questions(db, limit)}
+
+@router.get("/usage/writer")
+async def usage_writer_stats():
+    """Métricas do gravador do log de uso (fila, gravados, descartados)"""
+    return usage_writer.stats()
+
+@router.get("/usage/archive")
+def usage_archive_months():
+    """Meses arquivados pela compactação do log de uso"""
+    return {"compaction": usage_compactor.stats(), "months": usage_compactor.months()}
+
+# Os registros arquivados trazem as perguntas e respostas completas
+@router.get("/usage/archive/{month}", dependencies=[Depends(require_admin)])
+def usage_archive_records(
+    month: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    q: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """Registros arquivados de um mês (AAAA-MM), lidos do arquivo sob demanda"""
+    if month not in {item["month"] for item in usage_compactor.months()}:
+        raise HTTPException(status_code=404, detail="Mês não arquivado")
+    records = usage_compactor.read(month, start, end, q)
+    return {"month": month, "records": list(islice(records, offset, offset + limit))}
+
+@router.post("/usage/compact", dependencies=[Depends(require_admin)])
+async def usage_compact():
+    """Executa a compactação do log de uso imediatamente"""
+    try:
+        return await asyncio.to_thread(usage_compactor.compact)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
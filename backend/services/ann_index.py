@@ -0,0 +1,276 @@
+import os
+import heapq
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+import numpy as np
+from backend.services.vector_index import VectorIndex
+
+
+class IVFIndex:
+    """Índice aproximado (IVF) para bases muito grandes
+
+    Os vetores são agrupados por k-means esférico em nlist listas; cada lista é
+    um VectorIndex. Uma busca compara a query apenas com os centróides e com
+    as nprobe listas mais próximas, e nprobe é o ajuste entre recall e latência.
+    Abaixo de min_size vetores a busca é exata: antes do treinamento em um
+    único VectorIndex e, depois dele, percorrendo todas as listas.
+
+    O treinamento roda fora do lock, sobre uma cópia dos vetores, e o índice
+    atual continua atendendo buscas e alterações enquanto isso; as alterações
+    são registradas e reaplicadas nas novas listas antes da troca. Com
+    auto_train=False, add_many não treina: quem usa o índice sob outro lock
+    consulta needs_training e chama train() depois de liberá-lo.
+    """
+
+    def __init__(self, dimensions: int = None, nlist: int = None, nprobe: int = None, min_size: int = None,
+                 auto_train: bool = True):
+        self.dimensions = dimensions
+        self.nlist = nlist if nlist is not None else int(os.getenv("ANN_NLIST", "0"))  # 0 = automático
+        self.nprobe = nprobe or int(os.getenv("ANN_NPROBE", "8"))
+        self.min_size = min_size or int(os.getenv("ANN_MIN_SIZE", "20000"))
+        self.auto_train = auto_train
+
+        self._flat: Optional[VectorIndex] = VectorIndex(dimensions)
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: List[VectorIndex] = []
+        self._assignment: Dict[str, int] = {}
+        self._trained_size = 0
+        # Alterações feitas durante um treinamento (None quando não há treinamento em andamento)
+        self._pending: Optional[List[Tuple[str, object, object]]] = None
+        # Incrementada por clear(), para descartar um treinamento iniciado antes
+        self._generation = 0
+        self._lock = threading.RLock()
+
+    @property
+    def trained(self) -> bool:
+        return self._centroids is not None
+
+    @property
+    def needs_training(self) -> bool:
+        """Indica se o índice atingiu min_size (ou cresceu 4x desde o treinamento) sem treinamento em andamento"""
+        with self._lock:
+            if self._pending is not None:
+                return False
+            if self._flat is not None:
+                return len(self._flat) >= self.min_size
+            # Retreina quando a base cresce muito além do tamanho usado no treinamento
+            return len(self._assignment) > 4 * self._trained_size
+
+    def __len__(self) -> int:
+        with self._lock:
+            if self._flat is not None:
+                return len(self._flat)
+            return len(self._assignment)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            if self._flat is not None:
+                return key in self._flat
+            return key in self._assignment
+
+    def keys(self) -> List[str]:
+        """Retorna as chaves indexadas"""
+        with self._lock:
+            if self._flat is not None:
+                return self._flat.keys()
+            return list(self._assignment)
+
+    def vectors(self) -> Tuple[List[str], np.ndarray]:
+        """Retorna (chaves, matriz de vetores normalizados)"""
+        with self._lock:
+            if self._flat is not None:
+                return self._flat.vectors()
+            keys, matrices = [], []
+            for inverted_list in self._lists:
+                list_keys, matrix = inverted_list.vectors()
+                keys.extend(list_keys)
+                matrices.append(matrix)
+            return keys, np.concatenate(matrices) if matrices else np.zeros((0, self.dimensions), dtype=np.float32)
+
+    def _auto_nlist(self, size: int) -> int:
+        return self.nlist or max(16, int(4 * np.sqrt(size)))
+
+    @staticmethod
+    def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        """Retorna o centróide mais próximo de cada vetor, em blocos para limitar a memória"""
+        assignment = np.empty(len(vectors), dtype=np.int64)
+        block_size = max(1, 2 ** 24 // max(1, len(centroids)))
+        for start in range(0, len(vectors), block_size):
+            block = vectors[start:start + block_size]
+            assignment[start:start + block_size] = np.argmax(block @ centroids.T, axis=1)
+        return assignment
+
+    @classmethod
+    def _kmeans(cls, vectors: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+        """k-means esférico (similaridade de cosseno) sobre vetores normalizados"""
+        rng = np.random.default_rng(seed)
+        centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = cls._nearest(vectors, centroids)
+            counts = np.bincount(assignment, minlength=k)
+
+            # Soma dos vetores de cada lista (ordenados pela lista)
+            order = np.argsort(assignment, kind="stable")
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            filled = counts > 0
+            sums = np.zeros_like(centroids)
+            sums[filled] = np.add.reduceat(vectors[order], starts[filled], axis=0)
+
+            # Listas vazias recebem um ponto aleatório como novo centróide
+            empty = np.flatnonzero(~filled)
+            if len(empty):
+                sums[empty] = vectors[rng.choice(len(vectors), size=len(empty), replace=False)]
+            centroids = VectorIndex.normalize(sums)
+        return centroids
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        return self._nearest(vectors, self._centroids)
+
+    def _build(self, keys: List[str], vectors: np.ndarray) -> Tuple[np.ndarray, List[VectorIndex], Dict[str, int]]:
+        """Treina os centróides e distribui os vetores nas listas (sem tocar no índice atual)"""
+        nlist = min(self._auto_nlist(len(keys)), len(keys))
+        # Amostra de até 64 pontos por lista, como é usual em IVF
+        sample_size = min(len(keys), nlist * 64)
+        sample = vectors[np.random.default_rng(0).choice(len(keys), size=sample_size, replace=False)]
+        centroids = self._kmeans(sample, nlist)
+
+        assignment = self._nearest(vectors, centroids)
+        lists = [VectorIndex(vectors.shape[1], initial_capacity=8) for _ in range(nlist)]
+        for list_id in range(nlist):
+            members = np.flatnonzero(assignment == list_id)
+            if len(members):
+                lists[list_id].add_many([keys[i] for i in members], vectors[members])
+        return centroids, lists, {key: int(list_id) for key, list_id in zip(keys, assignment)}
+
+    def train(self):
+        """Treina os centróides com os vetores atuais e redistribui o índice nas listas
+
+        Não faz nada se já houver um treinamento em andamento.
+        """
+        with self._lock:
+            if self._pending is not None:
+                return
+            keys, vectors = self.vectors()
+            if not keys:
+                return
+            self._pending = []
+            generation = self._generation
+
+        try:
+            centroids, lists, assignment = self._build(keys, vectors)
+        except BaseException:
+            with self._lock:
+                if generation == self._generation:
+                    self._pending = None
+            raise
+
+        with self._lock:
+            if generation != self._generation:
+                # clear() durante o treinamento: o resultado já não vale
+                return
+            pending, self._pending = self._pending, None
+            self._centroids, self._lists, self._assignment = centroids, lists, assignment
+            self._flat = None
+            self._trained_size = len(keys)
+            for operation, key, vector in pending:
+                if operation == "add":
+                    self._add_to_lists(key, vector)
+                else:
+                    self._remove_from_lists(key)
+
+    def _add_to_lists(self, keys: Sequence[str], vectors: np.ndarray):
+        assignment = self._assign(vectors)
+        for key, vector, list_id in zip(keys, vectors, assignment):
+            previous = self._assignment.get(key)
+            if previous is not None and previous != list_id:
+                self._lists[previous].remove(key)
+            self._lists[list_id].add(key, vector)
+            self._assignment[key] = int(list_id)
+
+    def _remove_from_lists(self, key: str) -> bool:
+        list_id = self._assignment.pop(key, None)
+        if list_id is None:
+            return False
+        return self._lists[list_id].remove(key)
+
+    def add(self, key: str, vector: Sequence[float]):
+        """Adiciona (ou substitui) um vetor no índice"""
+        self.add_many([key], [vector])
+
+    def add_many(self, keys: Sequence[str], vectors: Sequence[Sequence[float]]):
+        """Adiciona vários vetores; com auto_train, o treinamento ocorre ao atingir min_size"""
+        if not keys:
+            return
+        vectors = VectorIndex.normalize(np.asarray(vectors, dtype=np.float32).reshape(len(keys), -1))
+        with self._lock:
+            if self.dimensions is None:
+                self.dimensions = vectors.shape[1]
+            if self._pending is not None:
+                self._pending.append(("add", list(keys), vectors))
+
+            if self._flat is not None:
+                self._flat.add_many(keys, vectors)
+            else:
+                self._add_to_lists(keys, vectors)
+        # Fora do lock: buscas e alterações continuam durante o k-means
+        if self.auto_train and self.needs_training:
+            self.train()
+
+    def remove(self, key: str) -> bool:
+        """Remove um vetor do índice; retorna False se a chave não existir"""
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(("remove", key, None))
+            if self._flat is not None:
+                return self._flat.remove(key)
+            return self._remove_from_lists(key)
+
+    def clear(self):
+        """Remove todos os vetores e descarta o treinamento"""
+        with self._lock:
+            self._generation += 1
+            self._pending = None
+            self._flat = VectorIndex(self.dimensions)
+            self._centroids = None
+            self._lists = []
+            self._assignment = {}
+            self._trained_size = 0
+
+    def search(self, query: Sequence[float], top_k: int = 3, nprobe: int = None) -> List[Tuple[str, float]]:
+        """Retorna as top_k chaves (aproximadamente) mais similares à query"""
+        with self._lock:
+            if self._flat is not None:
+                return self._flat.search(query, top_k)
+            if not self._assignment or top_k <= 0:
+                return []
+
+            query = VectorIndex.normalize(np.asarray(query, dtype=np.float32).reshape(-1))
+            nlist = len(self._lists)
+            nprobe = min(nprobe or self.nprobe, nlist)
+            if len(self._assignment) < self.min_size:
+                # Base pequena: busca exata em todas as listas
+                nprobe = nlist
+
+            centroid_scores = self._centroids @ query
+            if nprobe < nlist:
+                probes = np.argpartition(centroid_scores, -nprobe)[-nprobe:]
+            else:
+                probes = range(nlist)
+
+            candidates = []
+            for list_id in probes:
+                candidates.extend(self._lists[list_id].search(query, top_k))
+            return heapq.nlargest(top_k, candidates, key=lambda item: item[1])
+
+
+def create_vector_index(auto_train: bool = True) -> Union[VectorIndex, IVFIndex]:
+    """Cria o índice definido por INDEX_MODE: "exact" (padrão) ou "ann"
+
+    auto_train é repassado ao IVFIndex (veja IVFIndex.needs_training).
+    """
+    mode = os.getenv("INDEX_MODE", "exact").lower()
+    if mode == "ann":
+        return IVFIndex(auto_train=auto_train)
+    if mode == "exact":
+        return VectorIndex()
+    raise ValueError(f"INDEX_MODE desconhecido: {mode}")
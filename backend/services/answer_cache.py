@@ -0,0 +1,154 @@
+import os
+import re
+import time
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import List, Optional, Sequence
+from backend.models.schemas import DocumentChunk
+from backend.services.vector_index import VectorIndex
+
+
+def normalize_question(question: str) -> str:
+    """Normaliza a pergunta (caixa, acentos, espaços e pontuação final)"""
+    text = unicodedata.normalize("NFKD", question.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.rstrip("?!. ")
+
+
+class CachedAnswer:
+    def __init__(self, answer: str, chunks: List[DocumentChunk], tokens_used: int):
+        self.answer = answer
+        self.chunks = chunks
+        self.tokens_used = tokens_used
+        self.created_at = time.monotonic()
+
+
+class AnswerCache:
+    """Cache de respostas em dois níveis: pergunta normalizada e similaridade semântica
+
+    As entradas expiram por TTL, são limitadas por LRU e descartadas quando a
+    versão da base de documentos muda. A versão (IndexService.corpus_version)
+    só cresce: consultas e respostas de uma versão anterior à atual, de
+    requisições que começaram antes da mudança, são ignoradas.
+    """
+
+    def __init__(self, max_entries: int = None, ttl: float = None, similarity_threshold: float = None):
+        self.enabled = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+        self.max_entries = max_entries if max_entries is not None else int(
+            os.getenv("ANSWER_CACHE_MAX_ENTRIES", "512")
+        )
+        self.ttl = ttl if ttl is not None else float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+        self.similarity_threshold = similarity_threshold if similarity_threshold is not None else float(
+            os.getenv("ANSWER_CACHE_SIMILARITY", "0.95")
+        )
+
+        self._entries: "OrderedDict[str, CachedAnswer]" = OrderedDict()
+        # Embeddings das perguntas em cache, para o nível semântico
+        self._index = VectorIndex()
+        self._corpus_version = None
+        self._lock = threading.Lock()
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def _check_version(self, corpus_version) -> bool:
+        """Avança para a versão informada; retorna False se ela é anterior à atual"""
+        if self._corpus_version is not None and corpus_version < self._corpus_version:
+            return False
+        # Qualquer mudança nos documentos invalida todas as respostas
+        if corpus_version != self._corpus_version:
+            self._entries.clear()
+            # Novo índice: a dimensão dos embeddings muda quando o índice é reindexado
+            self._index = VectorIndex()
+            self._corpus_version = corpus_version
+        return True
+
+    def _get_fresh(self, key: str) -> Optional[CachedAnswer]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.created_at > self.ttl:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _remove(self, key: str):
+        self._entries.pop(key, None)
+        self._index.remove(key)
+
+    def get_exact(self, question: str, corpus_version) -> Optional[CachedAnswer]:
+        """Busca pela pergunta normalizada (sem precisar de embedding)
+
+        Conta um miss quando não encontra; se get_similar encontrar a pergunta
+        em seguida, o miss vira um acerto semântico.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._get_fresh(normalize_question(question)) if self._check_version(corpus_version) else None
+            if entry is not None:
+                self.exact_hits += 1
+            else:
+                self.misses += 1
+            return entry
+
+    def get_similar(self, embedding: Sequence[float], corpus_version) -> Optional[CachedAnswer]:
+        """Busca a pergunta em cache mais similar, acima do limiar configurado
+
+        Consultada depois de get_exact não encontrar a mesma pergunta, que já
+        contou o miss.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            if not self._check_version(corpus_version):
+                return None
+            for key, score in self._index.search(embedding, top_k=1):
+                if score >= self.similarity_threshold:
+                    entry = self._get_fresh(key)
+                    if entry is not None:
+                        self.semantic_hits += 1
+                        self.misses = max(self.misses - 1, 0)
+                        return entry
+            return None
+
+    def put(self, question: str, embedding: Optional[Sequence[float]], answer: str,
+            chunks: List[DocumentChunk], tokens_used: int, corpus_version):
+        """Armazena uma resposta gerada; respostas de uma versão anterior da base são descartadas"""
+        if not self.enabled:
+            return
+        key = normalize_question(question)
+        with self._lock:
+            if not self._check_version(corpus_version):
+                return
+            self._entries[key] = CachedAnswer(answer, chunks, tokens_used)
+            self._entries.move_to_end(key)
+            if embedding is not None:
+                self._index.add(key, embedding)
+            while len(self._entries) > self.max_entries:
+                oldest, _ = self._entries.popitem(last=False)
+                self._index.remove(oldest)
+
+    def clear(self):
+        """Remove todas as respostas em cache"""
+        with self._lock:
+            self._entries.clear()
+            self._index.clear()
+
+    def stats(self) -> dict:
+        """Retorna métricas de acerto do cache"""
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            hits = self.exact_hits + self.semantic_hits
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups > 0 else 0
+            }
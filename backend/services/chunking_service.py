@@ -0,0 +1,85 @@
+import os
+import re
+from typing import List, Tuple
+from backend.models.schemas import DocumentChunk
+
+# Fim de frase (pontuação seguida de espaço) ou quebra de linha
+_SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?…])\s+|\n+')
+
+
+class ChunkingService:
+    """Divide documentos em chunks com sobreposição, respeitando frases quando possível"""
+
+    def __init__(self, chunk_size: int = None, chunk_overlap: int = None):
+        self.chunk_size = chunk_size if chunk_size is not None else int(os.getenv("CHUNK_SIZE", "1000"))
+        if chunk_overlap is None:
+            chunk_overlap = int(os.getenv("CHUNK_OVERLAP", "200"))
+        if self.chunk_size <= 0:
+            raise ValueError("CHUNK_SIZE deve ser maior que zero")
+        if not 0 <= chunk_overlap < self.chunk_size:
+            raise ValueError("CHUNK_OVERLAP deve estar entre 0 e CHUNK_SIZE")
+        self.chunk_overlap = chunk_overlap
+
+    def _sentence_spans(self, text: str) -> List[Tuple[int, int]]:
+        """Retorna os intervalos (início, fim) de cada frase do texto"""
+        spans = []
+        start = 0
+        for match in _SENTENCE_BOUNDARY.finditer(text):
+            if match.start() > start:
+                spans.append((start, match.start()))
+            start = match.end()
+        if start < len(text):
+            spans.append((start, len(text)))
+
+        # Frases maiores que o chunk são quebradas em janelas de tamanho fixo
+        result = []
+        for start, end in spans:
+            result.extend(self._split_long_span(text, start, end))
+        return result
+
+    def _split_long_span(self, text: str, start: int, end: int) -> List[Tuple[int, int]]:
+        if end - start <= self.chunk_size:
+            return [(start, end)]
+
+        windows = []
+        step = self.chunk_size - self.chunk_overlap
+        while start < end:
+            stop = min(start + self.chunk_size, end)
+            # Evita cortar palavras no meio, se houver espaço no final da janela
+            if stop < end:
+                space = text.rfind(" ", start + step, stop)
+                if space > start:
+                    stop = space
+            windows.append((start, stop))
+            if stop >= end:
+                break
+            next_start = max(stop - self.chunk_overlap, start + 1)
+            # A sobreposição também começa no início de uma palavra
+            space = text.find(" ", next_start, stop)
+            start = space + 1 if space != -1 else next_start
+            while start < end and text[start].isspace():
+                start += 1
+        return windows
+
+    def split(self, filename: str, text: str) -> List[DocumentChunk]:
+        """Divide um documento em chunks com offsets de caracteres"""
+        spans = self._sentence_spans(text)
+        chunks = []
+        i = 0
+        while i < len(spans):
+            start, end = spans[i]
+            j = i
+            # Agrupa frases consecutivas enquanto couberem no chunk
+            while j + 1 < len(spans) and spans[j + 1][1] - start <= self.chunk_size:
+                j += 1
+                end = spans[j][1]
+            chunks.append(DocumentChunk(filename=filename, text=text[start:end], start=start, end=end))
+            if j + 1 >= len(spans):
+                break
+
+            # O próximo chunk começa repetindo as últimas frases que cabem na sobreposição
+            k = j + 1
+            while k - 1 > i and end - spans[k - 1][0] <= self.chunk_overlap:
+                k -= 1
+            i = k
+        return chunks
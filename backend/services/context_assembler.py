@@ -0,0 +1,67 @@
+import os
+from typing import List, Optional, Tuple
+from backend.models.schemas import DocumentChunk
+from backend.services.chunking_service import _SENTENCE_BOUNDARY
+from backend.services.tokenizer import count_tokens
+
+
+class ContextAssembler:
+    """Monta o contexto do prompt dentro de um orçamento de tokens
+
+    Os chunks entram em ordem de relevância enquanto couberem em
+    CONTEXT_MAX_TOKENS; o primeiro que não couber é cortado no fim da última
+    frase que cabe, e os demais são descartados.
+    """
+
+    def __init__(self, max_tokens: int = None, model: str = None, separator: str = "\n"):
+        self.max_tokens = max_tokens or int(os.getenv("CONTEXT_MAX_TOKENS", "1500"))
+        self.model = model
+        self.separator = separator
+
+    def _count(self, text: str) -> int:
+        return count_tokens(text, self.model)
+
+    def _trim(self, chunk: DocumentChunk, budget: int, cut_words: bool) -> Optional[DocumentChunk]:
+        """Retorna o chunk cortado em fim de frase (ou de palavra) para caber no orçamento"""
+        ends = [match.start() for match in _SENTENCE_BOUNDARY.finditer(chunk.text)]
+        if cut_words:
+            # Nenhuma frase inteira coube: corta em fim de palavra
+            ends = [i for i, char in enumerate(chunk.text) if char.isspace()]
+
+        # Busca binária pelo maior prefixo que cabe (a contagem cresce com o prefixo)
+        text = None
+        low, high = 0, len(ends) - 1
+        while low <= high:
+            middle = (low + high) // 2
+            candidate = chunk.text[:ends[middle]].rstrip()
+            if self._count(candidate) <= budget:
+                text = candidate or None
+                low = middle + 1
+            else:
+                high = middle - 1
+        if text is None:
+            return None
+        return chunk.model_copy(update={"text": text, "end": chunk.start + len(text)})
+
+    def assemble(self, chunks: List[DocumentChunk]) -> Tuple[str, List[DocumentChunk]]:
+        """Retorna (contexto, chunks usados, possivelmente cortados)"""
+        used: List[DocumentChunk] = []
+        remaining = self.max_tokens
+        separator_tokens = self._count(self.separator)
+
+        for chunk in chunks:
+            cost = self._count(chunk.text) + (separator_tokens if used else 0)
+            if cost <= remaining:
+                used.append(chunk)
+                remaining -= cost
+                continue
+
+            budget = remaining - (separator_tokens if used else 0)
+            trimmed = self._trim(chunk, budget, cut_words=False)
+            if trimmed is None and not used:
+                trimmed = self._trim(chunk, budget, cut_words=True)
+            if trimmed is not None:
+                used.append(trimmed)
+            break
+
+        return self.separator.join(chunk.text for chunk in used), used
@@ -1,10 +1,18 @@
 import os
-from typing import List, Dict
+import hashlib
+import threading
+from typing import List, Dict, Optional, Tuple
 import json
+from backend.services.embedding_store import content_hash
+from backend.services.observability import get_logger
+
+logger = get_logger(__name__)
 
 class DocumentService:
     def __init__(self, documents_dir: str = None):
         # Definir o caminho absoluto para o diretório de documentos
+        if documents_dir is None:
+            documents_dir = os.getenv("DOCUMENTS_DIR")
         if documents_dir is None:
             # Obter o diretório do arquivo atual
             current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -12,50 +20,157 @@ class DocumentService:
             self.documents_dir = os.path.abspath(os.path.join(current_dir, '..', '..', 'documents'))
         else:
             self.documents_dir = os.path.abspath(documents_dir)
-            
-        print(f"Diretório de documentos: {self.documents_dir}")  # Debug
+
+        logger.info(f"Diretório de documentos: {self.documents_dir}")
         self.documents: Dict[str, str] = {}
+        # (mtime, tamanho) de cada arquivo carregado, para detectar alterações no disco
+        self._file_stats: Dict[str, Tuple[int, int]] = {}
+        # Metadados da listagem: {arquivo: (tamanho em bytes, hash do conteúdo, data de criação)}
+        self._file_info: Dict[str, Tuple[int, str, float]] = {}
+        self._listing: Optional[List[Dict]] = None
+        self._listing_etag: Optional[str] = None
+        self._lock = threading.RLock()
         self._load_documents()
-    
+
     def _load_documents(self):
         """Carrega todos os documentos do diretório"""
-        if not os.path.exists(self.documents_dir):
-            print(f"Criando diretório: {self.documents_dir}")  # Debug
-            os.makedirs(self.documents_dir)
-        
-        # Carregar todos os documentos do diretório
-        print(f"Procurando documentos em: {self.documents_dir}")  # Debug
-        for filename in os.listdir(self.documents_dir):
-            if filename.endswith('.txt'):
-                filepath = os.path.join(self.documents_dir, filename)
-                print(f"Carregando documento: {filepath}")  # Debug
-                try:
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        self.documents[filename] = f.read()
-                except Exception as e:
-                    print(f"Erro ao carregar {filepath}: {str(e)}")  # Debug
-        
-        print(f"Total de documentos carregados: {len(self.documents)}")  # Debug
-    
+        self.refresh()
+
+    def refresh(self) -> Tuple[Dict[str, str], List[str]]:
+        """Relê apenas os arquivos novos ou alterados (por mtime/tamanho)
+
+        Retorna ({arquivo: conteúdo} dos documentos novos ou alterados, arquivos removidos).
+        """
+        with self._lock:
+            if not os.path.exists(self.documents_dir):
+                logger.debug(f"Criando diretório: {self.documents_dir}")
+                os.makedirs(self.documents_dir)
+
+            changed: Dict[str, str] = {}
+            seen = set()
+            with os.scandir(self.documents_dir) as entries:
+                for entry in entries:
+                    if not entry.name.endswith('.txt') or not entry.is_file():
+                        continue
+                    seen.add(entry.name)
+                    stat = entry.stat()
+                    file_stat = (stat.st_mtime_ns, stat.st_size)
+                    if self._file_stats.get(entry.name) == file_stat:
+                        continue
+
+                    logger.debug(f"Carregando documento: {entry.path}")
+                    try:
+                        with open(entry.path, 'r', encoding='utf-8') as f:
+                            content = f.read()
+                    except Exception as e:
+                        logger.error(f"Erro ao carregar {entry.path}: {str(e)}")
+                        continue
+                    # Sem estado anterior (arquivo novo ou esquecido com forget), o
+                    # documento é devolvido mesmo que o conteúdo já esteja em memória
+                    known = entry.name in self._file_stats
+                    self._file_stats[entry.name] = file_stat
+                    self._set_info(entry.name, content, stat)
+                    if not known or self.documents.get(entry.name) != content:
+                        self.documents[entry.name] = content
+                        changed[entry.name] = content
+
+            removed = [filename for filename in self.documents if filename not in seen]
+            for filename in removed:
+                del self.documents[filename]
+                self._file_stats.pop(filename, None)
+                self._set_info(filename, None)
+
+            if changed or removed:
+                logger.info(f"Total de documentos carregados: {len(self.documents)}")
+            return changed, removed
+
+    def _set_info(self, filename: str, content: Optional[str], stat: os.stat_result = None):
+        """Atualiza os metadados de um arquivo (content None = removido) e invalida a listagem"""
+        if content is None:
+            self._file_info.pop(filename, None)
+        else:
+            self._file_info[filename] = (stat.st_size, content_hash(content), stat.st_ctime)
+        self._listing = None
+        self._listing_etag = None
+
+    def list_documents(self) -> Tuple[List[Dict], str]:
+        """Retorna os metadados dos documentos, ordenados pelo nome, e um ETag da listagem
+
+        A listagem e o ETag só são recalculados quando algum arquivo muda.
+        """
+        with self._lock:
+            if self._listing is None:
+                self._listing = [
+                    {"filename": filename, "size": size, "hash": file_hash, "added_at": added_at}
+                    for filename, (size, file_hash, added_at) in sorted(self._file_info.items())
+                ]
+                digest = hashlib.sha256()
+                for item in self._listing:
+                    digest.update(f"{item['filename']}\0{item['hash']}\0{item['added_at']}\n".encode("utf-8"))
+                self._listing_etag = digest.hexdigest()[:32]
+            return self._listing, self._listing_etag
+
+    def get_document(self, filename: str) -> Optional[Tuple[str, Dict]]:
+        """Retorna (conteúdo, metadados) de um documento, ou None se ele não existir"""
+        with self._lock:
+            content = self.documents.get(filename)
+            info = self._file_info.get(filename)
+            if content is None or info is None:
+                return None
+            size, file_hash, added_at = info
+            return content, {"filename": filename, "size": size, "hash": file_hash, "added_at": added_at}
+
     def get_all_documents(self) -> List[str]:
         """Retorna o conteúdo de todos os documentos"""
         # Recarregar documentos para garantir lista atualizada
         self._load_documents()
         return list(self.documents.values())
-    
-    def add_document(self, filename: str, content: str):
-        """Adiciona um novo documento"""
+
+    def get_documents(self) -> Dict[str, str]:
+        """Retorna {nome do arquivo: conteúdo} de todos os documentos"""
+        self._load_documents()
+        return dict(self.documents)
+
+    def add_document(self, filename: str, content: str) -> str:
+        """Adiciona um novo documento e retorna o nome do arquivo salvo"""
         if not filename.endswith('.txt'):
             filename += '.txt'
-        
+
         filepath = os.path.join(self.documents_dir, filename)
-        print(f"Salvando documento em: {filepath}")  # Debug
-        
+        logger.debug(f"Salvando documento em: {filepath}")
+
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(content)
-            self.documents[filename] = content
-            print(f"Documento salvo com sucesso: {filename}")  # Debug
+            with self._lock:
+                with open(filepath, 'w', encoding='utf-8') as f:
+                    f.write(content)
+                self.documents[filename] = content
+                stat = os.stat(filepath)
+                self._file_stats[filename] = (stat.st_mtime_ns, stat.st_size)
+                self._set_info(filename, content, stat)
+            logger.info(f"Documento salvo com sucesso: {filename}")
+            return filename
         except Exception as e:
-            print(f"Erro ao salvar documento {filename}: {str(e)}")  # Debug
-            raise 
\ No newline at end of file
+            logger.error(f"Erro ao salvar documento {filename}: {str(e)}")
+            raise
+
+    def forget(self, filenames):
+        """Descarta o estado (mtime/tamanho) dos arquivos, para que o próximo refresh os devolva
+
+        Usado quando a indexação falha: o arquivo continua no disco e volta a
+        ser oferecido ao índice na próxima sincronização.
+        """
+        with self._lock:
+            for filename in filenames:
+                self._file_stats.pop(filename, None)
+
+    def delete_document(self, filename: str) -> bool:
+        """Remove um documento; retorna False se ele não existir"""
+        filepath = os.path.join(self.documents_dir, filename)
+        with self._lock:
+            if not os.path.exists(filepath):
+                return False
+            os.remove(filepath)
+            self.documents.pop(filename, None)
+            self._file_stats.pop(filename, None)
+            self._set_info(filename, None)
+            return True
@@ -0,0 +1,116 @@
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Iterable
+import numpy as np
+
+
+def content_hash(text: str) -> str:
+    """Retorna o hash SHA-256 do conteúdo de um texto"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """Armazena embeddings em disco, indexados pelo hash do conteúdo e pelo modelo"""
+
+    def __init__(self, db_path: str = None):
+        if db_path is None:
+            db_path = os.getenv("EMBEDDING_STORE_PATH")
+        if db_path is None:
+            current_dir = os.path.dirname(os.path.abspath(__file__))
+            db_path = os.path.join(current_dir, '..', 'db', 'embeddings.db')
+        self.db_path = os.path.abspath(db_path)
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+
+        # Uma única conexão protegida por lock (FastAPI usa várias threads)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                content_hash TEXT NOT NULL,
+                model TEXT NOT NULL,
+                dimensions INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (content_hash, model)
+            )
+            """
+        )
+        # Metadados do índice (por exemplo, o modelo e a dimensão dos vetores indexados)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, text: str, model: str) -> Optional[np.ndarray]:
+        """Retorna o embedding armazenado para o texto, se existir"""
+        return self.get_many([text], model).get(content_hash(text))
+
+    def get_many(self, texts: Iterable[str], model: str) -> Dict[str, np.ndarray]:
+        """Retorna {hash: embedding float32} para os textos já armazenados"""
+        return self.get_by_hashes({content_hash(text) for text in texts}, model)
+
+    def get_by_hashes(self, hashes: Iterable[str], model: str) -> Dict[str, np.ndarray]:
+        """Retorna {hash: embedding float32} para os hashes de conteúdo já armazenados"""
+        hashes = list(set(hashes))
+        found: Dict[str, np.ndarray] = {}
+        if not hashes:
+            return found
+
+        with self._lock:
+            # SQLite limita a quantidade de parâmetros por consulta
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                placeholders = ",".join("?" for _ in batch)
+                rows = self._conn.execute(
+                    f"SELECT content_hash, vector FROM embeddings "
+                    f"WHERE model = ? AND content_hash IN ({placeholders})",
+                    [model, *batch]
+                ).fetchall()
+                for key, blob in rows:
+                    # Sem converter para lista: um float Python ocupa ~8x mais que um float32
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put(self, text: str, model: str, embedding: List[float]):
+        """Armazena o embedding de um texto"""
+        self.put_many({content_hash(text): embedding}, model)
+
+    def put_many(self, embeddings: Dict[str, List[float]], model: str):
+        """Armazena vários embeddings ({hash: embedding}) em uma única transação"""
+        if not embeddings:
+            return
+        rows = []
+        for key, embedding in embeddings.items():
+            vector = np.asarray(embedding, dtype=np.float32)
+            rows.append((key, model, int(vector.shape[0]), vector.tobytes()))
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (content_hash, model, dimensions, vector) "
+                "VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def count(self) -> int:
+        """Retorna a quantidade de embeddings armazenados"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_metadata(self, key: str) -> Optional[Any]:
+        """Retorna um valor dos metadados, se existir"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM metadata WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set_metadata(self, key: str, value: Any):
+        """Grava um valor (serializável em JSON) nos metadados"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)",
+                (key, json.dumps(value))
+            )
+            self._conn.commit()
@@ -0,0 +1,544 @@
+import os
+import time
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+from backend.services.openai_service import OpenAIService
+from backend.services.providers import create_embedding_provider
+from backend.services.document_service import DocumentService
+from backend.services.chunking_service import ChunkingService
+from backend.services.embedding_store import EmbeddingStore, content_hash
+from backend.services.ann_index import IVFIndex, create_vector_index
+from backend.services.lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+from backend.services.near_duplicates import SimHashIndex, simhash
+from backend.services.vector_snapshot import MappedVectorIndex, QUANTIZATIONS, read_manifest, save_snapshot
+from backend.models.schemas import DocumentChunk
+from backend.services.observability import get_logger
+
+logger = get_logger(__name__)
+
+# Chave dos metadados com a configuração de embeddings do índice
+INDEX_EMBEDDING_METADATA = "index_embedding"
+
+
+class IndexService:
+    """Mantém o índice vetorial sincronizado com os documentos
+
+    É a única instância compartilhada pelo chat e pelas rotas de documentos:
+    inclusões e remoções pela API atualizam o índice diretamente, e alterações
+    feitas no disco são detectadas por mtime/tamanho a cada INDEX_SYNC_INTERVAL
+    segundos, sem reler arquivos a cada pergunta.
+
+    Com VECTOR_QUANTIZATION (float32, float16 ou int8) e busca exata, os
+    vetores são gravados em um snapshot mapeado em memória, compartilhado
+    pelos workers e reaproveitado na inicialização.
+
+    Chunks idênticos, no mesmo documento ou em documentos diferentes,
+    compartilham um único vetor, identificado pelo hash do texto. Com
+    NEAR_DUPLICATE_DISTANCE > 0, chunks quase idênticos (SimHash) também.
+
+    O modelo e a dimensão dos embeddings (EMBEDDING_DIMENSIONS) ficam nos
+    metadados do índice. Quando a configuração muda, o índice anterior
+    continua atendendo, com as perguntas vetorizadas na configuração antiga,
+    enquanto o novo é gerado em segundo plano.
+
+    Na inicialização, os documentos do disco são indexados em lotes, e
+    progress(documentos indexados, total de documentos, vetores) informa o
+    andamento a cada lote.
+    """
+
+    def __init__(self, openai_service: OpenAIService = None, document_service: DocumentService = None,
+                 progress: Callable[[int, int, int], None] = None):
+        self.openai_service = openai_service or OpenAIService()
+        self.document_service = document_service or DocumentService()
+        self.chunking_service = ChunkingService()
+        self.embedding_store = EmbeddingStore()
+
+        self.quantization = os.getenv("VECTOR_QUANTIZATION", "none").lower()
+        if self.quantization != "none" and self.quantization not in QUANTIZATIONS:
+            raise ValueError(f"VECTOR_QUANTIZATION desconhecida: {self.quantization}")
+        if os.getenv("INDEX_MODE", "exact").lower() != "exact":
+            self.quantization = "none"
+        self.snapshot_path = os.getenv("VECTOR_SNAPSHOT_PATH")
+        if self.snapshot_path is None:
+            current_dir = os.path.dirname(os.path.abspath(__file__))
+            self.snapshot_path = os.path.abspath(os.path.join(current_dir, '..', 'db', 'vectors'))
+        self.snapshot_interval = float(os.getenv("VECTOR_SNAPSHOT_INTERVAL", "60"))
+
+        # Chunks indexados, pelo id do chunk
+        self.chunks: Dict[str, DocumentChunk] = {}
+        # Vetores compartilhados: {chave do vetor: ids dos chunks}, {id do chunk: chave do vetor};
+        # o primeiro chunk de cada chave é o que aparece nos resultados
+        self._key_chunks: Dict[str, List[str]] = {}
+        self._chunk_keys: Dict[str, str] = {}
+        # Texto a partir do qual cada vetor foi gerado
+        self._key_texts: Dict[str, str] = {}
+        self.near_duplicates = SimHashIndex()
+        # Índice lexical (BM25) dos mesmos vetores, para a busca híbrida
+        self.lexical_index = BM25Index()
+        self.hybrid_candidates = int(os.getenv("HYBRID_CANDIDATES", "20"))
+        self.lexical_shortcut_max_terms = int(os.getenv("LEXICAL_SHORTCUT_MAX_TERMS", "3"))
+        # Fração máxima dos chunks em que o termo raro pode aparecer (equivale a um IDF mínimo)
+        self.lexical_shortcut_max_df = float(os.getenv("LEXICAL_SHORTCUT_MAX_DF", "0.02"))
+        # Tamanho mínimo da base, em múltiplos de top_k, para usar o atalho
+        self.lexical_shortcut_min_corpus = int(os.getenv("LEXICAL_SHORTCUT_MIN_CORPUS", "10"))
+        # Documentos indexados: {nome do arquivo: (hash do conteúdo, ids dos chunks)}
+        self.indexed_documents: Dict[str, Tuple[str, List[str]]] = {}
+        # Incrementada a cada mudança no índice; invalida o cache de respostas
+        self.corpus_version = 0
+        self._snapshot_version = None
+        self._last_snapshot = 0.0
+
+        # Serviço que gera os embeddings do índice e das perguntas; difere de
+        # openai_service apenas enquanto uma reindexação está em andamento
+        self.embedder = self.openai_service
+        self._reindex_target = self._check_embedding_config()
+
+        # Snapshot mapeado em memória ou, sem ele, busca exata (padrão) ou
+        # aproximada (INDEX_MODE=ann) para bases muito grandes
+        snapshot_index = self._load_snapshot()
+        # (o IVF é treinado fora do lock do serviço, em _train_index)
+        self.index = snapshot_index if snapshot_index is not None else create_vector_index(auto_train=False)
+
+        self.sync_interval = float(os.getenv("INDEX_SYNC_INTERVAL", "5"))
+        self._last_sync = 0.0
+        # Protege o índice; as buscas não esperam pela geração de embeddings
+        self._lock = threading.RLock()
+        # Serializa as sincronizações com o disco
+        self._sync_lock = threading.Lock()
+
+        self._load_documents(progress)
+        self._drop_stale_vectors()
+        self._last_sync = time.monotonic()
+        self.persist(force=True)
+
+        if self._reindex_target is not None:
+            threading.Thread(target=self._reindex, args=(self._reindex_target,), daemon=True).start()
+        else:
+            self.embedding_store.set_metadata(INDEX_EMBEDDING_METADATA, self.embedder.embedding_provider.config)
+
+    def _load_documents(self, progress: Callable[[int, int, int], None] = None):
+        """Indexa os documentos do disco em lotes de INDEX_LOAD_BATCH_SIZE, informando o andamento"""
+        documents = self.document_service.get_documents()
+        filenames = list(documents)
+        batch_size = max(1, int(os.getenv("INDEX_LOAD_BATCH_SIZE", "200")))
+        if progress:
+            progress(0, len(filenames), len(self.index))
+        for start in range(0, len(filenames), batch_size):
+            batch = filenames[start:start + batch_size]
+            self.add_documents({filename: documents[filename] for filename in batch})
+            if progress:
+                progress(start + len(batch), len(filenames), len(self.index))
+
+    @property
+    def reindexing(self) -> bool:
+        """Indica se o índice está sendo regerado com uma nova configuração de embeddings"""
+        return self._reindex_target is not None
+
+    def _check_embedding_config(self) -> Optional[OpenAIService]:
+        """Compara a configuração de embeddings atual com a registrada no índice
+
+        Se ela mudou, passa a usar a configuração anterior e retorna o serviço
+        com a nova, que será usado pela reindexação em segundo plano.
+        """
+        previous = self.embedding_store.get_metadata(INDEX_EMBEDDING_METADATA)
+        current = self.openai_service.embedding_provider.config
+        if not previous or previous == current:
+            return None
+        if os.getenv("REINDEX_IN_BACKGROUND", "true").lower() not in ("1", "true", "yes"):
+            return None
+        try:
+            provider = create_embedding_provider(**previous)
+        except Exception as e:
+            logger.warning(f"Configuração de embeddings anterior indisponível ({str(e)}); reindexando agora")
+            return None
+
+        logger.warning(f"Configuração de embeddings alterada de {previous} para {current}; "
+                       f"reindexando em segundo plano")
+        self.embedder = OpenAIService(embedding_provider=provider, chat_provider=self.openai_service.chat_provider)
+        return self.openai_service
+
+    def _reindex(self, target: OpenAIService):
+        """Gera o índice com a nova configuração de embeddings e o troca pelo atual"""
+        try:
+            while True:
+                with self._lock:
+                    version = self.corpus_version
+                    keys = list(self._key_texts)
+                    texts = [self._key_texts[key] for key in keys]
+
+                stored = self._embed_texts(list(dict.fromkeys(texts)), target)
+                index = create_vector_index(auto_train=False)
+                index.add_many(keys, [stored[content_hash(text)] for text in texts])
+                self._train_index(index)
+
+                with self._lock:
+                    # A base mudou durante a geração: refaz, reaproveitando os embeddings já armazenados
+                    if self.corpus_version != version:
+                        continue
+                    self.index = index
+                    self.embedder = target
+                    self._reindex_target = None
+                    self.corpus_version += 1
+                    break
+
+            self.embedding_store.set_metadata(INDEX_EMBEDDING_METADATA, target.embedding_provider.config)
+            logger.info(f"Reindexação concluída: {len(index)} vetores ({target.embeddings_key})")
+            self.persist(force=True)
+        except Exception as e:
+            logger.error(f"Erro na reindexação em segundo plano: {str(e)}")
+
+    def sync_due(self) -> bool:
+        """Indica se já passou o intervalo para verificar alterações no disco"""
+        return time.monotonic() - self._last_sync >= self.sync_interval
+
+    def sync(self, force: bool = False):
+        """Aplica ao índice as alterações feitas diretamente no diretório de documentos"""
+        if not force and not self.sync_due():
+            return
+        with self._sync_lock:
+            if not force and not self.sync_due():
+                return
+            try:
+                changed, removed = self.document_service.refresh()
+                for filename in removed:
+                    self.remove_document(filename)
+                try:
+                    self.add_documents(changed)
+                except Exception:
+                    # Os arquivos continuam no disco: a próxima sincronização tenta de novo
+                    self.document_service.forget(changed)
+                    raise
+            finally:
+                self._last_sync = time.monotonic()
+        self.persist()
+
+    def _load_snapshot(self):
+        """Carrega o snapshot dos vetores, se ele for compatível com a configuração atual"""
+        if self.quantization == "none":
+            return None
+        manifest = read_manifest(self.snapshot_path)
+        if (manifest is None
+                or manifest.get("model") != self.embedder.embeddings_key
+                or manifest.get("quantization") != self.quantization):
+            return None
+        try:
+            index = self._mapped_index(manifest)
+        except (OSError, ValueError) as e:
+            logger.error(f"Erro ao carregar snapshot de vetores: {str(e)}")
+            return None
+        logger.info(f"Snapshot de vetores carregado: {len(index)} vetores ({self.quantization})")
+        self._snapshot_version = self.corpus_version
+        return index
+
+    def _mapped_index(self, manifest: Dict) -> MappedVectorIndex:
+        """Índice sobre o snapshot; o int8 reordena os candidatos com os vetores exatos do EmbeddingStore"""
+        model = manifest.get("model")
+        return MappedVectorIndex(self.snapshot_path, manifest,
+                                 exact_vectors=lambda keys: self.embedding_store.get_by_hashes(keys, model))
+
+    def _drop_stale_vectors(self):
+        """Remove do índice vetores do snapshot que nenhum chunk usa mais"""
+        with self._lock:
+            stale = [key for key in self.index.keys() if key not in self._key_chunks]
+            for key in stale:
+                self.index.remove(key)
+            if stale:
+                self.corpus_version += 1
+
+    def persist(self, force: bool = False):
+        """Grava o snapshot dos vetores se houve alterações
+
+        Fora da inicialização, grava no máximo a cada VECTOR_SNAPSHOT_INTERVAL
+        segundos. A gravação ocorre fora do lock, sem bloquear as buscas.
+        """
+        if self.quantization == "none":
+            return
+        if not force and time.monotonic() - self._last_snapshot < self.snapshot_interval:
+            return
+        with self._lock:
+            if self._snapshot_version == self.corpus_version:
+                return
+            version = self.corpus_version
+            embeddings_key = self.embedder.embeddings_key
+            keys, matrix = self.index.vectors()
+            if not keys:
+                return
+
+        manifest = save_snapshot(self.snapshot_path, keys, matrix, self.quantization, {"model": embeddings_key})
+        self._last_snapshot = time.monotonic()
+
+        with self._lock:
+            # Alterações feitas durante a gravação entram no próximo snapshot
+            if self.corpus_version == version:
+                self.index = self._mapped_index(manifest)
+                self._snapshot_version = version
+
+    def add_document(self, filename: str, text: str):
+        """Divide o documento em chunks e os adiciona ao índice"""
+        self.add_documents({filename: text})
+
+    def add_documents(self, documents: Dict[str, str]):
+        """Adiciona vários documentos, gerando os embeddings que faltam em lote"""
+        documents = {
+            filename: text for filename, text in documents.items()
+            if self.indexed_documents.get(filename, (None,))[0] != content_hash(text)
+        }
+        if not documents:
+            return
+
+        chunks_by_file = {
+            filename: self.chunking_service.split(filename, text)
+            for filename, text in documents.items()
+        }
+        fingerprints: Dict[str, Optional[int]] = {}
+        if self.near_duplicates.enabled:
+            fingerprints = {
+                content_hash(chunk.text): simhash(chunk.text)
+                for chunks in chunks_by_file.values() for chunk in chunks
+            }
+        # Só os textos sem vetor no índice (inclusive o do snapshot) precisam de embeddings
+        with self._lock:
+            texts = list(dict.fromkeys(
+                chunk.text for chunks in chunks_by_file.values() for chunk in chunks
+                if not self._vector_key(chunk.text, fingerprints)[1]
+            ))
+
+        embedder = self.embedder
+        stored = self._embed_texts(texts, embedder)
+
+        with self._lock:
+            added = self.embedder is embedder and self._add_chunks(documents, chunks_by_file, stored, fingerprints)
+        if added:
+            self._train_index()
+            return
+        # A reindexação trocou a configuração de embeddings, ou um chunk quase
+        # idêntico foi removido, durante a geração
+        self.add_documents(documents)
+
+    def _train_index(self, index=None):
+        """Treina o índice aproximado, se ele pedir, sem o lock: as buscas continuam durante o k-means"""
+        index = index if index is not None else self.index
+        if isinstance(index, IVFIndex) and index.needs_training:
+            index.train()
+
+    def _embed_texts(self, texts: List[str], embedder: OpenAIService) -> Dict[str, List[float]]:
+        """Retorna {hash: embedding}; apenas textos sem embedding armazenado vão para a API, em lotes"""
+        key = embedder.embeddings_key
+        stored = self.embedding_store.get_many(texts, key)
+        missing = [text for text in texts if content_hash(text) not in stored]
+        if missing:
+            embeddings = embedder.get_embeddings(missing)
+            new_embeddings = {content_hash(text): embedding for text, embedding in zip(missing, embeddings)}
+            self.embedding_store.put_many(new_embeddings, key)
+            stored.update(new_embeddings)
+        return stored
+
+    def _vector_key(self, text: str, fingerprints: Dict[str, Optional[int]]) -> Tuple[str, bool]:
+        """Chave do vetor de um chunk: o hash do texto ou a de um chunk quase idêntico
+
+        Retorna (chave, se o vetor já está no índice).
+        """
+        key = content_hash(text)
+        if key in self._key_chunks or key in self.index:
+            return key, True
+        near = self.near_duplicates.find(fingerprints.get(key))
+        if near is not None:
+            return near, True
+        return key, False
+
+    def _add_chunks(self, documents: Dict[str, str], chunks_by_file: Dict[str, List[DocumentChunk]],
+                    stored: Dict[str, List[float]], fingerprints: Dict[str, Optional[int]]) -> bool:
+        """Substitui os chunks dos documentos no índice (chamado com o lock adquirido)
+
+        Retorna False, sem alterar o índice, se faltar o embedding de algum texto.
+        """
+        for chunks in chunks_by_file.values():
+            for chunk in chunks:
+                key, exists = self._vector_key(chunk.text, fingerprints)
+                if not exists and key not in stored:
+                    return False
+
+        # Os vetores dos chunks substituídos só saem depois de registrados os novos,
+        # para que os trechos inalterados de um documento mantenham os seus
+        orphans = set()
+        replaced = False
+        for filename in chunks_by_file:
+            indexed = self.indexed_documents.pop(filename, None)
+            if indexed is not None:
+                orphans.update(self._unregister(indexed[1]))
+                replaced = True
+
+        new_keys, new_vectors = [], []
+        for filename, chunks in chunks_by_file.items():
+            for chunk in chunks:
+                key, exists = self._vector_key(chunk.text, fingerprints)
+                if key not in self._key_chunks:
+                    self._key_chunks[key] = []
+                    self._key_texts[key] = chunk.text
+                    self.lexical_index.add(key, chunk.text)
+                    fingerprint = fingerprints.get(key)
+                    if fingerprint is not None:
+                        self.near_duplicates.add(key, fingerprint)
+                    if not exists:
+                        new_keys.append(key)
+                        new_vectors.append(stored[key])
+                self._key_chunks[key].append(chunk.chunk_id)
+                self._chunk_keys[chunk.chunk_id] = key
+                self.chunks[chunk.chunk_id] = chunk
+            self.indexed_documents[filename] = (
+                content_hash(documents[filename]), [chunk.chunk_id for chunk in chunks]
+            )
+        self.index.add_many(new_keys, new_vectors)
+        dropped = self._drop_orphans(orphans)
+        if new_keys or dropped or replaced:
+            self.corpus_version += 1
+        return True
+
+    def _unregister(self, chunk_ids: List[str]) -> set:
+        """Desvincula chunks dos seus vetores; retorna as chaves que podem ter ficado sem chunks"""
+        keys = set()
+        for chunk_id in chunk_ids:
+            self.chunks.pop(chunk_id, None)
+            key = self._chunk_keys.pop(chunk_id, None)
+            if key is not None:
+                self._key_chunks[key].remove(chunk_id)
+                keys.add(key)
+        return keys
+
+    def _drop_orphans(self, keys: set) -> int:
+        """Remove do índice os vetores que nenhum chunk usa mais"""
+        dropped = 0
+        for key in keys:
+            if self._key_chunks.get(key):
+                continue
+            self._key_chunks.pop(key, None)
+            self._key_texts.pop(key, None)
+            self.index.remove(key)
+            self.lexical_index.remove(key)
+            self.near_duplicates.remove(key)
+            dropped += 1
+        return dropped
+
+    def remove_document(self, filename: str):
+        """Remove os chunks de um documento do índice"""
+        with self._lock:
+            indexed = self.indexed_documents.pop(filename, None)
+            if indexed is None:
+                return
+            self._drop_orphans(self._unregister(indexed[1]))
+            self.corpus_version += 1
+
+    def create_document(self, filename: str, content: str) -> str:
+        """Salva um novo documento no disco e indexa apenas os seus chunks"""
+        filename = self.document_service.add_document(filename, content)
+        try:
+            self.add_document(filename, content)
+        except Exception:
+            # O arquivo já foi gravado; a próxima sincronização tenta indexá-lo de novo
+            self.document_service.forget([filename])
+            raise
+        return filename
+
+    def delete_document(self, filename: str) -> bool:
+        """Remove um documento do disco e os seus vetores do índice
+
+        Só a remoção dos vetores ocorre sob o lock do índice; a exclusão do
+        arquivo e a gravação do snapshot não bloqueiam as buscas.
+        """
+        if not self.document_service.delete_document(filename):
+            return False
+        self.remove_document(filename)
+        self.persist()
+        return True
+
+    def embed_query(self, query: str) -> List[float]:
+        """Gera o embedding da pergunta na configuração do índice atual"""
+        return self.embedder.get_embedding(query)
+
+    async def aembed_query(self, query: str) -> List[float]:
+        """Versão assíncrona de embed_query"""
+        return await self.embedder.aget_embedding(query)
+
+    def search(self, query_embedding: List[float], top_k: int, query: str = None) -> List[DocumentChunk]:
+        """Retorna os top_k chunks mais similares ao embedding da query
+
+        Se o embedding não tiver a dimensão do índice (a reindexação terminou
+        entre a geração do embedding e a busca), a query é vetorizada de novo
+        quando o texto é informado; sem ele, a busca é recusada com ValueError.
+        """
+        dimensions = self.index.dimensions
+        if dimensions and len(query_embedding) != dimensions and query is not None:
+            query_embedding = self.embed_query(query)
+
+        # Similaridade com todos os chunks em um único produto matriz-vetor
+        with self._lock:
+            return self._to_chunks(self.index.search(query_embedding, top_k))
+
+    def _to_chunks(self, results: List[Tuple[str, float]]) -> List[DocumentChunk]:
+        """Converte (chave do vetor, score) no primeiro chunk que usa o vetor"""
+        return [
+            self.chunks[self._key_chunks[key][0]].model_copy(update={"score": score})
+            for key, score in results if self._key_chunks.get(key)
+        ]
+
+    def lexical_search(self, query: str, top_k: int) -> List[DocumentChunk]:
+        """Retorna os top_k chunks com maior score BM25, sem gerar embeddings"""
+        with self._lock:
+            return self._to_chunks(self.lexical_index.search(query, top_k))
+
+    def hybrid_search(self, query_embedding: List[float], query: str, top_k: int) -> List[DocumentChunk]:
+        """Combina as buscas vetorial e lexical por Reciprocal Rank Fusion"""
+        candidates = max(top_k, self.hybrid_candidates)
+        vector_results = self.search(query_embedding, candidates, query)
+        with self._lock:
+            lexical_results = self.lexical_index.search(query, candidates)
+            fused = reciprocal_rank_fusion([
+                [self._chunk_keys.get(chunk.chunk_id) for chunk in vector_results],
+                [key for key, _ in lexical_results],
+            ])
+            return self._to_chunks([(key, score) for key, score in fused if self._key_chunks.get(key)][:top_k])
+
+    def lexical_shortcut(self, query: str, top_k: int) -> Optional[List[DocumentChunk]]:
+        """Resultado lexical para perguntas de termo exato, dispensando o embedding da pergunta
+
+        Vale para perguntas curtas com um termo raro, como uma sigla, cujo
+        melhor chunk contém todos os termos. O termo é raro se aparece em no
+        máximo top_k chunks e em no máximo LEXICAL_SHORTCUT_MAX_DF da base; em
+        bases com menos de LEXICAL_SHORTCUT_MIN_CORPUS·top_k chunks quase
+        todo termo seria "raro", e o atalho não é usado.
+        """
+        terms = set(tokenize(query))
+        if not terms or len(terms) > self.lexical_shortcut_max_terms:
+            return None
+        with self._lock:
+            corpus_size = len(self.lexical_index)
+            if corpus_size < self.lexical_shortcut_min_corpus * top_k:
+                return None
+            rarest = min(self.lexical_index.document_frequency(term) for term in terms)
+            if rarest == 0 or rarest > top_k or rarest > self.lexical_shortcut_max_df * corpus_size:
+                return None
+            results = self.lexical_index.search(query, top_k)
+            if not results or not self.lexical_index.contains_all(results[0][0], terms):
+                return None
+            return self._to_chunks(results)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+
+_index_service = None
+_index_service_lock = threading.Lock()
+
+
+def get_index_service(document_service: DocumentService = None,
+                      progress: Callable[[int, int, int], None] = None) -> IndexService:
+    """Retorna a instância compartilhada do IndexService
+
+    Os argumentos só valem na criação da instância (veja IndexService).
+    """
+    global _index_service
+    if _index_service is None:
+        with _index_service_lock:
+            if _index_service is None:
+                _index_service = IndexService(document_service=document_service, progress=progress)
+    return _index_service
@@ -0,0 +1,195 @@
+import os
+import uuid
+import queue
+import shutil
+import tarfile
+import zipfile
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from backend.models.schemas import IngestionJob
+from backend.services.observability import get_logger
+
+logger = get_logger(__name__)
+
+
+class IngestionService:
+    """Ingestão em lote de documentos em segundo plano
+
+    Os arquivos enviados (.txt, .zip, .tar, .tar.gz) são gravados em um
+    diretório temporário pelo router; uma thread extrai os .txt, salva os
+    documentos e gera os embeddings em lotes de INGESTION_BATCH_SIZE
+    documentos, atualizando o progresso do job a cada lote.
+    """
+
+    def __init__(self, batch_size: int = None, max_file_bytes: int = None, max_jobs: int = None):
+        self.batch_size = batch_size or int(os.getenv("INGESTION_BATCH_SIZE", "50"))
+        self.max_file_bytes = max_file_bytes or int(os.getenv("INGESTION_MAX_FILE_BYTES", str(10 * 1024 * 1024)))
+        self.max_jobs = max_jobs or int(os.getenv("INGESTION_MAX_JOBS", "100"))
+
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def new_upload_dir(self) -> str:
+        """Cria o diretório temporário que recebe os arquivos de um job"""
+        return tempfile.mkdtemp(prefix="ingestion-")
+
+    def submit(self, upload_dir: str) -> IngestionJob:
+        """Enfileira a ingestão dos arquivos gravados em upload_dir"""
+        job = IngestionJob(job_id=uuid.uuid4().hex[:12], created_at=datetime.now())
+        with self._lock:
+            self._jobs[job.job_id] = job
+            # Mantém apenas os jobs mais recentes
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="ingestion", daemon=True)
+                self._thread.start()
+        self._queue.put((job, upload_dir))
+        return job
+
+    def get_job(self, job_id: str) -> Optional[IngestionJob]:
+        return self._jobs.get(job_id)
+
+    def list_jobs(self) -> List[IngestionJob]:
+        return list(reversed(self._jobs.values()))
+
+    def _run(self):
+        while True:
+            job, upload_dir = self._queue.get()
+            try:
+                self._ingest(job, upload_dir)
+                job.status = "done"
+            except Exception as e:
+                job.status = "failed"
+                job.errors.append(str(e))
+                logger.error(f"Erro na ingestão {job.job_id}: {str(e)}")
+            finally:
+                job.finished_at = datetime.now()
+                shutil.rmtree(upload_dir, ignore_errors=True)
+                self._queue.task_done()
+
+    def _read_text(self, name: str, data: bytes, job: IngestionJob) -> Optional[Tuple[str, str]]:
+        """Decodifica um .txt; retorna (nome do arquivo, conteúdo) ou None se ele for ignorado"""
+        filename = os.path.basename(name.replace("\\", "/"))
+        if not filename.endswith(".txt") or filename.startswith("."):
+            return None
+        try:
+            return filename, data.decode("utf-8")
+        except UnicodeDecodeError:
+            job.errors.append(f"{filename}: o arquivo não está em UTF-8")
+            return None
+
+    def _too_large(self, name: str, size: int, job: IngestionJob) -> bool:
+        if size > self.max_file_bytes:
+            job.errors.append(f"{os.path.basename(name)}: maior que {self.max_file_bytes} bytes")
+            return True
+        return False
+
+    def _extract(self, path: str, job: IngestionJob) -> Iterator[Tuple[str, str]]:
+        """Percorre os .txt de um arquivo enviado, abrindo zip e tar sem extraí-los no disco"""
+        if path.endswith(".txt"):
+            if self._too_large(path, os.path.getsize(path), job):
+                return
+            with open(path, "rb") as f:
+                document = self._read_text(path, f.read(), job)
+            if document:
+                yield document
+        elif zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as archive:
+                for info in archive.infolist():
+                    if info.is_dir() or not info.filename.endswith(".txt"):
+                        continue
+                    if self._too_large(info.filename, info.file_size, job):
+                        continue
+                    document = self._read_text(info.filename, archive.read(info), job)
+                    if document:
+                        yield document
+        elif tarfile.is_tarfile(path):
+            with tarfile.open(path, "r:*") as archive:
+                for member in archive:
+                    if not member.isfile() or not member.name.endswith(".txt"):
+                        continue
+                    if self._too_large(member.name, member.size, job):
+                        continue
+                    document = self._read_text(member.name, archive.extractfile(member).read(), job)
+                    if document:
+                        yield document
+        else:
+            job.skipped.append(os.path.basename(path))
+
+    def _count(self, paths: List[str]) -> int:
+        """Quantidade de .txt nos arquivos enviados, para o progresso"""
+        total = 0
+        for path in paths:
+            if path.endswith(".txt"):
+                total += 1
+            elif zipfile.is_zipfile(path):
+                with zipfile.ZipFile(path) as archive:
+                    total += sum(1 for info in archive.infolist() if info.filename.endswith(".txt"))
+            elif tarfile.is_tarfile(path):
+                with tarfile.open(path, "r:*") as archive:
+                    total += sum(1 for member in archive if member.isfile() and member.name.endswith(".txt"))
+        return total
+
+    def _ingest(self, job: IngestionJob, upload_dir: str):
+        job.status = "running"
+        paths = sorted(
+            os.path.join(directory, name) for directory, _, names in os.walk(upload_dir) for name in names
+        )
+        job.total = self._count(paths)
+        logger.info(f"Ingestão {job.job_id}: {job.total} documentos")
+
+        # Importado aqui para não carregar o índice junto com as rotas
+        from backend.services.index_service import get_index_service
+        index_service = get_index_service()
+        batch: Dict[str, str] = {}
+        for path in paths:
+            for filename, content in self._extract(path, job):
+                if filename in batch:
+                    job.skipped.append(filename)
+                    job.processed += 1
+                    continue
+                batch[filename] = content
+                if len(batch) >= self.batch_size:
+                    self._ingest_batch(index_service, batch, job)
+                    batch = {}
+        if batch:
+            self._ingest_batch(index_service, batch, job)
+        job.processed = max(job.processed, job.total)
+
+    def _ingest_batch(self, index_service, batch: Dict[str, str], job: IngestionJob):
+        """Salva os documentos do lote e gera os seus embeddings em uma única chamada"""
+        saved: Dict[str, str] = {}
+        for filename, content in batch.items():
+            try:
+                saved[index_service.document_service.add_document(filename, content)] = content
+            except Exception as e:
+                job.errors.append(f"{filename}: {str(e)}")
+        try:
+            index_service.add_documents(saved)
+        except Exception:
+            # Os arquivos já estão no disco: sem o estado gravado, o próximo sync tenta indexá-los de novo
+            index_service.document_service.forget(saved)
+            raise
+        index_service.persist()
+        job.added.extend(saved)
+        job.processed += len(batch)
+
+
+_ingestion_service: Optional[IngestionService] = None
+_ingestion_service_lock = threading.Lock()
+
+
+def get_ingestion_service() -> IngestionService:
+    """Retorna a instância compartilhada do serviço de ingestão"""
+    global _ingestion_service
+    if _ingestion_service is None:
+        with _ingestion_service_lock:
+            if _ingestion_service is None:
+                _ingestion_service = IngestionService()
+    return _ingestion_service
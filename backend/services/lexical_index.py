@@ -0,0 +1,153 @@
+import os
+import re
+import math
+import heapq
+import threading
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+_TOKEN = re.compile(r"\w+")
+
+# Palavras muito frequentes em português, já sem acentos
+STOPWORDS = frozenset("""
+a o as os um uma uns umas de da do das dos d em na no nas nos num numa por pela pelo pelas pelos
+para pra com sem sob sobre entre ate apos ao aos e ou mas nem que qual quais quem cujo cuja como
+onde quando porque pois se ja nao sim mais menos muito muita muitos muitas tambem so ser sao foi
+foram era eram e esta estao estava ter tem teve tinha ha havia isso isto esse essa esses essas
+este esta estes estas aquele aquela aquilo seu sua seus suas meu minha nosso nossa lhe lhes ele
+ela eles elas eu voce voces me te nos vos
+""".split())
+
+# Plurais comuns; a mesma regra é aplicada aos documentos e às perguntas
+_PLURAL_SUFFIXES = (("oes", "ao"), ("aes", "ao"), ("ais", "al"), ("eis", "el"), ("ois", "ol"), ("ns", "m"))
+
+
+def fold_accents(text: str) -> str:
+    """Caixa baixa e remoção de acentos"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in text if not unicodedata.combining(char))
+
+
+def _normalize_token(token: str) -> str:
+    if len(token) <= 4 or token.isdigit():
+        return token
+    for suffix, replacement in _PLURAL_SUFFIXES:
+        if token.endswith(suffix):
+            return token[:-len(suffix)] + replacement
+    if token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokeniza um texto em português: sem acentos, sem stopwords e com plurais reduzidos
+
+    Siglas como "CNI" e "SESI" viram tokens comuns ("cni", "sesi").
+    """
+    return [
+        _normalize_token(token) for token in _TOKEN.findall(fold_accents(text))
+        if token not in STOPWORDS
+    ]
+
+
+class BM25Index:
+    """Índice invertido com ranking BM25
+
+    Cada termo aponta para os chunks em que aparece e a sua frequência neles,
+    de modo que uma busca percorre apenas as listas dos termos da pergunta.
+    """
+
+    def __init__(self, k1: float = None, b: float = None):
+        self.k1 = k1 if k1 is not None else float(os.getenv("BM25_K1", "1.2"))
+        self.b = b if b is not None else float(os.getenv("BM25_B", "0.75"))
+
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_terms: Dict[str, Counter] = {}
+        self._doc_lengths: Dict[str, int] = {}
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._doc_terms
+
+    def add(self, key: str, text: str):
+        """Adiciona (ou substitui) um texto no índice"""
+        self.add_many([key], [text])
+
+    def add_many(self, keys: Sequence[str], texts: Sequence[str]):
+        """Adiciona vários textos de uma só vez"""
+        tokenized = [Counter(tokenize(text)) for text in texts]
+        with self._lock:
+            for key, terms in zip(keys, tokenized):
+                self.remove(key)
+                self._doc_terms[key] = terms
+                self._doc_lengths[key] = sum(terms.values())
+                self._total_length += self._doc_lengths[key]
+                for term, frequency in terms.items():
+                    self._postings.setdefault(term, {})[key] = frequency
+
+    def remove(self, key: str) -> bool:
+        """Remove um texto do índice; retorna False se a chave não existir"""
+        with self._lock:
+            terms = self._doc_terms.pop(key, None)
+            if terms is None:
+                return False
+            self._total_length -= self._doc_lengths.pop(key)
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(key, None)
+                    if not postings:
+                        del self._postings[term]
+            return True
+
+    def clear(self):
+        """Remove todos os textos do índice"""
+        with self._lock:
+            self._postings = {}
+            self._doc_terms = {}
+            self._doc_lengths = {}
+            self._total_length = 0
+
+    def document_frequency(self, term: str) -> int:
+        """Quantidade de textos que contêm o termo (já tokenizado)"""
+        return len(self._postings.get(term, ()))
+
+    def contains_all(self, key: str, terms: Iterable[str]) -> bool:
+        """Indica se o texto contém todos os termos (já tokenizados)"""
+        doc_terms = self._doc_terms.get(key, {})
+        return all(term in doc_terms for term in terms)
+
+    def search(self, query: str, top_k: int = 3) -> List[Tuple[str, float]]:
+        """Retorna as top_k chaves com maior score BM25 para a query como (chave, score)"""
+        terms = set(tokenize(query))
+        with self._lock:
+            size = len(self._doc_terms)
+            if not terms or size == 0 or top_k <= 0:
+                return []
+            average_length = self._total_length / size
+
+            scores: Dict[str, float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (size - len(postings) + 0.5) / (len(postings) + 0.5))
+                for key, frequency in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[key] / average_length)
+                    scores[key] = scores.get(key, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+            return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+
+def reciprocal_rank_fusion(rankings: Iterable[Sequence[str]], k: int = None) -> List[Tuple[str, float]]:
+    """Combina rankings pela soma de 1 / (k + posição), sem depender da escala dos scores"""
+    k = k or int(os.getenv("RRF_K", "60"))
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for position, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + position)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
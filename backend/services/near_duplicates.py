@@ -0,0 +1,101 @@
+import os
+import hashlib
+import threading
+from typing import Dict, List, Optional, Set
+import numpy as np
+from backend.services.lexical_index import tokenize
+
+FINGERPRINT_BITS = 64
+# Com 8 faixas de 8 bits, textos a até 7 bits de distância têm ao menos uma faixa idêntica
+_BANDS = 8
+_BAND_BITS = FINGERPRINT_BITS // _BANDS
+_BAND_MASK = (1 << _BAND_BITS) - 1
+
+
+def _token_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(text: str, shingle_size: int = 2, min_tokens: int = 8) -> Optional[int]:
+    """Fingerprint SimHash de 64 bits sobre pares de palavras normalizadas
+
+    Textos parecidos têm fingerprints a poucos bits de distância. Retorna None
+    para textos curtos demais para uma comparação confiável.
+    """
+    tokens = tokenize(text)
+    if len(tokens) < max(min_tokens, shingle_size):
+        return None
+    hashes = np.array([
+        _token_hash(" ".join(tokens[i:i + shingle_size])) for i in range(len(tokens) - shingle_size + 1)
+    ], dtype=np.uint64)
+    # Cada bit do fingerprint é o voto da maioria dos shingles
+    bits = (hashes[:, None] >> np.arange(FINGERPRINT_BITS, dtype=np.uint64)) & np.uint64(1)
+    votes = 2 * bits.sum(axis=0, dtype=np.int64) - len(hashes)
+    return sum(1 << int(bit) for bit in np.flatnonzero(votes > 0))
+
+
+class SimHashIndex:
+    """Busca de fingerprints a até max_distance bits (no máximo 7) de distância
+
+    Cada fingerprint é registrado nas suas 8 faixas de 8 bits; a busca só
+    compara os fingerprints que compartilham alguma faixa com o da consulta.
+    """
+
+    def __init__(self, max_distance: int = None):
+        if max_distance is None:
+            max_distance = int(os.getenv("NEAR_DUPLICATE_DISTANCE", "0"))
+        self.max_distance = min(max_distance, _BANDS - 1)
+        self._fingerprints: Dict[str, int] = {}
+        self._bands: List[Dict[int, Set[str]]] = [{} for _ in range(_BANDS)]
+        self._lock = threading.RLock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_distance > 0
+
+    def __len__(self) -> int:
+        return len(self._fingerprints)
+
+    @staticmethod
+    def _band_values(fingerprint: int) -> List[int]:
+        return [fingerprint >> (band * _BAND_BITS) & _BAND_MASK for band in range(_BANDS)]
+
+    def add(self, key: str, fingerprint: int):
+        with self._lock:
+            self.remove(key)
+            self._fingerprints[key] = fingerprint
+            for band, value in enumerate(self._band_values(fingerprint)):
+                self._bands[band].setdefault(value, set()).add(key)
+
+    def remove(self, key: str) -> bool:
+        with self._lock:
+            fingerprint = self._fingerprints.pop(key, None)
+            if fingerprint is None:
+                return False
+            for band, value in enumerate(self._band_values(fingerprint)):
+                keys = self._bands[band].get(value)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._bands[band][value]
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._fingerprints = {}
+            self._bands = [{} for _ in range(_BANDS)]
+
+    def find(self, fingerprint: int) -> Optional[str]:
+        """Retorna a chave do fingerprint mais próximo a até max_distance bits, se houver"""
+        if not self.enabled or fingerprint is None:
+            return None
+        with self._lock:
+            candidates = set()
+            for band, value in enumerate(self._band_values(fingerprint)):
+                candidates.update(self._bands[band].get(value, ()))
+            best, best_distance = None, self.max_distance + 1
+            for key in sorted(candidates):
+                distance = bin(self._fingerprints[key] ^ fingerprint).count("1")
+                if distance < best_distance:
+                    best, best_distance = key, distance
+            return best
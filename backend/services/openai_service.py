@@ -1,57 +1,165 @@
-from openai import OpenAI
 import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from typing import List, Tuple
-import httpx
+from typing import AsyncIterator, List, Optional, Tuple
+from backend.services.providers import (
+    ChatProvider,
+    EmbeddingProvider,
+    create_chat_provider,
+    create_embedding_provider,
+)
+from backend.models.schemas import TokenUsage
+from backend.services.tokenizer import estimate_tokens
+from backend.services.single_flight import SingleFlight, AsyncSingleFlight
 
 load_dotenv()
 
 class OpenAIService:
-    def __init__(self):
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY não encontrada nas variáveis de ambiente")
-        
-        # Configura cliente HTTP (se precisar proxy)
-        http_client = None
-        if os.getenv("HTTPS_PROXY"):
-            http_client = httpx.Client(proxies={"https": os.getenv("HTTPS_PROXY")})
-        
-        # Inicializa o client OpenAI
-        self.client = OpenAI(
-            api_key=api_key,
-            http_client=http_client,
-            timeout=60.0  # timeout maior para embeddings
-        )
-
-        self.chat_model = os.getenv("CHAT_MODEL", "gpt-3.5-turbo")
-        self.embeddings_model = os.getenv("EMBEDDINGS_MODEL", "text-embedding-3-small")
-    
+    def __init__(self, embedding_provider: EmbeddingProvider = None, chat_provider: ChatProvider = None):
+        # Provedores definidos por LLM_PROVIDER (ou EMBEDDING_PROVIDER / CHAT_PROVIDER):
+        # "openai" (padrão) ou "local", que funciona sem rede
+        self.embedding_provider = embedding_provider or create_embedding_provider()
+        self.chat_provider = chat_provider or create_chat_provider()
+
+        self.chat_model = self.chat_provider.model
+        self.embeddings_model = self.embedding_provider.model
+        self.embeddings_dimensions = self.embedding_provider.dimensions
+        # Modelo + dimensão: chave dos embeddings armazenados e dos metadados do índice
+        self.embeddings_key = self.embedding_provider.key
+
+        # Limites dos lotes de embeddings (a API aceita até 2048 textos por requisição)
+        self.embedding_batch_size = int(os.getenv("EMBEDDING_BATCH_SIZE", "256"))
+        self.embedding_batch_max_tokens = int(os.getenv("EMBEDDING_BATCH_MAX_TOKENS", "250000"))
+        self.embedding_max_concurrency = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "4"))
+
+        # Cache LRU dos embeddings de perguntas e agrupamento de requisições idênticas simultâneas
+        self.embedding_cache_size = int(os.getenv("EMBEDDING_CACHE_SIZE", "1024"))
+        self._embedding_cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._embedding_cache_lock = threading.Lock()
+        self._embedding_flight = SingleFlight()
+        self._async_embedding_flight = AsyncSingleFlight()
+
+    def _cached_embedding(self, text: str) -> Optional[List[float]]:
+        with self._embedding_cache_lock:
+            embedding = self._embedding_cache.get(text)
+            if embedding is not None:
+                self._embedding_cache.move_to_end(text)
+            return embedding
+
+    def _cache_embedding(self, text: str, embedding: List[float]):
+        if self.embedding_cache_size <= 0:
+            return
+        with self._embedding_cache_lock:
+            self._embedding_cache[text] = embedding
+            self._embedding_cache.move_to_end(text)
+            while len(self._embedding_cache) > self.embedding_cache_size:
+                self._embedding_cache.popitem(last=False)
+
     def get_embedding(self, text: str) -> List[float]:
         """Gera embedding para um texto"""
+        embedding = self._cached_embedding(text)
+        if embedding is not None:
+            return embedding
+        try:
+            # Chamadas simultâneas com o mesmo texto compartilham uma única requisição
+            embedding, _ = self._embedding_flight.do(text, lambda: self.embedding_provider.embed([text])[0])
+        except Exception as e:
+            raise Exception(f"Erro ao gerar embedding: {str(e)}")
+        self._cache_embedding(text, embedding)
+        return embedding
+
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        """Estimativa conservadora da quantidade de tokens de um texto"""
+        return estimate_tokens(text)
+
+    def _make_batches(self, texts: List[str]) -> List[List[int]]:
+        """Agrupa os índices dos textos em lotes respeitando os limites de itens e tokens"""
+        batches = []
+        current = []
+        current_tokens = 0
+        for i, text in enumerate(texts):
+            tokens = self._estimate_tokens(text)
+            if current and (len(current) >= self.embedding_batch_size
+                            or current_tokens + tokens > self.embedding_batch_max_tokens):
+                batches.append(current)
+                current = []
+                current_tokens = 0
+            current.append(i)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Gera embeddings para vários textos em lotes, com requisições concorrentes"""
+        if not texts:
+            return []
+        try:
+            batches = self._make_batches(texts)
+            batch_texts = [[texts[i] for i in batch] for batch in batches]
+
+            if len(batches) == 1 or self.embedding_max_concurrency <= 1:
+                results = [self.embedding_provider.embed(batch) for batch in batch_texts]
+            else:
+                workers = min(self.embedding_max_concurrency, len(batches))
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    results = list(executor.map(self.embedding_provider.embed, batch_texts))
+
+            embeddings: List[List[float]] = [None] * len(texts)
+            for batch, batch_embeddings in zip(batches, results):
+                for i, embedding in zip(batch, batch_embeddings):
+                    embeddings[i] = embedding
+            return embeddings
+        except Exception as e:
+            raise Exception(f"Erro ao gerar embeddings em lote: {str(e)}")
+
+    async def aget_embedding(self, text: str) -> List[float]:
+        """Gera embedding para um texto sem bloquear o event loop"""
+        embedding = self._cached_embedding(text)
+        if embedding is not None:
+            return embedding
+
+        async def embed():
+            return (await self.embedding_provider.aembed([text]))[0]
+
         try:
-            response = self.client.embeddings.create(
-                model=self.embeddings_model,
-                input=text
-            )
-            return response.data[0].embedding
+            embedding, _ = await self._async_embedding_flight.do(text, embed)
         except Exception as e:
             raise Exception(f"Erro ao gerar embedding: {str(e)}")
-    
-    def get_completion(self, prompt: str, context: str = "") -> Tuple[str, int]:
+        self._cache_embedding(text, embedding)
+        return embedding
+
+    @staticmethod
+    def _build_messages(prompt: str, context: str) -> List[dict]:
+        return [
+            {"role": "system", "content": "Você é um assistente especializado em responder perguntas sobre o SENAI com precisão e clareza."},
+            {"role": "user", "content": f"Use este contexto para responder à pergunta:\n\nContexto: {context}\n\nPergunta: {prompt}"}
+        ]
+
+    def get_completion(self, prompt: str, context: str = "") -> Tuple[str, TokenUsage]:
         """Gera resposta de chat usando o modelo configurado"""
         try:
-            messages = [
-                {"role": "system", "content": "Você é um assistente especializado em responder perguntas sobre o SENAI com precisão e clareza."},
-                {"role": "user", "content": f"Use este contexto para responder à pergunta:\n\nContexto: {context}\n\nPergunta: {prompt}"}
-            ]
-            
-            response = self.client.chat.completions.create(
-                model=self.chat_model,
-                messages=messages,
-                temperature=0.7,
-                max_tokens=500
-            )
-            return response.choices[0].message.content, response.usage.total_tokens
+            return self.chat_provider.complete(self._build_messages(prompt, context))
+        except Exception as e:
+            raise Exception(f"Erro ao gerar resposta: {str(e)}")
+
+    async def aget_completion(self, prompt: str, context: str = "") -> Tuple[str, TokenUsage]:
+        """Gera resposta de chat sem bloquear o event loop"""
+        try:
+            return await self.chat_provider.acomplete(self._build_messages(prompt, context))
+        except Exception as e:
+            raise Exception(f"Erro ao gerar resposta: {str(e)}")
+
+    async def astream_completion(self, prompt: str, context: str = "") -> AsyncIterator[Tuple[str, object]]:
+        """Gera a resposta em streaming
+
+        Produz ("token", trecho) a cada trecho recebido e, ao final, ("usage", TokenUsage).
+        """
+        try:
+            async for event, data in self.chat_provider.astream(self._build_messages(prompt, context)):
+                yield event, data
         except Exception as e:
             raise Exception(f"Erro ao gerar resposta: {str(e)}")
@@ -0,0 +1,278 @@
+import os
+import re
+import sys
+import json
+import time
+import random
+import asyncio
+import threading
+from collections import Counter as StackCounter
+from datetime import datetime
+from typing import List, Optional, Sequence
+from backend.services.observability import current_request_id, current_stages, get_logger, metrics
+
+logger = get_logger(__name__)
+
+PROFILES_CAPTURED = metrics.counter("profiles_captured_total", "Perfis de requisição gravados", ["reason"])
+
+_PROFILE_NAME = re.compile(r"^[\w.-]+\.folded$")
+# Amostras cujo frame mais interno está nestes módulos são threads ociosas (esperando trabalho)
+_IDLE_FILES = ("threading.py", "queue.py", "selectors.py")
+
+
+def _short_path(filename: str) -> str:
+    marker = filename.rfind("site-packages" + os.sep)
+    if marker >= 0:
+        return filename[marker + len("site-packages") + 1:]
+    cwd = os.getcwd() + os.sep
+    if filename.startswith(cwd):
+        return filename[len(cwd):]
+    return os.path.basename(filename)
+
+
+def _collapse(frame, max_depth: int = 128) -> Optional[str]:
+    """Pilha no formato "collapsed" (raiz;...;folha), ou None se a thread está ociosa"""
+    if os.path.basename(frame.f_code.co_filename) in _IDLE_FILES:
+        return None
+    names = []
+    while frame is not None and len(names) < max_depth:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})".replace(";", ":"))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class StackSampler:
+    """Amostrador de pilhas de baixo custo
+
+    Uma thread lê, a cada `interval` segundos, a pilha de todas as outras
+    threads do processo (sys._current_frames) e conta as pilhas iguais. Não
+    instrumenta as chamadas, ao contrário do cProfile, e por isso alcança o
+    event loop e as threads de asyncio.to_thread sem custo nas demais
+    requisições além da própria amostragem.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: StackCounter = StackCounter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> StackCounter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        own = threading.get_ident()
+        # A primeira amostra é imediata, para que requisições curtas também tenham pilhas
+        while True:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = _collapse(frame)
+                if stack:
+                    self.stacks[f"{names.get(ident, ident)};{stack}"] += 1
+            self.samples += 1
+            if self._stop.wait(self.interval):
+                break
+
+
+class RequestProfiler:
+    """Perfis de requisições lentas ou sorteadas, sob demanda
+
+    Uma fração PROFILE_SAMPLE_RATE das requisições em PROFILE_PATHS é
+    amostrada do início ao fim; com PROFILE_SLOW_MS, as que passam desse tempo
+    começam a ser amostradas no momento em que o ultrapassam. Cada perfil é
+    gravado em PROFILE_DIR como pilhas "collapsed" (.folded, aceitas pelo
+    flamegraph.pl e pelo speedscope) com um .json de metadados ao lado (rota,
+    duração, tempo de cada etapa). As pilhas são do processo inteiro durante a
+    amostragem, incluindo as requisições concorrentes.
+
+    A configuração pode ser alterada em execução pelos endpoints /admin/profiling.
+    """
+
+    def __init__(self, profile_dir: str = None):
+        self.profile_dir = profile_dir or os.getenv("PROFILE_DIR", "backend/db/profiles")
+        self.sample_rate = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+        self.slow_ms = float(os.getenv("PROFILE_SLOW_MS", "0"))  # 0 = desativado
+        self.interval_ms = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+        self.paths = [path.strip() for path in os.getenv("PROFILE_PATHS", "/ask,/documents").split(",")
+                      if path.strip()]
+        self.max_files = int(os.getenv("PROFILE_MAX_FILES", "200"))
+        # Amostradores simultâneos; requisições acima do limite não são perfiladas
+        self.max_concurrent = int(os.getenv("PROFILE_MAX_CONCURRENT", "2"))
+        self._slots = threading.BoundedSemaphore(self.max_concurrent)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0 or self.slow_ms > 0
+
+    def settings(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "slow_ms": self.slow_ms,
+            "interval_ms": self.interval_ms,
+            "paths": self.paths,
+            "profile_dir": self.profile_dir,
+            "max_files": self.max_files,
+        }
+
+    def configure(self, sample_rate: float = None, slow_ms: float = None, interval_ms: float = None,
+                  paths: Sequence[str] = None) -> dict:
+        """Altera a configuração em execução; os valores None são mantidos"""
+        if sample_rate is not None:
+            self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        if slow_ms is not None:
+            self.slow_ms = max(slow_ms, 0.0)
+        if interval_ms is not None:
+            self.interval_ms = max(interval_ms, 1.0)
+        if paths is not None:
+            self.paths = list(paths)
+        logger.info("Configuração de profiling alterada", extra={"fields": self.settings()})
+        return self.settings()
+
+    def matches(self, path: str) -> bool:
+        return any(path == prefix or path.startswith(prefix.rstrip("/") + "/") for prefix in self.paths)
+
+    def begin(self) -> Optional[StackSampler]:
+        """Inicia um amostrador, se houver vaga"""
+        if not self._slots.acquire(blocking=False):
+            return None
+        sampler = StackSampler(self.interval_ms / 1000)
+        sampler.start()
+        return sampler
+
+    def finish(self, sampler: StackSampler, metadata: dict) -> Optional[str]:
+        """Para o amostrador e grava o perfil; retorna o nome do arquivo"""
+        try:
+            stacks = sampler.stop()
+        finally:
+            self._slots.release()
+        metadata = dict(metadata, samples=sampler.samples, interval_ms=sampler.interval * 1000)
+        try:
+            return self._save(stacks, metadata)
+        except OSError as e:
+            logger.error(f"Erro ao gravar perfil: {str(e)}")
+            return None
+
+    def _save(self, stacks: StackCounter, metadata: dict) -> str:
+        os.makedirs(self.profile_dir, exist_ok=True)
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+        name = f"{stamp}-{metadata['reason']}-{metadata.get('request_id') or 'sem-id'}.folded"
+        name = re.sub(r"[^\w.-]", "_", name)
+        path = os.path.join(self.profile_dir, name)
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        with open(path[:-len(".folded")] + ".json", "w", encoding="utf-8") as f:
+            json.dump(metadata, f, ensure_ascii=False)
+        PROFILES_CAPTURED.inc(reason=metadata["reason"])
+        logger.info(f"Perfil gravado: {name}", extra={"fields": {"profile": name, "reason": metadata["reason"]}})
+        self._prune()
+        return name
+
+    def _prune(self):
+        """Mantém apenas os PROFILE_MAX_FILES perfis mais recentes"""
+        with self._lock:
+            names = sorted(name for name in os.listdir(self.profile_dir) if _PROFILE_NAME.match(name))
+            for name in names[:max(0, len(names) - self.max_files)]:
+                for path in (os.path.join(self.profile_dir, name),
+                             os.path.join(self.profile_dir, name[:-len(".folded")] + ".json")):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+
+    def list_profiles(self, limit: int = 50) -> List[dict]:
+        """Perfis gravados, do mais recente ao mais antigo, com os metadados"""
+        if not os.path.isdir(self.profile_dir):
+            return []
+        names = sorted((name for name in os.listdir(self.profile_dir) if _PROFILE_NAME.match(name)), reverse=True)
+        profiles = []
+        for name in names[:limit]:
+            path = os.path.join(self.profile_dir, name)
+            try:
+                with open(path[:-len(".folded")] + ".json", encoding="utf-8") as f:
+                    metadata = json.load(f)
+            except (OSError, ValueError):
+                metadata = {}
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                continue
+            profiles.append(dict(metadata, name=name, size=size))
+        return profiles
+
+    def profile_path(self, name: str) -> Optional[str]:
+        """Caminho do perfil, apenas para nomes gerados aqui"""
+        if not _PROFILE_NAME.match(name):
+            return None
+        path = os.path.join(self.profile_dir, name)
+        return path if os.path.isfile(path) else None
+
+
+profiler = RequestProfiler()
+
+
+class ProfilingMiddleware:
+    """Middleware ASGI que amostra as requisições escolhidas pelo RequestProfiler
+
+    Deve ficar dentro do RequestContextMiddleware, para que o perfil registre
+    o id da requisição e o tempo de cada etapa. Sem profiling ativo, custa
+    apenas a checagem da configuração.
+    """
+
+    def __init__(self, app, profiler: RequestProfiler = profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.profiler.enabled or not self.profiler.matches(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        state = {"sampler": None, "reason": None, "status": 500}
+        if self.profiler.sample_rate > 0 and random.random() < self.profiler.sample_rate:
+            state["sampler"], state["reason"] = self.profiler.begin(), "sampled"
+
+        def start_slow():
+            if state["sampler"] is None:
+                state["sampler"], state["reason"] = self.profiler.begin(), "slow"
+
+        timer = None
+        if state["sampler"] is None and self.profiler.slow_ms > 0:
+            timer = asyncio.get_running_loop().call_later(self.profiler.slow_ms / 1000, start_slow)
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            if timer is not None:
+                timer.cancel()
+            sampler = state["sampler"]
+            if sampler is not None:
+                metadata = {
+                    "reason": state["reason"],
+                    "request_id": current_request_id(),
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": state["status"],
+                    "duration_ms": round(elapsed * 1000, 2),
+                    "stages_ms": {stage: round(value * 1000, 2) for stage, value in current_stages().items()},
+                    "captured_at": datetime.utcnow().isoformat(timespec="seconds"),
+                }
+                await asyncio.to_thread(self.profiler.finish, sampler, metadata)
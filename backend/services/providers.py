@@ -0,0 +1,363 @@
+import os
+import re
+import time
+import random
+import asyncio
+import base64
+import hashlib
+import unicodedata
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import numpy as np
+from backend.models.schemas import TokenUsage
+from backend.services.tokenizer import count_message_tokens, count_tokens
+
+
+class EmbeddingProvider(ABC):
+    """Interface dos provedores de embeddings"""
+
+    name: str
+    model: str
+    # Dimensão pedida ao modelo (None = dimensão padrão do modelo)
+    dimensions: Optional[int] = None
+
+    @property
+    def key(self) -> str:
+        """Identifica o espaço vetorial (modelo e dimensão) nos embeddings armazenados"""
+        return f"{self.model}@{self.dimensions}" if self.dimensions else self.model
+
+    @property
+    def config(self) -> Dict:
+        """Configuração que recria este provedor com create_embedding_provider"""
+        # 0 = dimensão padrão do modelo
+        return {"name": self.name, "model": self.model, "dimensions": self.dimensions or 0}
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Gera os embeddings de um lote de textos (uma requisição)"""
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        """Versão assíncrona de embed"""
+        return await asyncio.to_thread(self.embed, texts)
+
+
+class ChatProvider(ABC):
+    """Interface dos provedores de chat"""
+
+    model: str
+
+    @abstractmethod
+    def complete(self, messages: List[dict]) -> Tuple[str, TokenUsage]:
+        """Gera a resposta completa; retorna (resposta, tokens do prompt e da resposta)"""
+
+    async def acomplete(self, messages: List[dict]) -> Tuple[str, TokenUsage]:
+        """Versão assíncrona de complete"""
+        return await asyncio.to_thread(self.complete, messages)
+
+    async def astream(self, messages: List[dict]) -> AsyncIterator[Tuple[str, object]]:
+        """Produz ("token", trecho) para cada trecho e, ao final, ("usage", TokenUsage)"""
+        answer, usage = await self.acomplete(messages)
+        yield "token", answer
+        yield "usage", usage
+
+    def count_usage(self, messages: List[dict], answer: str) -> TokenUsage:
+        """Contagem local de tokens, para provedores que não informam o uso"""
+        return TokenUsage(
+            prompt_tokens=count_message_tokens(messages, self.model),
+            completion_tokens=count_tokens(answer, self.model)
+        )
+
+
+# ---------------------------------------------------------------------------
+# OpenAI
+# ---------------------------------------------------------------------------
+
+@lru_cache(maxsize=1)
+def get_openai_clients():
+    """Retorna os clientes OpenAI (síncrono e assíncrono), compartilhados pelo processo"""
+    import httpx
+    from openai import OpenAI, AsyncOpenAI
+
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY não encontrada nas variáveis de ambiente")
+
+    # Configura cliente HTTP (se precisar proxy)
+    http_client = None
+    if os.getenv("HTTPS_PROXY"):
+        http_client = httpx.Client(proxies={"https": os.getenv("HTTPS_PROXY")})
+
+    # Inicializa o client OpenAI
+    client = OpenAI(
+        api_key=api_key,
+        http_client=http_client,
+        timeout=60.0  # timeout maior para embeddings
+    )
+
+    # Cliente assíncrono com um único pool de conexões compartilhado por todas as requisições
+    max_connections = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+    async_http_client = httpx.AsyncClient(
+        proxies={"https://": os.getenv("HTTPS_PROXY")} if os.getenv("HTTPS_PROXY") else None,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections
+        ),
+        timeout=60.0
+    )
+    async_client = AsyncOpenAI(
+        api_key=api_key,
+        http_client=async_http_client,
+        timeout=60.0
+    )
+    return client, async_client
+
+
+def _env_dimensions() -> Optional[int]:
+    value = os.getenv("EMBEDDING_DIMENSIONS")
+    return int(value) if value else None
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    name = "openai"
+
+    def __init__(self, model: str = None, dimensions: int = None):
+        self.client, self.async_client = get_openai_clients()
+        self.model = model or os.getenv("EMBEDDINGS_MODEL", "text-embedding-3-small")
+        # Os modelos text-embedding-3 aceitam vetores menores (menos memória, disco e tempo de busca)
+        # dimensions=0 pede explicitamente a dimensão padrão do modelo
+        self.dimensions = (dimensions if dimensions is not None else _env_dimensions()) or None
+        self.max_retries = int(os.getenv("EMBEDDING_MAX_RETRIES", "5"))
+
+    @staticmethod
+    def _decode_embedding(embedding) -> List[float]:
+        """Decodifica um embedding recebido em base64 (float32 little-endian)"""
+        # Em base64 o cliente não precisa construir um objeto por float da resposta
+        if isinstance(embedding, str):
+            return np.frombuffer(base64.b64decode(embedding), dtype="<f4").tolist()
+        return embedding
+
+    def _decode_response(self, response) -> List[List[float]]:
+        return [
+            self._decode_embedding(item.embedding)
+            for item in sorted(response.data, key=lambda item: item.index)
+        ]
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        from openai import APIConnectionError, APIStatusError, RateLimitError
+
+        if isinstance(error, (RateLimitError, APIConnectionError)):
+            return True
+        return isinstance(error, APIStatusError) and error.status_code >= 500
+
+    @staticmethod
+    def _retry_delay(error: Exception, attempt: int) -> float:
+        """Tempo de espera antes da próxima tentativa (Retry-After ou backoff exponencial)"""
+        response = getattr(error, "response", None)
+        if response is not None:
+            retry_after = response.headers.get("retry-after")
+            if retry_after:
+                try:
+                    return min(float(retry_after), 60.0)
+                except ValueError:
+                    pass
+        return min(2 ** attempt, 30) * 0.5 + random.uniform(0, 0.5)
+
+    def _request_options(self) -> Dict:
+        options = {"model": self.model, "encoding_format": "base64"}
+        if self.dimensions:
+            options["dimensions"] = self.dimensions
+        return options
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Gera embeddings para um lote, com novas tentativas em 429 e 5xx"""
+        # As novas tentativas são controladas aqui, e não pelo cliente
+        client = self.client.with_options(max_retries=0)
+        attempt = 0
+        while True:
+            try:
+                response = client.embeddings.create(input=texts, **self._request_options())
+                return self._decode_response(response)
+            except Exception as e:
+                if attempt >= self.max_retries or not self._is_retryable(e):
+                    raise
+                time.sleep(self._retry_delay(e, attempt))
+                attempt += 1
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        client = self.async_client.with_options(max_retries=0)
+        attempt = 0
+        while True:
+            try:
+                response = await client.embeddings.create(input=texts, **self._request_options())
+                return self._decode_response(response)
+            except Exception as e:
+                if attempt >= self.max_retries or not self._is_retryable(e):
+                    raise
+                await asyncio.sleep(self._retry_delay(e, attempt))
+                attempt += 1
+
+
+class OpenAIChatProvider(ChatProvider):
+    def __init__(self):
+        self.client, self.async_client = get_openai_clients()
+        self.model = os.getenv("CHAT_MODEL", "gpt-3.5-turbo")
+
+    @staticmethod
+    def _usage(usage) -> TokenUsage:
+        if isinstance(usage, dict):
+            return TokenUsage(prompt_tokens=usage["prompt_tokens"], completion_tokens=usage["completion_tokens"])
+        return TokenUsage(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+
+    def complete(self, messages: List[dict]) -> Tuple[str, TokenUsage]:
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=0.7,
+            max_tokens=500
+        )
+        return response.choices[0].message.content, self._usage(response.usage)
+
+    async def acomplete(self, messages: List[dict]) -> Tuple[str, TokenUsage]:
+        response = await self.async_client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=0.7,
+            max_tokens=500
+        )
+        return response.choices[0].message.content, self._usage(response.usage)
+
+    async def astream(self, messages: List[dict]) -> AsyncIterator[Tuple[str, object]]:
+        stream = await self.async_client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=0.7,
+            max_tokens=500,
+            stream=True,
+            # Pede à API o uso de tokens no último evento do stream
+            extra_body={"stream_options": {"include_usage": True}}
+        )
+
+        answer = []
+        token_usage = None
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                answer.append(chunk.choices[0].delta.content)
+                yield "token", chunk.choices[0].delta.content
+
+            usage = getattr(chunk, "usage", None)
+            if usage:
+                token_usage = self._usage(usage)
+
+        if token_usage is None:
+            # Provedor sem suporte a stream_options: conta os tokens localmente
+            token_usage = self.count_usage(messages, "".join(answer))
+        yield "usage", token_usage
+
+
+# ---------------------------------------------------------------------------
+# Provedores locais (sem rede), para testes de carga, CI e demonstrações offline
+# ---------------------------------------------------------------------------
+
+_WORD = re.compile(r"\w+")
+
+
+def _fold(text: str) -> str:
+    """Caixa baixa e remoção de acentos"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in text if not unicodedata.combining(char))
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """Embeddings determinísticos por feature hashing de palavras e bigramas
+
+    Textos com vocabulário parecido geram vetores próximos, o que basta para
+    exercitar a recuperação sem chamar a API.
+    """
+
+    name = "local"
+
+    def __init__(self, model: str = None, dimensions: int = None):
+        self.dimensions = (dimensions or _env_dimensions()
+                           or int(os.getenv("LOCAL_EMBEDDING_DIMENSIONS", "384")))
+        self.model = model or "local-hashing"
+
+    def _embed_one(self, text: str) -> List[float]:
+        words = _WORD.findall(_fold(text))
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            # Um bit do hash define o sinal, reduzindo o viés das colisões
+            vector[value % self.dimensions] += 1.0 if value >> 63 else -1.0
+
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector.tolist()
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed_one(text) for text in texts]
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        return self.embed(texts)
+
+
+class TemplateChatProvider(ChatProvider):
+    """Chat local que responde com as primeiras frases do contexto recuperado"""
+
+    def __init__(self):
+        self.model = "local-template"
+        self.max_sentences = int(os.getenv("LOCAL_CHAT_MAX_SENTENCES", "3"))
+
+    def complete(self, messages: List[dict]) -> Tuple[str, TokenUsage]:
+        content = messages[-1]["content"] if messages else ""
+        match = re.search(r"Contexto: (.*)\n\nPergunta: (.*)", content, re.S)
+        context, question = (match.group(1), match.group(2)) if match else ("", content)
+
+        sentences = [s.strip() for s in re.split(r"(?<=[.!?])\s+|\n+", context) if s.strip()]
+        if sentences:
+            answer = "Com base nos documentos: " + " ".join(sentences[:self.max_sentences])
+        else:
+            answer = f"Não encontrei informações nos documentos para responder: {question.strip()}"
+
+        return answer, self.count_usage(messages, answer)
+
+    async def acomplete(self, messages: List[dict]) -> Tuple[str, TokenUsage]:
+        return self.complete(messages)
+
+    async def astream(self, messages: List[dict]) -> AsyncIterator[Tuple[str, object]]:
+        answer, usage = self.complete(messages)
+        for i, word in enumerate(answer.split(" ")):
+            yield "token", word if i == 0 else " " + word
+        yield "usage", usage
+
+
+def _provider_name(variable: str) -> str:
+    return os.getenv(variable) or os.getenv("LLM_PROVIDER", "openai")
+
+
+def create_embedding_provider(name: str = None, model: str = None, dimensions: int = None) -> EmbeddingProvider:
+    """Cria o provedor de embeddings definido por EMBEDDING_PROVIDER (ou LLM_PROVIDER)
+
+    Os argumentos, quando informados, substituem a configuração do ambiente.
+    """
+    name = (name or _provider_name("EMBEDDING_PROVIDER")).lower()
+    if name == "openai":
+        return OpenAIEmbeddingProvider(model, dimensions)
+    if name == "local":
+        return HashingEmbeddingProvider(model, dimensions)
+    raise ValueError(f"Provedor de embeddings desconhecido: {name}")
+
+
+def create_chat_provider() -> ChatProvider:
+    """Cria o provedor de chat definido por CHAT_PROVIDER (ou LLM_PROVIDER)"""
+    name = _provider_name("CHAT_PROVIDER").lower()
+    if name == "openai":
+        return OpenAIChatProvider()
+    if name == "local":
+        return TemplateChatProvider()
+    raise ValueError(f"Provedor de chat desconhecido: {name}")
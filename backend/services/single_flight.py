@@ -0,0 +1,112 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class SingleFlight:
+    """Agrupa chamadas simultâneas com a mesma chave em uma única execução (threads)
+
+    A primeira chamada executa a função; as demais aguardam e recebem o mesmo
+    resultado (ou a mesma exceção). do() retorna (resultado, compartilhado), em que
+    compartilhado indica que a chamada apenas reaproveitou a execução de outra.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not leader:
+            return future.result(), True
+
+        try:
+            future.set_result(func())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+        return future.result(), False
+
+
+class AsyncSingleFlight:
+    """Versão assíncrona de SingleFlight, para corrotinas no mesmo event loop"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        task = self._calls.get(key)
+        shared = task is not None
+        if not shared:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        # shield: o cancelamento de um cliente não cancela a chamada compartilhada
+        return await asyncio.shield(task), shared
+
+
+class _SharedStream:
+    def __init__(self):
+        self.events: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.condition = asyncio.Condition()
+        self.task: Optional[asyncio.Task] = None
+
+
+class AsyncStreamFlight:
+    """Versão de AsyncSingleFlight para streams: um único produtor por chave
+
+    O primeiro consumidor inicia o stream; os que chegam enquanto ele está em
+    andamento recebem os eventos já produzidos e, em seguida, os novos, na
+    mesma ordem. stream() produz (evento, compartilhado). O produtor roda em
+    uma task própria: a desconexão de um cliente não interrompe os demais.
+    """
+
+    def __init__(self):
+        self._streams: Dict[Hashable, _SharedStream] = {}
+
+    async def _produce(self, key: Hashable, shared: _SharedStream, func: Callable[[], AsyncIterator[Any]]):
+        try:
+            async for event in func():
+                async with shared.condition:
+                    shared.events.append(event)
+                    shared.condition.notify_all()
+        except BaseException as e:
+            shared.error = e
+        finally:
+            if self._streams.get(key) is shared:
+                del self._streams[key]
+            async with shared.condition:
+                shared.done = True
+                shared.condition.notify_all()
+
+    async def stream(self, key: Hashable, func: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Tuple[Any, bool]]:
+        shared = self._streams.get(key)
+        is_shared = shared is not None
+        if not is_shared:
+            shared = self._streams[key] = _SharedStream()
+            shared.task = asyncio.ensure_future(self._produce(key, shared, func))
+
+        position = 0
+        while True:
+            async with shared.condition:
+                await shared.condition.wait_for(lambda: position < len(shared.events) or shared.done)
+                pending = shared.events[position:]
+                position += len(pending)
+                finished = shared.done
+            for event in pending:
+                yield event, is_shared
+            if finished:
+                if shared.error is not None:
+                    raise shared.error
+                return
@@ -0,0 +1,47 @@
+from functools import lru_cache
+from typing import List
+from backend.services.observability import get_logger
+
+logger = get_logger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa conservadora da quantidade de tokens de um texto"""
+    return len(text) // 3 + 1
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str = None):
+    """Tokenizador local (tiktoken) do modelo, ou None se ele não estiver disponível
+
+    Na primeira vez, o tiktoken baixa o vocabulário (ou o lê de
+    TIKTOKEN_CACHE_DIR). Sem rede, a falha fica no cache do lru_cache e as
+    contagens passam a ser estimadas, sem nova tentativa a cada requisição.
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding("cl100k_base")
+        except KeyError:
+            # Modelo desconhecido pelo tiktoken (por exemplo, os provedores locais)
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"Tokenizador do tiktoken indisponível ({str(e)}); usando estimativa de tokens")
+        return None
+
+
+def count_tokens(text: str, model: str = None) -> int:
+    """Conta os tokens de um texto com o tokenizador do modelo (ou uma estimativa)"""
+    encoding = _encoding(model)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages: List[dict], model: str = None) -> int:
+    """Conta os tokens de um prompt de chat, incluindo o custo fixo de cada mensagem"""
+    # Cada mensagem tem ~4 tokens de formatação e a resposta começa com mais 3
+    return sum(count_tokens(message["content"], model) + 4 for message in messages) + 3
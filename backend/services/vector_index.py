@@ -0,0 +1,132 @@
+import threading
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+
+
+class VectorIndex:
+    """Índice vetorial em memória com busca exata por similaridade de cosseno
+
+    Os vetores ficam em uma única matriz float32 contígua e já normalizada,
+    de modo que a similaridade de cosseno se reduz a um produto matriz-vetor.
+    """
+
+    def __init__(self, dimensions: int = None, initial_capacity: int = 64):
+        self.dimensions = dimensions
+        self._initial_capacity = initial_capacity
+        self._matrix = None
+        self._keys: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._positions
+
+    def keys(self) -> List[str]:
+        """Retorna as chaves indexadas"""
+        return list(self._keys)
+
+    def vectors(self) -> Tuple[List[str], np.ndarray]:
+        """Retorna (chaves, cópia da matriz de vetores normalizados)"""
+        with self._lock:
+            size = len(self._keys)
+            if self._matrix is None:
+                return [], np.zeros((0, self.dimensions or 0), dtype=np.float32)
+            return list(self._keys), self._matrix[:size].copy()
+
+    @staticmethod
+    def normalize(vectors: np.ndarray) -> np.ndarray:
+        """Normaliza vetores (linhas) para norma unitária"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _ensure_capacity(self, size: int):
+        if self._matrix is None:
+            capacity = max(self._initial_capacity, size)
+            self._matrix = np.zeros((capacity, self.dimensions), dtype=np.float32)
+        elif size > self._matrix.shape[0]:
+            capacity = max(size, self._matrix.shape[0] * 2)
+            matrix = np.zeros((capacity, self.dimensions), dtype=np.float32)
+            matrix[:len(self._keys)] = self._matrix[:len(self._keys)]
+            self._matrix = matrix
+
+    def add(self, key: str, vector: Sequence[float]):
+        """Adiciona (ou substitui) um vetor no índice"""
+        self.add_many([key], [vector])
+
+    def add_many(self, keys: Sequence[str], vectors: Sequence[Sequence[float]]):
+        """Adiciona vários vetores de uma só vez"""
+        if not keys:
+            return
+        vectors = self.normalize(np.asarray(vectors, dtype=np.float32).reshape(len(keys), -1))
+
+        with self._lock:
+            if self.dimensions is None:
+                self.dimensions = vectors.shape[1]
+            if vectors.shape[1] != self.dimensions:
+                raise ValueError(
+                    f"Dimensão do vetor ({vectors.shape[1]}) difere da dimensão do índice ({self.dimensions})"
+                )
+
+            new_keys = [key for key in dict.fromkeys(keys) if key not in self._positions]
+            self._ensure_capacity(len(self._keys) + len(new_keys))
+
+            for key, vector in zip(keys, vectors):
+                position = self._positions.get(key)
+                if position is None:
+                    position = len(self._keys)
+                    self._keys.append(key)
+                    self._positions[key] = position
+                self._matrix[position] = vector
+
+    def remove(self, key: str) -> bool:
+        """Remove um vetor do índice; retorna False se a chave não existir"""
+        with self._lock:
+            position = self._positions.pop(key, None)
+            if position is None:
+                return False
+
+            # Move a última linha para a posição removida para manter a matriz contígua
+            last = len(self._keys) - 1
+            if position != last:
+                last_key = self._keys[last]
+                self._matrix[position] = self._matrix[last]
+                self._keys[position] = last_key
+                self._positions[last_key] = position
+            self._keys.pop()
+            return True
+
+    def clear(self):
+        """Remove todos os vetores do índice"""
+        with self._lock:
+            self._matrix = None
+            self._keys = []
+            self._positions = {}
+
+    def search(self, query: Sequence[float], top_k: int = 3) -> List[Tuple[str, float]]:
+        """Retorna as top_k chaves mais similares à query como (chave, score)"""
+        with self._lock:
+            size = len(self._keys)
+            if size == 0 or top_k <= 0:
+                return []
+
+            query = self.normalize(np.asarray(query, dtype=np.float32).reshape(-1))
+            if query.shape[0] != self.dimensions:
+                raise ValueError(
+                    f"Dimensão da query ({query.shape[0]}) difere da dimensão do índice ({self.dimensions})"
+                )
+
+            scores = self._matrix[:size] @ query
+
+            # Seleção parcial dos top_k e ordenação apenas desses candidatos
+            top_k = min(top_k, size)
+            if top_k < size:
+                candidates = np.argpartition(scores, -top_k)[-top_k:]
+            else:
+                candidates = np.arange(size)
+            ordered = candidates[np.argsort(scores[candidates])[::-1]]
+            return [(self._keys[i], float(scores[i])) for i in ordered]
@@ -0,0 +1,267 @@
+import os
+import json
+import time
+import uuid
+import glob
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from backend.services.vector_index import VectorIndex
+
+QUANTIZATIONS = ("float32", "float16", "int8")
+
+
+def _data_path(path: str, snapshot_id: str, suffix: str) -> str:
+    return f"{path}-{snapshot_id}.{suffix}"
+
+
+def _save_array(filename: str, array: np.ndarray):
+    tmp = f"{filename}.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp, filename)
+
+
+def quantize(matrix: np.ndarray, quantization: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Quantiza vetores normalizados; retorna (códigos, escala por linha ou None)"""
+    if quantization == "float32":
+        return matrix.astype(np.float32), None
+    if quantization == "float16":
+        return matrix.astype(np.float16), None
+    if quantization == "int8":
+        # Quantização escalar simétrica por linha: x ≈ código * escala
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.round(matrix / scales[:, None]).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    raise ValueError(f"Quantização desconhecida: {quantization}")
+
+
+def save_snapshot(path: str, keys: List[str], matrix: np.ndarray, quantization: str,
+                  metadata: Dict = None) -> Dict:
+    """Grava um snapshot do índice em arquivos .npy que podem ser mapeados em memória
+
+    São gravados apenas os códigos quantizados, as escalas (int8) e as chaves:
+    por vetor, 4 bytes por dimensão em float32, 2 em float16 e 1 em int8 (mais
+    4 bytes de escala). Os vetores float32 exatos, usados na reordenação dos
+    candidatos, já estão no EmbeddingStore. O manifesto {path}.json é
+    substituído por último, de forma atômica, para que outros processos nunca
+    leiam um snapshot incompleto.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    snapshot_id = uuid.uuid4().hex[:12]
+    matrix = VectorIndex.normalize(matrix) if len(matrix) else np.asarray(matrix, dtype=np.float32)
+
+    codes, scales = quantize(matrix, quantization)
+    _save_array(_data_path(path, snapshot_id, "codes.npy"), codes)
+    if scales is not None:
+        _save_array(_data_path(path, snapshot_id, "scales.npy"), scales)
+    with open(_data_path(path, snapshot_id, "keys.json"), "w", encoding="utf-8") as f:
+        json.dump(keys, f)
+
+    manifest = dict(metadata or {})
+    manifest.update({
+        "id": snapshot_id,
+        "quantization": quantization,
+        "dimensions": int(matrix.shape[1]) if matrix.ndim == 2 else None,
+        "count": len(keys),
+        "created_at": time.time(),
+    })
+    tmp = f"{path}.json.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, f"{path}.json")
+
+    _remove_stale_files(path, snapshot_id)
+    return manifest
+
+
+def _remove_stale_files(path: str, current_id: str, min_age: float = 600.0):
+    """Apaga arquivos de snapshots antigos
+
+    Só remove arquivos com mais de min_age segundos, para não apagar um
+    snapshot que outro worker ainda está gravando. Processos que já mapearam
+    um arquivo removido continuam lendo-o normalmente.
+    """
+    now = time.time()
+    for filename in glob.glob(f"{glob.escape(path)}-*.*"):
+        if os.path.basename(filename).startswith(f"{os.path.basename(path)}-{current_id}."):
+            continue
+        try:
+            if now - os.path.getmtime(filename) > min_age:
+                os.remove(filename)
+        except OSError:
+            pass
+
+
+def read_manifest(path: str) -> Optional[Dict]:
+    """Retorna o manifesto do snapshot em path, se existir"""
+    try:
+        with open(f"{path}.json", "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class MappedVectorIndex:
+    """Índice vetorial sobre um snapshot mapeado em memória (np.load com mmap_mode)
+
+    As páginas dos arquivos ficam no cache do sistema operacional e são
+    compartilhadas por todos os workers que carregam o mesmo snapshot. A busca
+    percorre os códigos quantizados (float16: metade do tamanho em float32;
+    int8: um quarto, mais uma escala por vetor). Com exact_vectors ({chave:
+    vetor float32} para uma lista de chaves, em geral lidos do EmbeddingStore),
+    os melhores candidatos do int8 são reordenados com os vetores exatos; o
+    float16 já dá scores praticamente exatos e não é reordenado.
+
+    Inclusões e remoções posteriores ao snapshot ficam em um VectorIndex
+    em memória e em uma máscara de remoções, até o próximo snapshot.
+    """
+
+    def __init__(self, path: str, manifest: Dict = None, rescore_factor: int = None,
+                 exact_vectors: Callable[[List[str]], Dict[str, np.ndarray]] = None):
+        manifest = manifest or read_manifest(path)
+        if manifest is None:
+            raise FileNotFoundError(f"Snapshot não encontrado: {path}.json")
+        snapshot_id = manifest["id"]
+        self.path = path
+        self.manifest = manifest
+        self.quantization = manifest["quantization"]
+        self.dimensions = manifest["dimensions"]
+        self.rescore_factor = rescore_factor or int(os.getenv("VECTOR_RESCORE_FACTOR", "4"))
+        self.exact_vectors = exact_vectors if self.quantization == "int8" else None
+
+        self._codes = np.load(_data_path(path, snapshot_id, "codes.npy"), mmap_mode="r")
+        self._scales = None
+        if self.quantization == "int8":
+            self._scales = np.load(_data_path(path, snapshot_id, "scales.npy"), mmap_mode="r")
+        with open(_data_path(path, snapshot_id, "keys.json"), "r", encoding="utf-8") as f:
+            self._base_keys: List[str] = json.load(f)
+
+        self._base_positions = {key: i for i, key in enumerate(self._base_keys)}
+        self._deleted = np.zeros(len(self._base_keys), dtype=bool)
+        self._deleted_count = 0
+        self._delta = VectorIndex(self.dimensions)
+        self._lock = threading.RLock()
+
+    def _in_base(self, key: str) -> bool:
+        position = self._base_positions.get(key)
+        return position is not None and not self._deleted[position]
+
+    def __len__(self) -> int:
+        return len(self._base_keys) - self._deleted_count + len(self._delta)
+
+    def __contains__(self, key: str) -> bool:
+        return self._in_base(key) or key in self._delta
+
+    @property
+    def pending_changes(self) -> int:
+        """Quantidade de alterações ainda não gravadas em um snapshot"""
+        return self._deleted_count + len(self._delta)
+
+    def keys(self) -> List[str]:
+        """Retorna as chaves indexadas"""
+        with self._lock:
+            base = [key for key, deleted in zip(self._base_keys, self._deleted) if not deleted]
+            return base + self._delta.keys()
+
+    def _dequantize(self, positions: np.ndarray) -> np.ndarray:
+        matrix = np.asarray(self._codes[positions], dtype=np.float32)
+        if self._scales is not None:
+            matrix *= np.asarray(self._scales[positions], dtype=np.float32)[:, None]
+        return matrix
+
+    def vectors(self) -> Tuple[List[str], np.ndarray]:
+        """Retorna (chaves, matriz float32 de vetores normalizados)
+
+        Os vetores do snapshot voltam dequantizados; quantizá-los de novo
+        reproduz os mesmos códigos, e o próximo snapshot não perde precisão.
+        """
+        with self._lock:
+            live = np.flatnonzero(~self._deleted)
+            delta_keys, delta_matrix = self._delta.vectors()
+            keys = [self._base_keys[i] for i in live] + delta_keys
+            matrix = self._dequantize(live)
+            if len(delta_keys):
+                matrix = np.concatenate([matrix, delta_matrix])
+            return keys, matrix
+
+    def _delete_from_base(self, key: str) -> bool:
+        position = self._base_positions.get(key)
+        if position is None or self._deleted[position]:
+            return False
+        self._deleted[position] = True
+        self._deleted_count += 1
+        return True
+
+    def add(self, key: str, vector: Sequence[float]):
+        """Adiciona (ou substitui) um vetor no índice"""
+        self.add_many([key], [vector])
+
+    def add_many(self, keys: Sequence[str], vectors: Sequence[Sequence[float]]):
+        """Adiciona vetores ao índice em memória; substituídos saem do snapshot"""
+        if not keys:
+            return
+        with self._lock:
+            self._delta.add_many(keys, vectors)
+            for key in keys:
+                self._delete_from_base(key)
+
+    def remove(self, key: str) -> bool:
+        """Remove um vetor do índice; retorna False se a chave não existir"""
+        with self._lock:
+            removed_delta = self._delta.remove(key)
+            removed_base = self._delete_from_base(key)
+            return removed_delta or removed_base
+
+    def clear(self):
+        """Remove todos os vetores do índice"""
+        with self._lock:
+            self._deleted[:] = True
+            self._deleted_count = len(self._base_keys)
+            self._delta.clear()
+
+    def _approximate_scores(self, query: np.ndarray) -> np.ndarray:
+        """Scores com os códigos quantizados, em blocos para limitar a memória temporária"""
+        size = len(self._base_keys)
+        scores = np.empty(size, dtype=np.float32)
+        block_size = max(1, 2 ** 22 // max(1, self.dimensions))
+        for start in range(0, size, block_size):
+            block = np.asarray(self._codes[start:start + block_size], dtype=np.float32)
+            scores[start:start + block_size] = block @ query
+        if self._scales is not None:
+            scores *= self._scales
+        return scores
+
+    def search(self, query: Sequence[float], top_k: int = 3) -> List[Tuple[str, float]]:
+        """Retorna as top_k chaves mais similares à query como (chave, score)"""
+        with self._lock:
+            if len(self) == 0 or top_k <= 0:
+                return []
+            query = VectorIndex.normalize(np.asarray(query, dtype=np.float32).reshape(-1))
+            if query.shape[0] != self.dimensions:
+                raise ValueError(
+                    f"Dimensão da query ({query.shape[0]}) difere da dimensão do índice ({self.dimensions})"
+                )
+
+            results = self._delta.search(query, top_k)
+            live = len(self._base_keys) - self._deleted_count
+            if live:
+                scores = self._approximate_scores(query)
+                scores[self._deleted] = -np.inf
+
+                # Candidatos pelos códigos quantizados; com exact_vectors, score final com os vetores exatos
+                candidates_count = min(live, top_k * self.rescore_factor if self.exact_vectors else top_k)
+                candidates = np.argpartition(scores, -candidates_count)[-candidates_count:]
+                candidates = candidates[np.isfinite(scores[candidates])]
+                candidate_keys = [self._base_keys[i] for i in candidates]
+                exact = self.exact_vectors(candidate_keys) if self.exact_vectors else {}
+                for key, position in zip(candidate_keys, candidates):
+                    vector = exact.get(key)
+                    if vector is not None and len(vector) == self.dimensions:
+                        results.append((key, float(VectorIndex.normalize(vector) @ query)))
+                    else:
+                        results.append((key, float(scores[position])))
+
+            results.sort(key=lambda item: item[1], reverse=True)
+            return results[:top_k]
@@ -0,0 +1,134 @@
+import os
+import time
+import asyncio
+import threading
+from typing import Dict, Optional
+from backend.services.observability import get_logger
+
+logger = get_logger(__name__)
+
+
+class Warmup:
+    """Inicialização do índice e da QAChain em segundo plano
+
+    A API passa a responder assim que o processo sobe (/health); o índice é
+    carregado do snapshot persistido, ou gerado, em uma thread, e /ready
+    informa o andamento, com a quantidade de documentos e vetores já
+    indexados. Os módulos pesados (numpy, cliente da OpenAI, índices) só são
+    importados por essa thread. Os documentos são lidos antes do índice, e a
+    listagem de documentos não precisa esperar por ele.
+    """
+
+    def __init__(self, wait_timeout: float = None):
+        # Tempo máximo, em segundos, que uma requisição espera o índice antes de receber 503
+        self.wait_timeout = wait_timeout or float(os.getenv("WARMUP_WAIT", "30"))
+        self.status = "pending"  # pending | warming | ready | failed
+        self.stage: Optional[str] = None
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.qa_chain = None
+        self.document_service = None
+        # Andamento da indexação inicial: documentos indexados, total e vetores
+        self.indexed: Dict[str, int] = {}
+        self._ready = threading.Event()
+        # Um asyncio.Event por event loop com requisições esperando o aquecimento
+        self._waiters: Dict[asyncio.AbstractEventLoop, asyncio.Event] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def start(self):
+        """Inicia o aquecimento, se ainda não foi iniciado"""
+        with self._lock:
+            # Depois de uma falha, a próxima requisição tenta de novo
+            if self._thread is not None and self.status != "failed":
+                return
+            self._ready.clear()
+            self.error = None
+            self.indexed = {}
+            self.status = "warming"
+            self.started_at = time.monotonic()
+            self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+            self._thread.start()
+
+    def _build(self):
+        """Lê os documentos, gera o índice e retorna a QAChain"""
+        self.stage = "loading_documents"
+        from backend.services.document_service import DocumentService
+        self.document_service = DocumentService()
+
+        self.stage = "importing"
+        from backend.chains.qa_chain import QAChain
+        from backend.services.index_service import get_index_service
+
+        self.stage = "indexing"
+        get_index_service(document_service=self.document_service, progress=self._report_progress)
+        return QAChain()
+
+    def _run(self):
+        try:
+            self.qa_chain = self._build()
+            self.status = "ready"
+            logger.info(f"Índice pronto em {time.monotonic() - self.started_at:.1f}s")
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e)
+            logger.error(f"Erro ao inicializar o índice: {str(e)}")
+        finally:
+            self.stage = None
+            self.finished_at = time.monotonic()
+            with self._lock:
+                self._ready.set()
+                waiters, self._waiters = self._waiters, {}
+            for loop, event in waiters.items():
+                try:
+                    loop.call_soon_threadsafe(event.set)
+                except RuntimeError:
+                    # Event loop já encerrado
+                    pass
+
+    def _report_progress(self, documents: int, total: int, vectors: int):
+        self.indexed = {"documents": documents, "documents_total": total, "vectors": vectors}
+
+    def wait(self, timeout: float = None) -> bool:
+        """Espera o fim do aquecimento; retorna True se o índice ficou pronto"""
+        self.start()
+        self._ready.wait(timeout)
+        return self.status == "ready"
+
+    async def await_ready(self, timeout: float = None) -> bool:
+        """Versão assíncrona de wait, sem bloquear o event loop nem ocupar threads"""
+        self.start()
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            event = None if self._ready.is_set() else self._waiters.setdefault(loop, asyncio.Event())
+        if event is not None:
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.status == "ready"
+
+    def progress(self) -> dict:
+        """Estado do aquecimento, para o endpoint /ready"""
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = round((self.finished_at or time.monotonic()) - self.started_at, 3)
+        progress = {"status": self.status, "stage": self.stage, "elapsed_seconds": elapsed}
+        if self.error:
+            progress["error"] = self.error
+        if self.qa_chain is not None:
+            index_service = self.qa_chain.index_service
+            progress["documents"] = len(index_service.indexed_documents)
+            progress["vectors"] = len(index_service)
+            progress["reindexing"] = index_service.reindexing
+        else:
+            progress.update(self.indexed)
+        return progress
+
+
+warmup = Warmup()
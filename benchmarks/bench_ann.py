@@ -0,0 +1,80 @@
+"""Benchmark do índice aproximado (IVF) contra a busca exata
+
+Gera vetores agrupados em tópicos (como embeddings reais de uma base de
+documentos), usa o VectorIndex como referência exata e mede, para cada
+nprobe, o recall@k e a latência mediana do IVFIndex.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_ann
+    python -m benchmarks.bench_ann --size 1000000 --dimensions 1536 --nprobe 1 4 8 16 32
+"""
+import argparse
+import time
+import numpy as np
+
+from backend.services.ann_index import IVFIndex
+from backend.services.vector_index import VectorIndex
+
+
+def clustered_vectors(rng, size, dimensions, topics):
+    """Vetores em torno de `topics` centros, com ruído"""
+    centers = rng.standard_normal((topics, dimensions), dtype=np.float32)
+    labels = rng.integers(0, topics, size=size)
+    noise = rng.standard_normal((size, dimensions), dtype=np.float32)
+    return centers[labels] + 0.6 * noise
+
+
+def measure(func, queries):
+    """Retorna (resultados, latência mediana em ms) de func para cada query"""
+    results, timings = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(func(query))
+        timings.append((time.perf_counter() - start) * 1000)
+    return results, float(np.median(timings))
+
+
+def recall(approximate, exact):
+    hits = sum(len({key for key, _ in a} & {key for key, _ in e}) for a, e in zip(approximate, exact))
+    return hits / max(1, sum(len(e) for e in exact))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=200000)
+    parser.add_argument("--dimensions", type=int, default=384)
+    parser.add_argument("--topics", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=0, help="0 = automático (4·√N)")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    vectors = clustered_vectors(rng, args.size, args.dimensions, args.topics)
+    keys = [str(i) for i in range(args.size)]
+    # Queries próximas de pontos da base, como perguntas sobre trechos existentes
+    queries = vectors[rng.choice(args.size, size=args.queries, replace=False)]
+    queries = queries + 0.3 * rng.standard_normal(queries.shape, dtype=np.float32)
+
+    exact_index = VectorIndex(dimensions=args.dimensions, initial_capacity=args.size)
+    exact_index.add_many(keys, vectors)
+    exact, exact_ms = measure(lambda q: exact_index.search(q, args.top_k), queries)
+
+    ivf = IVFIndex(dimensions=args.dimensions, nlist=args.nlist, min_size=args.size)
+    start = time.perf_counter()
+    ivf.add_many(keys, vectors)
+    train_s = time.perf_counter() - start
+
+    print(f"base: {args.size} vetores x {args.dimensions} dimensões, {len(ivf._lists)} listas "
+          f"(treinamento + inserção: {train_s:.1f}s)")
+    print(f"{'busca':>12} {'recall@' + str(args.top_k):>10} {'latência (ms)':>14} {'speedup':>9}")
+    print(f"{'exata':>12} {1.0:10.3f} {exact_ms:14.3f} {'1x':>9}")
+    for nprobe in args.nprobe:
+        approximate, ann_ms = measure(lambda q: ivf.search(q, args.top_k, nprobe=nprobe), queries)
+        print(f"{'nprobe=' + str(nprobe):>12} {recall(approximate, exact):10.3f} {ann_ms:14.3f} "
+              f"{exact_ms / ann_ms:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Benchmark de ponta a ponta da API: perguntas e consultas aos documentos
+
+Sobe o backend isolado (provedores locais, sem rede) sobre o corpus
+sintético e dispara, com concorrência fixa, uma mistura de POST /ask, GET
+/documents (listagem paginada) e GET /documents/{arquivo}. Informa o tempo
+até o índice ficar pronto, latência p50/p95/p99 e vazão por tipo de
+requisição, acerto do documento de referência nas fontes da resposta, cache
+de respostas, tempo médio de cada etapa (de /metrics) e memória do backend.
+
+As perguntas se repetem depois de --questions perguntas distintas, o que
+exercita o cache de respostas; use --env ANSWER_CACHE_ENABLED=false para
+medir sem ele.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_e2e
+    python -m benchmarks.bench_e2e --documents 5000 --requests 5000 --concurrency 32
+"""
+import os
+import random
+import asyncio
+import argparse
+import tempfile
+
+import httpx
+
+from benchmarks.harness import (
+    BackendServer, RequestFailed, add_common_arguments, check, parse_env, print_load, run_load, save_result,
+    stage_timings,
+)
+from benchmarks.synthetic_corpus import SyntheticCorpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_common_arguments(parser, concurrency=16)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--questions", type=int, default=500, help="perguntas distintas")
+    parser.add_argument("--list-ratio", type=float, default=0.05, help="fração de GET /documents")
+    parser.add_argument("--get-ratio", type=float, default=0.05, help="fração de GET /documents/{arquivo}")
+    parser.add_argument("--page-size", type=int, default=50)
+    args = parser.parse_args()
+
+    corpus = SyntheticCorpus(args.documents, args.words, args.seed)
+    questions = corpus.questions(args.questions)
+    filenames = [corpus.filename(i) for i in range(args.documents)]
+    rng = random.Random(args.seed)
+    plan = [rng.random() for _ in range(args.requests)]
+    hits = {"hits": 0, "answers": 0}
+
+    async def request(client, i):
+        draw = plan[i]
+        if draw < args.list_ratio:
+            offset = i * args.page_size % max(1, args.documents)
+            response = await client.get("/documents", params={"offset": offset, "limit": args.page_size})
+            return check(response, "list")
+        if draw < args.list_ratio + args.get_ratio:
+            response = await client.get(f"/documents/{filenames[i % len(filenames)]}")
+            return check(response, "get")
+        question, expected = questions[i % len(questions)]
+        response = await client.post("/ask", json={"question": question})
+        check(response, "ask")
+        sources = response.json().get("sources") or []
+        if not sources:
+            raise RequestFailed("ask", "resposta sem fontes")
+        hits["answers"] += 1
+        hits["hits"] += any(source["filename"] == expected for source in sources)
+        return "ask"
+
+    with tempfile.TemporaryDirectory(prefix="bench-e2e-") as workdir, \
+            BackendServer(workdir, **parse_env(args.env)) as server:
+        corpus_bytes = corpus.write(os.path.join(workdir, "documents"))
+        results = {"corpus_bytes": corpus_bytes, "startup_s": round(server.start(), 3)}
+        ready = httpx.get(f"{server.url}/ready").json()
+        results.update(documents=ready.get("documents"), vectors=ready.get("vectors"))
+        results["memory_after_startup"] = server.memory()
+        print(f"índice pronto em {results['startup_s']:.1f}s: {results['documents']} documentos, "
+              f"{results['vectors']} vetores")
+
+        results["load"] = asyncio.run(run_load(server.url, request, args.requests, args.concurrency))
+        print_load(results["load"])
+        results["source_hit_rate"] = round(hits["hits"] / max(1, hits["answers"]), 4)
+        results["answer_cache"] = httpx.get(f"{server.url}/cache/stats").json()
+        results["stages"] = stage_timings(httpx.get(f"{server.url}/metrics").text)
+        results["memory"] = server.memory()
+        print(f"acerto nas fontes: {results['source_hit_rate']:.3f}  memória do backend: {results['memory']}")
+
+    config = dict(vars(args), env=parse_env(args.env))
+    config.pop("output")
+    print(f"resultado: {save_result('e2e', config, results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
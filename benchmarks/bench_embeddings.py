@@ -0,0 +1,81 @@
+"""Benchmark da geração de embeddings em lote contra o servidor falso
+
+Sobe benchmarks.fake_openai_server em uma thread e compara o laço antigo
+(uma requisição por texto) com OpenAIService.get_embeddings (lotes com
+concorrência limitada e novas tentativas).
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_embeddings --chunks 2000 --latency-ms 50 --error-rate 0.02
+"""
+import argparse
+import os
+import socket
+import threading
+import time
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_fake_server(port: int):
+    import uvicorn
+    from benchmarks.fake_openai_server import app
+
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--serial-max", type=int, default=200,
+                        help="quantidade de textos medida no laço serial (que é lento)")
+    args = parser.parse_args()
+
+    # O servidor falso lê a configuração do ambiente ao ser importado
+    os.environ["FAKE_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["FAKE_ERROR_RATE"] = str(args.error_rate)
+    port = free_port()
+    server = start_fake_server(port)
+
+    os.environ["OPENAI_API_KEY"] = "fake"
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{port}/v1"
+    from benchmarks.fake_openai_server import stats
+    from backend.services.openai_service import OpenAIService
+    service = OpenAIService()
+
+    texts = [f"Trecho sintético {i} sobre cursos e serviços do SENAI." for i in range(args.chunks)]
+
+    serial_texts = texts[:args.serial_max]
+    start = time.perf_counter()
+    for text in serial_texts:
+        service.get_embedding(text)
+    serial = time.perf_counter() - start
+    serial_rate = len(serial_texts) / serial
+    print(f"serial:     {len(serial_texts):>6} textos em {serial:7.2f}s ({serial_rate:8.0f} textos/s)")
+
+    stats.update({key: 0 for key in stats})
+    start = time.perf_counter()
+    embeddings = service.get_embeddings(texts)
+    batched = time.perf_counter() - start
+    batched_rate = len(texts) / batched
+    print(f"em lote:    {len(texts):>6} textos em {batched:7.2f}s ({batched_rate:8.0f} textos/s)")
+    print(f"requisições: {stats['embedding_requests']}  erros simulados: {stats['errors']}")
+    print(f"speedup: {batched_rate / serial_rate:.0f}x")
+
+    assert len(embeddings) == len(texts) and all(embeddings)
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
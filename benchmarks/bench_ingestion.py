@@ -0,0 +1,95 @@
+"""Benchmark da ingestão de documentos pela API
+
+Sobe o backend isolado (provedores locais, sem rede) com a base vazia e mede:
+- o envio do corpus sintético inteiro em um .tar.gz para POST /documents/bulk,
+  até o job terminar (documentos e chunks por segundo);
+- documentos avulsos enviados a POST /documents com concorrência fixa
+  (latência p50/p95/p99 de cada envio).
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_ingestion
+    python -m benchmarks.bench_ingestion --documents 5000 --uploads 500 --concurrency 16
+"""
+import time
+import asyncio
+import argparse
+import tempfile
+
+import httpx
+
+from benchmarks.harness import (
+    BackendServer, add_common_arguments, check, parse_env, print_load, run_load, save_result, stage_timings,
+)
+from benchmarks.synthetic_corpus import SyntheticCorpus
+
+
+def bulk_ingest(server: BackendServer, corpus: SyntheticCorpus, timeout: float) -> dict:
+    archive = corpus.tar_gz()
+    with httpx.Client(base_url=server.url, timeout=60) as client:
+        start = time.perf_counter()
+        response = client.post("/documents/bulk", params={"filename": "corpus.tar.gz"}, content=archive,
+                               headers={"Content-Type": "application/gzip"})
+        response.raise_for_status()
+        accepted = time.perf_counter() - start
+        job = response.json()
+        while job["status"] not in ("done", "failed"):
+            if time.perf_counter() - start > timeout:
+                raise TimeoutError(f"Ingestão não terminou em {timeout:.0f}s: {job}")
+            time.sleep(0.2)
+            job = client.get(f"/documents/bulk/{job['job_id']}").json()
+        elapsed = time.perf_counter() - start
+        vectors = client.get("/ready").json().get("vectors")
+
+    return {
+        "status": job["status"],
+        "documents": len(job["added"]),
+        "skipped": len(job["skipped"]),
+        "errors": len(job["errors"]),
+        "vectors": vectors,
+        "archive_bytes": len(archive),
+        "upload_s": round(accepted, 3),
+        "elapsed_s": round(elapsed, 3),
+        "documents_per_s": round(len(job["added"]) / elapsed, 2),
+        # VmHWM (peak_rss_mb) inclui o pico durante a ingestão
+        "memory": server.memory(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_common_arguments(parser)
+    parser.add_argument("--uploads", type=int, default=200, help="documentos avulsos enviados a POST /documents")
+    parser.add_argument("--timeout", type=float, default=1800)
+    args = parser.parse_args()
+
+    corpus = SyntheticCorpus(args.documents, args.words, args.seed)
+    uploads = SyntheticCorpus(args.uploads, args.words, args.seed + 1)
+    upload_documents = list(uploads.documents())
+
+    async def upload(client, i):
+        filename, content = upload_documents[i]
+        response = await client.post("/documents", json={"filename": f"avulso-{filename}", "content": content})
+        return check(response, "upload")
+
+    with tempfile.TemporaryDirectory(prefix="bench-ingestion-") as workdir, \
+            BackendServer(workdir, **parse_env(args.env)) as server:
+        results = {"startup_s": round(server.start(), 3)}
+        results["bulk"] = bulk_ingest(server, corpus, args.timeout)
+        print(f"bulk: {results['bulk']['documents']} documentos ({results['bulk']['vectors']} vetores) "
+              f"em {results['bulk']['elapsed_s']:.1f}s — {results['bulk']['documents_per_s']:.1f} documentos/s")
+
+        if args.uploads:
+            results["uploads"] = asyncio.run(run_load(server.url, upload, args.uploads, args.concurrency))
+            print_load(results["uploads"])
+
+        results["stages"] = stage_timings(httpx.get(f"{server.url}/metrics").text)
+        results["memory"] = server.memory()
+        print(f"memória do backend: {results['memory']}")
+
+    config = dict(vars(args), env=parse_env(args.env))
+    config.pop("output")
+    print(f"resultado: {save_result('ingestion', config, results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Benchmark da recuperação (sem geração de resposta), no próprio processo
+
+Monta o índice sobre o corpus sintético com os provedores locais e mede
+QAChain.get_relevant_context com várias threads: tempo de construção do
+índice, latência p50/p95/p99 e vazão das consultas, acerto do documento de
+referência entre os top-k e a memória do processo. Não passa pela API nem
+pelo cache de respostas, isolando o custo do índice (vetorial, BM25 e RRF).
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_retrieval
+    python -m benchmarks.bench_retrieval --documents 20000 --queries 5000 --env RETRIEVAL_MODE=vector
+"""
+import os
+import time
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.harness import (
+    add_common_arguments, isolated_env, memory, parse_env, save_result, stage_timings, summarize,
+)
+from benchmarks.synthetic_corpus import SyntheticCorpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_common_arguments(parser, documents=2000, concurrency=4)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--top-k", type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = SyntheticCorpus(args.documents, args.words, args.seed)
+    questions = corpus.questions(args.queries)
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="bench-retrieval-") as workdir:
+        # Os serviços leem a configuração do ambiente ao serem criados
+        os.environ.update(isolated_env(workdir, **parse_env(args.env)))
+        os.chdir(workdir)
+        corpus_bytes = corpus.write(os.environ["DOCUMENTS_DIR"])
+        baseline = memory()
+
+        from backend.chains.qa_chain import QAChain
+        from backend.services.observability import metrics
+
+        start = time.perf_counter()
+        qa_chain = QAChain()
+        build_s = time.perf_counter() - start
+        index_service = qa_chain.index_service
+        print(f"índice: {len(index_service.indexed_documents)} documentos, {len(index_service)} vetores "
+              f"em {build_s:.1f}s")
+
+        def query(item):
+            question, expected = item
+            start = time.perf_counter()
+            chunks = qa_chain.get_relevant_context(question, args.top_k)
+            return time.perf_counter() - start, any(chunk.filename == expected for chunk in chunks)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            outcomes = list(executor.map(query, questions))
+        elapsed = time.perf_counter() - start
+
+        results = {
+            "corpus_bytes": corpus_bytes,
+            "documents": len(index_service.indexed_documents),
+            "vectors": len(index_service),
+            "build_s": round(build_s, 3),
+            "queries": summarize([latency for latency, _ in outcomes], elapsed),
+            f"hit_rate_at_{args.top_k}": round(sum(hit for _, hit in outcomes) / max(1, len(outcomes)), 4),
+            "stages": stage_timings(metrics.render()),
+            "memory": dict(memory(), baseline_rss_mb=baseline["rss_mb"]),
+        }
+        os.chdir(cwd)
+
+    latency = results["queries"]["latency_ms"]
+    print(f"consultas: {args.queries} com {args.concurrency} threads, {results['queries']['throughput_rps']:.0f}/s, "
+          f"p50 {latency['p50']:.2f} ms, p95 {latency['p95']:.2f} ms, p99 {latency['p99']:.2f} ms")
+    print(f"acerto@{args.top_k}: {results[f'hit_rate_at_{args.top_k}']:.3f}  memória: {results['memory']}")
+
+    config = dict(vars(args), env=parse_env(args.env))
+    config.pop("output")
+    print(f"resultado: {save_result('retrieval', config, results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
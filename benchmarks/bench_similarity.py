@@ -0,0 +1,80 @@
+"""Benchmark da busca por similaridade
+
+Compara o laço antigo (cosine_similarity do scikit-learn por documento + argsort
+completo) com o VectorIndex (produto matriz-vetor + argpartition) para bases de
+centenas a centenas de milhares de chunks.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_similarity
+    python -m benchmarks.bench_similarity --sizes 100 1000 10000 100000 300000 --dimensions 1536
+"""
+import argparse
+import time
+import numpy as np
+
+from backend.services.vector_index import VectorIndex
+
+
+def legacy_search(query, embeddings, top_k):
+    """Reprodução do laço original de QAChain.get_relevant_context"""
+    from sklearn.metrics.pairwise import cosine_similarity
+
+    similarities = []
+    for doc_embedding in embeddings:
+        similarity = cosine_similarity(
+            np.array(query).reshape(1, -1),
+            np.array(doc_embedding).reshape(1, -1)
+        )[0][0]
+        similarities.append(similarity)
+    return np.argsort(similarities)[-top_k:][::-1]
+
+
+def measure(func, repeat):
+    """Retorna a latência mediana (em ms) de func"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--legacy-max", type=int, default=10000,
+                        help="maior base em que o laço antigo é medido (ele é lento)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    print(f"{'chunks':>10} {'legado (ms)':>14} {'vetorizado (ms)':>16} {'speedup':>9}")
+
+    for size in args.sizes:
+        vectors = rng.standard_normal((size, args.dimensions), dtype=np.float32)
+        query = rng.standard_normal(args.dimensions, dtype=np.float32)
+
+        index = VectorIndex(dimensions=args.dimensions, initial_capacity=size)
+        index.add_many([str(i) for i in range(size)], vectors)
+
+        vectorized = measure(lambda: index.search(query, args.top_k), args.repeat)
+
+        legacy = None
+        if size <= args.legacy_max:
+            try:
+                embeddings = vectors.tolist()
+                legacy_query = query.tolist()
+                legacy = measure(lambda: legacy_search(legacy_query, embeddings, args.top_k),
+                                 max(1, min(args.repeat, 3)))
+            except ImportError:
+                pass
+
+        legacy_text = f"{legacy:14.2f}" if legacy is not None else f"{'-':>14}"
+        speedup_text = f"{legacy / vectorized:8.0f}x" if legacy is not None else f"{'-':>9}"
+        print(f"{size:>10} {legacy_text} {vectorized:16.3f} {speedup_text}")
+
+
+if __name__ == "__main__":
+    main()
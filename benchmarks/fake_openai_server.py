@@ -0,0 +1,153 @@
+"""Servidor local que imita os endpoints de embeddings e chat da OpenAI
+
+Útil para testar ingestão, reindexação e carga sem rede e sem custo. Os
+embeddings são determinísticos (derivados do hash do texto) e é possível
+simular latência e erros 429/503.
+
+Uso:
+    FAKE_LATENCY_MS=50 FAKE_ERROR_RATE=0.05 uvicorn benchmarks.fake_openai_server:app --port 9000
+    OPENAI_BASE_URL=http://localhost:9000/v1 OPENAI_API_KEY=fake uvicorn backend.main:app
+"""
+import os
+import time
+import random
+import json
+import asyncio
+import base64
+import hashlib
+from typing import Any, Dict, List, Union
+import numpy as np
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+LATENCY_MS = float(os.getenv("FAKE_LATENCY_MS", "0"))
+ERROR_RATE = float(os.getenv("FAKE_ERROR_RATE", "0"))
+DIMENSIONS = int(os.getenv("FAKE_DIMENSIONS", "1536"))
+MAX_BATCH_SIZE = 2048
+
+app = FastAPI(title="Fake OpenAI")
+stats = {"embedding_requests": 0, "embedded_texts": 0, "chat_requests": 0, "errors": 0}
+
+
+class EmbeddingRequest(BaseModel):
+    model: str
+    input: Union[str, List[str]]
+    dimensions: int = None
+    encoding_format: str = "float"
+
+
+class ChatRequest(BaseModel):
+    model: str
+    messages: List[Dict[str, Any]]
+    stream: bool = False
+    stream_options: Dict[str, Any] = None
+
+
+def fake_embedding(text: str, dimensions: int, encoding_format: str = "float") -> Union[str, List[float]]:
+    """Embedding determinístico derivado do hash do texto"""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dimensions).astype("<f4")
+    vector /= np.linalg.norm(vector)
+    if encoding_format == "base64":
+        return base64.b64encode(vector.tobytes()).decode("ascii")
+    return vector.tolist()
+
+
+async def simulate_upstream():
+    """Aplica a latência configurada e, eventualmente, devolve um erro"""
+    if LATENCY_MS:
+        await asyncio.sleep(LATENCY_MS / 1000)
+    if ERROR_RATE and random.random() < ERROR_RATE:
+        stats["errors"] += 1
+        status_code = random.choice([429, 503])
+        return JSONResponse(
+            status_code=status_code,
+            content={"error": {"message": "erro simulado", "type": "fake_error"}},
+            headers={"retry-after": "0.1"} if status_code == 429 else None
+        )
+    return None
+
+
+@app.post("/v1/embeddings")
+async def create_embeddings(request: EmbeddingRequest):
+    error = await simulate_upstream()
+    if error is not None:
+        return error
+
+    texts = [request.input] if isinstance(request.input, str) else request.input
+    if len(texts) > MAX_BATCH_SIZE:
+        return JSONResponse(status_code=400, content={"error": {"message": "lote muito grande"}})
+
+    stats["embedding_requests"] += 1
+    stats["embedded_texts"] += len(texts)
+    dimensions = request.dimensions or DIMENSIONS
+    tokens = sum(len(text) // 4 + 1 for text in texts)
+    # JSONResponse evita a conversão (lenta) do FastAPI para listas grandes de floats
+    return JSONResponse({
+        "object": "list",
+        "model": request.model,
+        "data": [
+            {"object": "embedding", "index": i, "embedding": fake_embedding(text, dimensions, request.encoding_format)}
+            for i, text in enumerate(texts)
+        ],
+        "usage": {"prompt_tokens": tokens, "total_tokens": tokens}
+    })
+
+
+@app.post("/v1/chat/completions")
+async def create_chat_completion(request: ChatRequest):
+    error = await simulate_upstream()
+    if error is not None:
+        return error
+
+    stats["chat_requests"] += 1
+    question = request.messages[-1]["content"] if request.messages else ""
+    answer = f"Resposta simulada para: {question[-200:]}"
+    prompt_tokens = sum(len(str(message.get("content", ""))) // 4 + 1 for message in request.messages)
+    completion_tokens = len(answer) // 4 + 1
+    usage = {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens
+    }
+
+    if request.stream:
+        include_usage = bool((request.stream_options or {}).get("include_usage"))
+        return StreamingResponse(stream_answer(request.model, answer, usage if include_usage else None),
+                                 media_type="text/event-stream")
+
+    return {
+        "id": f"chatcmpl-fake-{int(time.time() * 1000)}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": answer},
+            "finish_reason": "stop"
+        }],
+        "usage": usage
+    }
+
+
+async def stream_answer(model: str, answer: str, usage: Dict[str, int] = None):
+    """Envia a resposta palavra por palavra no formato de streaming da OpenAI"""
+    base = {"id": "chatcmpl-fake-stream", "object": "chat.completion.chunk", "created": int(time.time()), "model": model}
+    words = answer.split(" ")
+    for i, word in enumerate(words):
+        delta = {"content": word if i == 0 else " " + word}
+        if i == 0:
+            delta["role"] = "assistant"
+        yield f"data: {json.dumps({**base, 'choices': [{'index': 0, 'delta': delta, 'finish_reason': None}]})}\n\n"
+        if LATENCY_MS:
+            await asyncio.sleep(LATENCY_MS / 1000 / len(words))
+    yield f"data: {json.dumps({**base, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]})}\n\n"
+    if usage:
+        yield f"data: {json.dumps({**base, 'choices': [], 'usage': usage})}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
@@ -0,0 +1,329 @@
+"""Infraestrutura comum dos benchmarks do pipeline de RAG
+
+- BackendServer sobe o backend (uvicorn) em um subprocesso isolado, com os
+  provedores locais (LLM_PROVIDER=local) e documentos, embeddings, snapshots
+  e usage.db em um diretório temporário, sem tocar nos dados do repositório;
+- run_load dispara requisições com concorrência fixa e coleta as latências;
+- summarize calcula p50/p95/p99 e vazão; save_result grava o resultado em
+  JSON (benchmarks/results/ por padrão), junto com a configuração e o commit.
+
+Para comparar duas execuções (a partir da raiz do repositório):
+    python -m benchmarks.harness benchmarks/results/e2e-A.json benchmarks/results/e2e-B.json
+"""
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import subprocess
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+import numpy as np
+
+from benchmarks.bench_embeddings import free_port
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+
+
+def isolated_env(workdir: str, **overrides) -> Dict[str, str]:
+    """Variáveis de ambiente que mantêm o backend dentro de workdir e sem rede"""
+    env = dict(os.environ)
+    env.update({
+        "LLM_PROVIDER": "local",
+        "DOCUMENTS_DIR": os.path.join(workdir, "documents"),
+        "EMBEDDING_STORE_PATH": os.path.join(workdir, "embeddings.db"),
+        "VECTOR_SNAPSHOT_PATH": os.path.join(workdir, "vectors"),
+        "USAGE_ARCHIVE_DIR": os.path.join(workdir, "archive"),
+        "LOG_LEVEL": "WARNING",
+        "PYTHONPATH": os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get("PYTHONPATH")])),
+    })
+    env.update({key: str(value) for key, value in overrides.items()})
+    return env
+
+
+def memory(pid: int = None) -> Dict[str, Optional[float]]:
+    """RSS atual e pico de RSS do processo, em MB
+
+    Lê /proc (Linux); em outros sistemas usa o psutil, se instalado, ou o
+    pico do próprio processo informado pelo módulo resource.
+    """
+    pid = pid or os.getpid()
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+        return {
+            "rss_mb": round(int(fields["VmRSS"].split()[0]) / 1024, 1),
+            "peak_rss_mb": round(int(fields["VmHWM"].split()[0]) / 1024, 1),
+        }
+    except (OSError, KeyError, ValueError):
+        pass
+    try:
+        import psutil
+        info = psutil.Process(pid).memory_info()
+        return {"rss_mb": round(info.rss / 2 ** 20, 1), "peak_rss_mb": None}
+    except Exception:
+        pass
+    if pid == os.getpid():
+        try:
+            import resource
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # ru_maxrss é em KB no Linux e em bytes no macOS
+            peak = peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+            return {"rss_mb": None, "peak_rss_mb": round(peak, 1)}
+        except ImportError:
+            pass
+    return {"rss_mb": None, "peak_rss_mb": None}
+
+
+class BackendServer:
+    """Backend em um subprocesso, para medir a API como em produção
+
+    O processo roda com cwd=workdir (o usage.db é criado em
+    workdir/backend/db) e com o ambiente de isolated_env. A saída do uvicorn
+    vai para workdir/server.log.
+    """
+
+    def __init__(self, workdir: str, **env):
+        self.workdir = workdir
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.env = isolated_env(workdir, **env)
+        self.process: Optional[subprocess.Popen] = None
+        self._log = None
+
+    def start(self, timeout: float = 300) -> float:
+        """Sobe o servidor e espera /ready; retorna o tempo até o índice ficar pronto"""
+        import httpx
+
+        self._log = open(os.path.join(self.workdir, "server.log"), "ab")
+        start = time.perf_counter()
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "backend.main:app", "--host", "127.0.0.1",
+             "--port", str(self.port), "--log-level", "warning"],
+            cwd=self.workdir, env=self.env, stdout=self._log, stderr=subprocess.STDOUT,
+        )
+        while time.perf_counter() - start < timeout:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"O backend encerrou ao subir; veja {self.workdir}/server.log")
+            try:
+                if httpx.get(f"{self.url}/ready", timeout=2).status_code == 200:
+                    return time.perf_counter() - start
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.1)
+        self.stop()
+        raise TimeoutError(f"O backend não ficou pronto em {timeout:.0f}s")
+
+    def memory(self) -> Dict[str, Optional[float]]:
+        return memory(self.process.pid)
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(15)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if self._log is not None:
+            self._log.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def add_common_arguments(parser: argparse.ArgumentParser, documents: int = 500, concurrency: int = 8):
+    """Argumentos comuns a todos os cenários"""
+    parser.add_argument("--documents", type=int, default=documents, help="documentos do corpus sintético")
+    parser.add_argument("--words", type=int, default=400, help="palavras por documento")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--concurrency", type=int, default=concurrency)
+    parser.add_argument("--env", action="append", default=[], metavar="VAR=VALOR",
+                        help="variável de ambiente do backend (ex.: --env RETRIEVAL_MODE=vector)")
+    parser.add_argument("--output", help="arquivo JSON do resultado (padrão: benchmarks/results/)")
+
+
+def parse_env(items: List[str]) -> Dict[str, str]:
+    env = {}
+    for item in items:
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise SystemExit(f"--env espera VAR=VALOR: {item}")
+        env[key] = value
+    return env
+
+
+def summarize(latencies: List[float], elapsed: float, errors: int = 0) -> dict:
+    """Latências (em segundos) -> contagem, vazão e percentis em ms"""
+    result = {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed > 0 else None,
+    }
+    if latencies:
+        values = np.array(latencies) * 1000
+        result["latency_ms"] = {
+            "mean": round(float(values.mean()), 2),
+            "p50": round(float(np.percentile(values, 50)), 2),
+            "p95": round(float(np.percentile(values, 95)), 2),
+            "p99": round(float(np.percentile(values, 99)), 2),
+            "max": round(float(values.max()), 2),
+        }
+    return result
+
+
+async def run_load(base_url: str, request: Callable[["httpx.AsyncClient", int], Awaitable[str]],
+                   total: int, concurrency: int, timeout: float = 120) -> dict:
+    """Executa request(client, i) para i em range(total), com `concurrency` em paralelo
+
+    request retorna o nome do tipo de requisição (ex.: "ask", "list") e deve
+    levantar exceção em caso de erro. Retorna summarize() por tipo e "all".
+    """
+    import httpx
+
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    counter = iter(range(total))
+
+    async def worker(client):
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                kind = await request(client, i)
+            except Exception as e:
+                kind = getattr(e, "kind", "error")
+                errors[kind] = errors.get(kind, 0) + 1
+                continue
+            latencies.setdefault(kind, []).append(time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    results = {
+        kind: summarize(latencies.get(kind, []), elapsed, errors.get(kind, 0))
+        for kind in sorted(set(latencies) | set(errors))
+    }
+    results["all"] = summarize(
+        [value for values in latencies.values() for value in values], elapsed, sum(errors.values())
+    )
+    results["all"]["elapsed_s"] = round(elapsed, 3)
+    return results
+
+
+class RequestFailed(Exception):
+    """Erro de uma requisição do benchmark, contado no tipo `kind`"""
+
+    def __init__(self, kind: str, message: str):
+        super().__init__(message)
+        self.kind = kind
+
+
+def check(response, kind: str) -> str:
+    if response.status_code >= 400:
+        raise RequestFailed(kind, f"{kind}: HTTP {response.status_code}")
+    return kind
+
+
+_STAGE_LINE = re.compile(r'^rag_stage_duration_seconds_(sum|count)\{stage="([^"]+)"\} (\S+)$')
+
+
+def stage_timings(metrics_text: str) -> Dict[str, dict]:
+    """Tempo médio de cada etapa, a partir do texto de /metrics"""
+    totals: Dict[str, Dict[str, float]] = {}
+    for line in metrics_text.splitlines():
+        match = _STAGE_LINE.match(line)
+        if match:
+            kind, stage, value = match.groups()
+            totals.setdefault(stage, {})[kind] = float(value)
+    return {
+        stage: {"count": int(values.get("count", 0)),
+                "mean_ms": round(values.get("sum", 0) / values["count"] * 1000, 3) if values.get("count") else None}
+        for stage, values in sorted(totals.items())
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def save_result(scenario: str, config: dict, results: dict, output: str = None) -> str:
+    """Grava o resultado em JSON; retorna o caminho do arquivo"""
+    started = datetime.now()
+    document = {
+        "scenario": scenario,
+        "timestamp": started.isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": config,
+        "results": results,
+    }
+    if output is None:
+        output = os.path.join(RESULTS_DIR, f"{scenario}-{started:%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2, ensure_ascii=False)
+    return output
+
+
+def print_load(results: dict):
+    print(f"{'requisição':>14} {'total':>7} {'erros':>6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for kind, result in results.items():
+        latency = result.get("latency_ms", {})
+        print(f"{kind:>14} {result['requests']:7d} {result['errors']:6d} {result['throughput_rps'] or 0:8.1f} "
+              f"{latency.get('p50', 0):9.2f} {latency.get('p95', 0):9.2f} {latency.get('p99', 0):9.2f}")
+
+
+def _flatten(value, prefix: str = "") -> Dict[str, float]:
+    if isinstance(value, dict):
+        items = {}
+        for key, item in value.items():
+            items.update(_flatten(item, f"{prefix}.{key}" if prefix else key))
+        return items
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {prefix: value}
+    return {}
+
+
+def compare(baseline_path: str, candidate_path: str):
+    """Mostra, métrica a métrica, a variação entre duas execuções"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(candidate_path, encoding="utf-8") as f:
+        candidate = json.load(f)
+    if baseline["scenario"] != candidate["scenario"]:
+        print(f"aviso: cenários diferentes ({baseline['scenario']} x {candidate['scenario']})")
+    if baseline.get("config") != candidate.get("config"):
+        print("aviso: configurações diferentes entre as execuções")
+    before, after = _flatten(baseline["results"]), _flatten(candidate["results"])
+    print(f"{'métrica':<48} {baseline.get('commit') or 'A':>12} {candidate.get('commit') or 'B':>12} {'variação':>9}")
+    for metric in sorted(set(before) & set(after)):
+        a, b = before[metric], after[metric]
+        change = f"{(b - a) / a * 100:+8.1f}%" if a else f"{'':>9}"
+        print(f"{metric:<48} {a:12.2f} {b:12.2f} {change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara dois resultados de benchmark (JSON)")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args()
+    compare(args.baseline, args.candidate)
+
+
+if __name__ == "__main__":
+    main()
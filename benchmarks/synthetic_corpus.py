@@ -0,0 +1,141 @@
+"""Corpus sintético em português para os benchmarks do pipeline de RAG
+
+Cada documento descreve um curso em uma unidade (com número único), com
+fatos fixos (carga horária, vagas, turno, início...) entre parágrafos de
+texto genérico. As perguntas geradas citam o curso, a cidade e a unidade,
+de modo que cada uma tenha um documento de referência no corpus.
+
+A geração é determinística para a mesma semente, e o mesmo corpus pode ser
+usado em execuções diferentes para comparar resultados.
+"""
+import io
+import os
+import random
+import tarfile
+import unicodedata
+from typing import Iterator, List, Tuple
+
+CURSOS = [
+    "Eletricista Industrial", "Mecânica Automotiva", "Soldagem", "Logística",
+    "Programação de Computadores", "Segurança do Trabalho", "Panificação",
+    "Automação Industrial", "Costura Industrial", "Manutenção de Máquinas",
+    "Desenho Técnico", "Eletrônica", "Refrigeração e Climatização", "Marcenaria",
+    "Química Industrial", "Redes de Computadores",
+]
+CIDADES = [
+    "São Paulo", "Belo Horizonte", "Salvador", "Recife", "Curitiba", "Porto Alegre",
+    "Fortaleza", "Manaus", "Goiânia", "Belém", "Florianópolis", "Natal", "Cuiabá",
+    "Vitória", "Campinas", "Joinville",
+]
+TURNOS = ["manhã", "tarde", "noite", "integral"]
+MESES = ["janeiro", "fevereiro", "março", "abril", "maio", "junho", "julho",
+         "agosto", "setembro", "outubro", "novembro", "dezembro"]
+ESCOLARIDADES = ["ensino fundamental completo", "ensino médio em andamento", "ensino médio completo"]
+
+_SUJEITOS = ["O aluno", "A turma", "O instrutor", "A empresa parceira", "O laboratório", "A coordenação",
+             "O estágio", "O programa", "A indústria local", "O egresso"]
+_VERBOS = ["desenvolve", "acompanha", "aplica", "avalia", "organiza", "pratica", "apresenta", "planeja",
+           "documenta", "revisa"]
+_OBJETOS = ["projetos práticos", "normas técnicas", "procedimentos de segurança", "indicadores de qualidade",
+            "atividades em equipe", "relatórios de produção", "rotinas de manutenção", "soluções tecnológicas",
+            "planos de trabalho", "estudos de caso"]
+_COMPLEMENTOS = ["ao longo do módulo", "com apoio do instrutor", "em ambiente simulado", "nas oficinas da unidade",
+                 "junto às empresas da região", "durante as aulas práticas", "no fim de cada etapa",
+                 "conforme o plano de curso"]
+
+
+def _slug(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return "-".join(text.lower().split())
+
+
+class SyntheticCorpus:
+    """Documentos e perguntas sintéticos
+
+    documents: quantidade de documentos; words: tamanho aproximado de cada um,
+    em palavras (controla a quantidade de chunks por documento).
+    """
+
+    def __init__(self, documents: int = 200, words: int = 400, seed: int = 42):
+        self.size = documents
+        self.words = words
+        self.seed = seed
+
+    def _facts(self, i: int) -> dict:
+        rng = random.Random(f"{self.seed}-{i}")
+        return {
+            "unidade": 100 + i,
+            "curso": CURSOS[i % len(CURSOS)],
+            "cidade": CIDADES[(i // len(CURSOS)) % len(CIDADES)],
+            "carga": rng.choice([160, 240, 400, 800, 1200]),
+            "vagas": rng.randint(15, 40),
+            "turno": rng.choice(TURNOS),
+            "inicio": rng.choice(MESES),
+            "escolaridade": rng.choice(ESCOLARIDADES),
+        }
+
+    def filename(self, i: int) -> str:
+        facts = self._facts(i)
+        return f"{_slug(facts['curso'])}-{_slug(facts['cidade'])}-{i:05d}.txt"
+
+    def document(self, i: int) -> str:
+        facts = self._facts(i)
+        rng = random.Random(f"{self.seed}-texto-{i}")
+        header = (
+            f"Curso de {facts['curso']} na unidade {facts['unidade']} de {facts['cidade']}.\n\n"
+            f"O curso de {facts['curso']} na unidade {facts['unidade']} de {facts['cidade']} tem carga "
+            f"horária de {facts['carga']} horas e oferece {facts['vagas']} vagas no turno da {facts['turno']}. "
+            f"As aulas começam em {facts['inicio']} e o requisito de entrada é {facts['escolaridade']}.\n\n"
+        )
+        paragraphs, words = [], len(header.split())
+        while words < self.words:
+            sentences = [
+                f"{rng.choice(_SUJEITOS)} {rng.choice(_VERBOS)} {rng.choice(_OBJETOS)} {rng.choice(_COMPLEMENTOS)}."
+                for _ in range(rng.randint(3, 6))
+            ]
+            paragraph = " ".join(sentences)
+            paragraphs.append(paragraph)
+            words += len(paragraph.split())
+        return header + "\n\n".join(paragraphs) + "\n"
+
+    def documents(self) -> Iterator[Tuple[str, str]]:
+        for i in range(self.size):
+            yield self.filename(i), self.document(i)
+
+    def questions(self, count: int) -> List[Tuple[str, str]]:
+        """(pergunta, arquivo que a responde) para documentos sorteados do corpus"""
+        rng = random.Random(f"{self.seed}-perguntas")
+        templates = [
+            "Qual é a carga horária do curso de {curso} na unidade {unidade} de {cidade}?",
+            "Quantas vagas tem o curso de {curso} na unidade {unidade} em {cidade}?",
+            "Em qual turno é o curso de {curso} da unidade {unidade}?",
+            "Quando começam as aulas de {curso} na unidade {unidade} de {cidade}?",
+            "Qual a escolaridade exigida para o curso de {curso} na unidade {unidade}?",
+        ]
+        questions = []
+        for _ in range(count):
+            i = rng.randrange(self.size)
+            questions.append((rng.choice(templates).format(**self._facts(i)), self.filename(i)))
+        return questions
+
+    def write(self, directory: str) -> int:
+        """Grava os documentos como .txt em directory; retorna o total de bytes"""
+        os.makedirs(directory, exist_ok=True)
+        total = 0
+        for filename, content in self.documents():
+            data = content.encode("utf-8")
+            with open(os.path.join(directory, filename), "wb") as f:
+                f.write(data)
+            total += len(data)
+        return total
+
+    def tar_gz(self) -> bytes:
+        """Corpus inteiro em um .tar.gz, como enviado a POST /documents/bulk"""
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+            for filename, content in self.documents():
+                data = content.encode("utf-8")
+                info = tarfile.TarInfo(filename)
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+        return buffer.getvalue()
@@ -86,8 +86,91 @@ st.markdown("""
 Este é um assistente que responde suas dúvidas sobre o SENAI usando documentos como referência.
 """)
 
+# Inicializar histórico de chat na sessão se não existir
+if 'messages' not in st.session_state:
+    st.session_state.messages = []
+
+# Função para extrair o nome do arquivo do conteúdo
+def get_filename_from_content(content: str) -> str:
+    # Aqui podemos adicionar mais mapeamentos conforme necessário
+    content_map = {
+        "O SENAI atua em mais de 28 áreas industriais": "senai_atuacao.txt",
+        "O SENAI é o Serviço Nacional de Aprendizagem Industrial, uma instituição privada": "senai_descricao.txt",
+        "O SENAI (Serviço Nacional de Aprendizagem Industrial) foi criado em 1942": "senai_historia.txt"
+    }
+    
+    for key, filename in content_map.items():
+        if content.startswith(key):
+            return filename
+    return "documento.txt"  # Nome genérico caso não encontre correspondência
+
+# Função para listar os documentos consultados (arquivo e trecho utilizado)
+def format_sources(sources: list, context: list) -> str:
+    if not sources:
+        return "<br>".join(f"📄 {get_filename_from_content(doc)}" for doc in context)
+    return "<br>".join(
+        f"📄 {source['filename']} (caracteres {source['start']}–{source['end']})"
+        for source in sources
+    )
+
+# HTML de uma resposta do assistente
+def render_assistant_message(message: dict) -> str:
+    return f"""
+    <div class="chat-message assistant-message">
+        <div>🤖 <b>Assistente:</b> {message["response"]}</div>
+        <div class="context-info">
+            <b>Documentos consultados:</b><br>
+            {format_sources(message.get("sources", []), message["context"])}
+        </div>
+        <div class="token-info">
+            Tokens utilizados: {message["tokens"]}
+        </div>
+    </div>
+    """
+
+# Lê os eventos Server-Sent Events de uma resposta em streaming
+def iter_sse(response):
+    event, data = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+
+# Envia a pergunta para o backend e exibe a resposta conforme ela é gerada
+def ask_streaming(question: str, placeholder) -> dict:
+    message = {"role": "assistant", "response": "", "context": [], "sources": [], "tokens": "..."}
+    placeholder.info("Processando sua pergunta...")
+
+    with requests.post(f"{API_URL}/ask/stream", json={"question": question}, stream=True) as response:
+        response.raise_for_status()
+        response.encoding = "utf-8"
+
+        for event, data in iter_sse(response):
+            if event == "context":
+                message["context"] = data["context_used"]
+                message["sources"] = data["sources"]
+            elif event == "token":
+                message["response"] += data["content"]
+            elif event == "done":
+                message["tokens"] = data["tokens_used"]
+                if "prompt_tokens" in data:
+                    message["tokens"] = (f'{data["tokens_used"]} '
+                                         f'(prompt: {data["prompt_tokens"]}, resposta: {data["completion_tokens"]})')
+            elif event == "error":
+                raise Exception(data["detail"])
+            else:
+                continue
+            placeholder.markdown(render_assistant_message(message), unsafe_allow_html=True)
+
+    return message
+
 # Sugestões de prompts
-if 'messages' not in st.session_state or not st.session_state.messages:
+if not st.session_state.messages:
     st.markdown("<div class='suggestions-title'>🤔 Experimente perguntar:</div>", unsafe_allow_html=True)
     
     sugestoes = [
@@ -107,55 +190,16 @@ if 'messages' not in st.session_state or not st.session_state.messages:
                 # Adicionar pergunta ao histórico
                 st.session_state.messages.append({"role": "user", "content": sugestao})
                 
-                # Mostrar indicador de "digitando"
-                with st.status("Processando sua pergunta...", expanded=True) as status:
-                    try:
-                        # Fazer requisição para o backend
-                        response = requests.post(
-                            f"{API_URL}/ask",
-                            json={"question": sugestao}
-                        )
-                        
-                        if response.status_code == 200:
-                            data = response.json()
-                            
-                            # Adicionar resposta ao histórico
-                            st.session_state.messages.append({
-                                "role": "assistant",
-                                "response": data["answer"],
-                                "context": data["context_used"],
-                                "tokens": data["tokens_used"]
-                            })
-                            
-                            status.update(label="Resposta gerada!", state="complete")
-                            st.rerun()
-                        else:
-                            st.error("Erro ao processar a pergunta. Tente novamente.")
-                            status.update(label="Erro ao processar", state="error")
-                    
-                    except Exception as e:
-                        st.error(f"Erro ao conectar com o backend: {str(e)}")
-                        status.update(label="Erro de conexão", state="error")
+                # Exibir a resposta conforme ela é gerada
+                try:
+                    message = ask_streaming(sugestao, st.empty())
+                    st.session_state.messages.append(message)
+                except Exception as e:
+                    st.error(f"Erro ao processar a pergunta: {str(e)}")
+                else:
+                    st.rerun()
     st.markdown("</div>", unsafe_allow_html=True)
 
-# Inicializar histórico de chat na sessão se não existir
-if 'messages' not in st.session_state:
-    st.session_state.messages = []
-
-# Função para extrair o nome do arquivo do conteúdo
-def get_filename_from_content(content: str) -> str:
-    # Aqui podemos adicionar mais mapeamentos conforme necessário
-    content_map = {
-        "O SENAI atua em mais de 28 áreas industriais": "senai_atuacao.txt",
-        "O SENAI é o Serviço Nacional de Aprendizagem Industrial, uma instituição privada": "senai_descricao.txt",
-        "O SENAI (Serviço Nacional de Aprendizagem Industrial) foi criado em 1942": "senai_historia.txt"
-    }
-    
-    for key, filename in content_map.items():
-        if content.startswith(key):
-            return filename
-    return "documento.txt"  # Nome genérico caso não encontre correspondência
-
 # Exibir mensagens do histórico
 for message in st.session_state.messages:
     with st.container():
@@ -166,18 +210,7 @@ for message in st.session_state.messages:
             </div>
             """, unsafe_allow_html=True)
         else:
-            st.markdown(f"""
-            <div class="chat-message assistant-message">
-                <div>🤖 <b>Assistente:</b> {message["response"]}</div>
-                <div class="context-info">
-                    <b>Documentos consultados:</b><br>
-                    {"<br>".join(f"📄 {get_filename_from_content(doc)}" for doc in message["context"])}
-                </div>
-                <div class="token-info">
-                    Tokens utilizados: {message["tokens"]}
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+            st.markdown(render_assistant_message(message), unsafe_allow_html=True)
 
 # Campo de entrada para a pergunta
 question = st.chat_input("Digite sua pergunta sobre o SENAI...")
@@ -195,45 +228,12 @@ if question:
         </div>
         """, unsafe_allow_html=True)
     
-    # Mostrar indicador de "digitando"
-    with st.status("Processando sua pergunta...", expanded=True) as status:
-        try:
-            # Fazer requisição para o backend
-            response = requests.post(f"{API_URL}/ask", json={"question": question})
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Adicionar resposta ao histórico
-                st.session_state.messages.append({
-                    "role": "assistant",
-                    "response": data["answer"],
-                    "context": data["context_used"],
-                    "tokens": data["tokens_used"]
-                })
-                
-                # Mostrar a nova resposta
-                st.markdown(f"""
-                <div class="chat-message assistant-message">
-                    <div>🤖 <b>Assistente:</b> {data["answer"]}</div>
-                    <div class="context-info">
-                        <b>Documentos consultados:</b><br>
-                        {"<br>".join(f"📄 {get_filename_from_content(doc)}" for doc in data["context_used"])}
-                    </div>
-                    <div class="token-info">
-                        Tokens utilizados: {data["tokens_used"]}
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                status.update(label="Resposta gerada!", state="complete")
-            else:
-                st.error("Erro ao processar a pergunta. Tente novamente.")
-                status.update(label="Erro ao processar", state="error")
-        
-        except Exception as e:
-            st.error(f"Erro ao conectar com o backend: {str(e)}")
-            status.update(label="Erro de conexão", state="error")
+    # Exibir a resposta conforme ela é gerada (streaming)
+    try:
+        message = ask_streaming(question, st.empty())
+        st.session_state.messages.append(message)
+    except Exception as e:
+        st.error(f"Erro ao processar a pergunta: {str(e)}")
 
 # Botão para limpar o histórico
 if st.session_state.messages and st.button("Limpar Histórico"):
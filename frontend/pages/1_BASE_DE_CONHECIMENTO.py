@@ -1,7 +1,9 @@
 import os
+import time
 import streamlit as st
 import requests
 from datetime import datetime
+from urllib.parse import quote
 
 API_URL = os.getenv("API_URL", "https://deploy-streamlit-senai.onrender.com")
 
@@ -90,6 +92,41 @@ st.markdown("""
 # Inicializar estado da sessão
 if 'expanded_docs' not in st.session_state:
     st.session_state.expanded_docs = set()
+if 'documents_page' not in st.session_state:
+    st.session_state.documents_page = 0
+# Última listagem recebida por página: {página: (ETag, dados)}
+if 'documents_cache' not in st.session_state:
+    st.session_state.documents_cache = {}
+# Conteúdo já baixado, por hash do documento
+if 'document_contents' not in st.session_state:
+    st.session_state.document_contents = {}
+
+PAGE_SIZE = 50
+
+def fetch_documents(page: int):
+    """Busca uma página da listagem, reaproveitando a anterior se ela não mudou (ETag)"""
+    cached = st.session_state.documents_cache.get(page)
+    headers = {"If-None-Match": cached[0]} if cached else {}
+    response = requests.get(
+        f"{API_URL}/documents",
+        params={"offset": page * PAGE_SIZE, "limit": PAGE_SIZE},
+        headers=headers
+    )
+    if response.status_code == 304 and cached:
+        return cached[1]
+    response.raise_for_status()
+    data = response.json()
+    st.session_state.documents_cache[page] = (response.headers.get("ETag"), data)
+    return data
+
+def fetch_content(doc):
+    """Baixa o conteúdo de um documento apenas quando o cartão é expandido"""
+    contents = st.session_state.document_contents
+    if doc['hash'] not in contents:
+        response = requests.get(f"{API_URL}/documents/{quote(doc['filename'])}")
+        response.raise_for_status()
+        contents[doc['hash']] = response.json()['content']
+    return contents[doc['hash']]
 
 # Título principal
 st.markdown("<h1 class='main-title'>📚 BASE DE CONHECIMENTO</h1>", unsafe_allow_html=True)
@@ -101,7 +138,7 @@ st.markdown("<h2 class='section-title'>ADICIONAR DOCUMENTO</h2>", unsafe_allow_h
 st.markdown("""
 <div style='padding: 1rem; background-color: #f8fafc; border-radius: 0.5rem; margin-bottom: 1.5rem; border-left: 4px solid #3182ce;'>
     <p style='margin: 0; color: #4a5568; font-size: 0.95rem; line-height: 1.5;'>
-        Aqui você pode contribuir com o conhecimento do assistente enviando arquivos de texto (.txt) contendo informações sobre o SENAI.
+        Aqui você pode contribuir com o conhecimento do assistente enviando arquivos de texto (.txt), ou um .zip/.tar com vários deles, contendo informações sobre o SENAI.
         Estes documentos serão utilizados como referência para responder às perguntas dos usuários no chat.
     </p>
 </div>
@@ -110,24 +147,38 @@ st.markdown("""
 col1, col2 = st.columns([3, 1])
 
 with col1:
-    uploaded_file = st.file_uploader("", type="txt")
+    uploaded_files = st.file_uploader("", type=["txt", "zip", "tar", "gz"], accept_multiple_files=True)
 with col2:
-    if uploaded_file:
+    if uploaded_files:
         if st.button("📤 Enviar"):
             try:
-                content = uploaded_file.getvalue().decode("utf-8")
-                filename = uploaded_file.name
-                
+                # Todos os arquivos em uma única requisição; o backend processa em segundo plano
                 response = requests.post(
-                    f"{API_URL}/documents",
-                    json={"filename": filename, "content": content}
+                    f"{API_URL}/documents/bulk",
+                    files=[("files", (file.name, file.getvalue())) for file in uploaded_files]
                 )
-                
-                if response.status_code == 200:
-                    st.success("✅ Documento adicionado!")
-                    st.rerun()
+
+                if response.status_code == 202:
+                    job_id = response.json()["job_id"]
+                    progress = st.progress(0.0, text="Processando documentos...")
+                    while True:
+                        job = requests.get(f"{API_URL}/documents/bulk/{job_id}").json()
+                        if job["total"]:
+                            progress.progress(min(1.0, job["processed"] / job["total"]),
+                                              text=f"{job['processed']} de {job['total']} documentos")
+                        if job["status"] in ("done", "failed"):
+                            break
+                        time.sleep(1)
+
+                    for error in job["errors"]:
+                        st.warning(error)
+                    if job["status"] == "done":
+                        st.success(f"✅ {len(job['added'])} documento(s) adicionado(s)!")
+                        st.rerun()
+                    else:
+                        st.error("Erro ao adicionar documentos.")
                 else:
-                    st.error("Erro ao adicionar documento.")
+                    st.error("Erro ao adicionar documentos.")
             except Exception as e:
                 st.error(f"Erro ao processar arquivo: {str(e)}")
 
@@ -135,55 +186,77 @@ with col2:
 st.markdown("<h2 class='section-title'>Documentos Disponíveis</h2>", unsafe_allow_html=True)
 
 try:
-    response = requests.get(f"{API_URL}/documents")
-    
-    if response.status_code == 200:
-        documents = response.json()
-        
-        if not documents:
-            st.info("Nenhum documento encontrado.")
-        
-        # Grid de documentos
-        for doc in documents:
-            doc_id = f"doc_{doc['filename']}"
-            is_expanded = doc_id in st.session_state.expanded_docs
-            
-            with st.container():
-                col1, col2 = st.columns([11, 1])
-                with col1:
-                    st.markdown(f"""
-                    <div class="document-card">
-                        <div class="document-title">
-                            {doc['filename']}
-                        </div>
-                        <div class="document-info">
-                            Adicionado em: {datetime.fromisoformat(doc['added_at']).strftime('%d/%m/%Y %H:%M')}
-                        </div>
+    data = fetch_documents(st.session_state.documents_page)
+    documents = data['items']
+    total_pages = max(1, -(-data['total'] // PAGE_SIZE))
+
+    if st.session_state.documents_page >= total_pages:
+        st.session_state.documents_page = total_pages - 1
+        st.rerun()
+
+    if not documents:
+        st.info("Nenhum documento encontrado.")
+
+    # Grid de documentos
+    for doc in documents:
+        doc_id = f"doc_{doc['filename']}"
+        is_expanded = doc_id in st.session_state.expanded_docs
+
+        with st.container():
+            col1, col2 = st.columns([11, 1])
+            with col1:
+                st.markdown(f"""
+                <div class="document-card">
+                    <div class="document-title">
+                        {doc['filename']}
                     </div>
-                    """, unsafe_allow_html=True)
-                
-                with col2:
-                    expand_button = st.button(
-                        "⬇️" if not is_expanded else "⬆️",
-                        key=f"expand_{doc_id}",
-                        help="Ler arquivo" if not is_expanded else "Recolher"
-                    )
-                    
-                    if expand_button:
-                        if is_expanded:
-                            st.session_state.expanded_docs.remove(doc_id)
-                        else:
-                            st.session_state.expanded_docs.add(doc_id)
-                        st.rerun()
-                
-                if is_expanded:
-                    st.text_area(
-                        "",
-                        value=doc['content'],
-                        height=300,
-                        disabled=True,
-                        key=f"content_{doc_id}"
-                    )
+                    <div class="document-info">
+                        Adicionado em: {datetime.fromisoformat(doc['added_at']).strftime('%d/%m/%Y %H:%M')}
+                        · {doc['size'] / 1024:.1f} KB
+                    </div>
+                </div>
+                """, unsafe_allow_html=True)
+
+            with col2:
+                expand_button = st.button(
+                    "⬇️" if not is_expanded else "⬆️",
+                    key=f"expand_{doc_id}",
+                    help="Ler arquivo" if not is_expanded else "Recolher"
+                )
+
+                if expand_button:
+                    if is_expanded:
+                        st.session_state.expanded_docs.remove(doc_id)
+                    else:
+                        st.session_state.expanded_docs.add(doc_id)
+                    st.rerun()
+
+            if is_expanded:
+                st.text_area(
+                    "",
+                    value=fetch_content(doc),
+                    height=300,
+                    disabled=True,
+                    key=f"content_{doc_id}"
+                )
+
+    # Paginação
+    if total_pages > 1:
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            if st.button("⬅️ Anterior", disabled=st.session_state.documents_page == 0):
+                st.session_state.documents_page -= 1
+                st.rerun()
+        with col2:
+            st.markdown(
+                f"<div style='text-align: center;'>Página {st.session_state.documents_page + 1} de {total_pages} "
+                f"({data['total']} documentos)</div>",
+                unsafe_allow_html=True
+            )
+        with col3:
+            if st.button("Próxima ➡️", disabled=st.session_state.documents_page >= total_pages - 1):
+                st.session_state.documents_page += 1
+                st.rerun()
 
 except Exception as e:
     st.error(f"Erro ao carregar documentos: {str(e)}") 
@@ -0,0 +1,69 @@
+"""Configuração comum dos testes
+
+Os testes rodam com os provedores locais (sem rede) e com todos os arquivos
+(documentos, embeddings, snapshots, usage.db) em um diretório temporário, sem
+tocar nos dados do repositório. O ambiente é definido antes de importar o
+backend, porque vários serviços leem a configuração ao serem criados.
+"""
+import os
+import sys
+import tempfile
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+_WORKDIR = tempfile.mkdtemp(prefix="backend-tests-")
+os.environ.update({
+    "LLM_PROVIDER": "local",
+    "DOCUMENTS_DIR": os.path.join(_WORKDIR, "documents"),
+    "EMBEDDING_STORE_PATH": os.path.join(_WORKDIR, "embeddings.db"),
+    "VECTOR_SNAPSHOT_PATH": os.path.join(_WORKDIR, "vectors"),
+    "USAGE_ARCHIVE_DIR": os.path.join(_WORKDIR, "archive"),
+    "PROFILE_DIR": os.path.join(_WORKDIR, "profiles"),
+    "LOG_LEVEL": "WARNING",
+})
+# O usage.db é criado em backend/db relativo ao diretório atual
+os.chdir(_WORKDIR)
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def documents_dir(tmp_path):
+    path = tmp_path / "documents"
+    path.mkdir()
+    return path
+
+
+@pytest.fixture
+def index_service(tmp_path, documents_dir, monkeypatch):
+    """IndexService isolado, sem intervalo entre as sincronizações com o disco"""
+    monkeypatch.setenv("EMBEDDING_STORE_PATH", str(tmp_path / "embeddings.db"))
+    monkeypatch.setenv("INDEX_SYNC_INTERVAL", "0")
+    from backend.services.document_service import DocumentService
+    from backend.services.index_service import IndexService
+
+    return IndexService(document_service=DocumentService(str(documents_dir)))
+
+
+class FlakyEmbeddings:
+    """Substitui get_embeddings: falha enquanto `failing` for True"""
+
+    def __init__(self, original):
+        self.original = original
+        self.failing = True
+        self.calls = 0
+
+    def __call__(self, texts, *args, **kwargs):
+        self.calls += 1
+        if self.failing:
+            raise RuntimeError("429 Too Many Requests")
+        return self.original(texts, *args, **kwargs)
+
+
+@pytest.fixture
+def flaky_embeddings(index_service, monkeypatch):
+    flaky = FlakyEmbeddings(index_service.embedder.get_embeddings)
+    monkeypatch.setattr(index_service.embedder, "get_embeddings", flaky)
+    return flaky
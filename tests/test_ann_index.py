@@ -0,0 +1,115 @@
+import threading
+
+import numpy as np
+
+from backend.services.ann_index import IVFIndex
+
+
+def random_vectors(count, dimensions=16, seed=0):
+    return np.random.default_rng(seed).normal(size=(count, dimensions)).astype(np.float32)
+
+
+def test_trains_at_min_size_and_finds_vectors():
+    vectors = random_vectors(200)
+    index = IVFIndex(nlist=8, nprobe=8, min_size=100)
+    index.add_many([f"v{i}" for i in range(200)], vectors)
+
+    assert index.trained and len(index) == 200
+    assert index.search(vectors[42], top_k=1)[0][0] == "v42"
+
+
+def test_index_stays_available_during_training_and_keeps_changes():
+    vectors = random_vectors(150)
+    index = IVFIndex(nlist=8, nprobe=8, min_size=100)
+    index.add_many([f"v{i}" for i in range(99)], vectors[:99])
+
+    started, release = threading.Event(), threading.Event()
+    build = index._build
+
+    def slow_build(keys, matrix):
+        started.set()
+        release.wait(5)
+        return build(keys, matrix)
+
+    index._build = slow_build
+    trainer = threading.Thread(target=index.add_many, args=(["v99"], vectors[99:100]))
+    trainer.start()
+    assert started.wait(5)
+
+    # O k-means roda fora do lock: buscas e alterações não esperam por ele
+    done = threading.Event()
+
+    def use_index():
+        index.search(vectors[0], top_k=1)
+        index.add_many([f"v{i}" for i in range(100, 150)], vectors[100:150])
+        index.remove("v5")
+        done.set()
+
+    threading.Thread(target=use_index).start()
+    assert done.wait(5)
+    assert not index.trained
+
+    release.set()
+    trainer.join(5)
+    assert index.trained
+    assert len(index) == 149 and "v5" not in index and "v149" in index
+    assert index.search(vectors[120], top_k=1)[0][0] == "v120"
+
+
+def test_clear_during_training_discards_the_result():
+    vectors = random_vectors(100)
+    index = IVFIndex(nlist=8, min_size=100)
+    index.add_many([f"v{i}" for i in range(99)], vectors[:99])
+
+    build = index._build
+
+    def build_then_clear(keys, matrix):
+        result = build(keys, matrix)
+        index.clear()
+        return result
+
+    index._build = build_then_clear
+    index.add_many(["v99"], vectors[99:100])
+    assert not index.trained and len(index) == 0
+
+
+def test_index_service_searches_while_ivf_trains(tmp_path, documents_dir, monkeypatch):
+    monkeypatch.setenv("INDEX_MODE", "ann")
+    monkeypatch.setenv("ANN_MIN_SIZE", "50")
+    monkeypatch.setenv("EMBEDDING_STORE_PATH", str(tmp_path / "embeddings.db"))
+    from backend.services.document_service import DocumentService
+    from backend.services.index_service import IndexService
+
+    def document(i):
+        return f"Curso {i}: a unidade {i} oferece a turma {i * 7} no turno {i % 3}."
+
+    for i in range(40):
+        (documents_dir / f"doc{i}.txt").write_text(document(i), encoding="utf-8")
+    service = IndexService(document_service=DocumentService(str(documents_dir)))
+    assert isinstance(service.index, IVFIndex) and not service.index.trained
+
+    started, release = threading.Event(), threading.Event()
+    build = service.index._build
+
+    def slow_build(keys, matrix):
+        started.set()
+        release.wait(5)
+        return build(keys, matrix)
+
+    service.index._build = slow_build
+    adder = threading.Thread(target=service.add_documents,
+                             args=({f"novo{i}.txt": document(100 + i) for i in range(20)},))
+    adder.start()
+    assert started.wait(5)
+
+    # O k-means roda sem o lock do IndexService
+    searched = threading.Event()
+    query = service.embed_query(document(3))
+    threading.Thread(target=lambda: (service.search(query, 3), service.lexical_search("turma", 3),
+                                     searched.set())).start()
+    assert searched.wait(2)
+
+    release.set()
+    adder.join(5)
+    assert service.index.trained and len(service.index) == 60
+    assert service.search(query, 1)[0].filename == "doc3.txt"
@@ -0,0 +1,52 @@
+from backend.services.answer_cache import AnswerCache
+
+
+def make_cache():
+    return AnswerCache(max_entries=10, ttl=60, similarity_threshold=0.9)
+
+
+def test_version_change_invalidates_entries():
+    cache = make_cache()
+    cache.put("Quais cursos o SENAI oferece?", [1.0, 0.0], "Soldagem", [], 10, corpus_version=1)
+    assert cache.get_exact("quais cursos o senai oferece", 1).answer == "Soldagem"
+
+    assert cache.get_exact("Quais cursos o SENAI oferece?", 2) is None
+    assert cache.get_similar([1.0, 0.0], 2) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_late_put_from_previous_version_is_dropped():
+    cache = make_cache()
+    cache.put("pergunta nova", None, "atual", [], 10, corpus_version=2)
+    # Resposta gerada antes da mudança da base, gravada depois
+    cache.put("pergunta antiga", None, "obsoleta", [], 10, corpus_version=1)
+
+    assert cache.get_exact("pergunta antiga", 2) is None
+    assert cache.get_exact("pergunta nova", 2).answer == "atual"
+
+
+def test_misses_are_counted_once_per_question():
+    cache = make_cache()
+    cache.put("horario das aulas", [1.0, 0.0], "À noite", [], 10, corpus_version=1)
+
+    # Miss no nível exato, sem consulta semântica (atalho lexical)
+    assert cache.get_exact("onde fica a unidade", 1) is None
+    # Miss exato seguido de acerto semântico
+    assert cache.get_exact("qual o horario das aulas", 1) is None
+    assert cache.get_similar([0.99, 0.05], 1).answer == "À noite"
+    # Miss nos dois níveis
+    assert cache.get_exact("quanto custa", 1) is None
+    assert cache.get_similar([0.0, 1.0], 1) is None
+
+    stats = cache.stats()
+    assert (stats["exact_hits"], stats["semantic_hits"], stats["misses"]) == (0, 1, 2)
+
+
+def test_explicit_zero_settings_are_not_replaced_by_defaults(monkeypatch):
+    monkeypatch.setenv("ANSWER_CACHE_MAX_ENTRIES", "512")
+    cache = AnswerCache(max_entries=0, ttl=0, similarity_threshold=0.0)
+    assert (cache.max_entries, cache.ttl, cache.similarity_threshold) == (0, 0, 0.0)
+
+    # Sem espaço no cache, nenhuma resposta é guardada
+    cache.put("horario das aulas", None, "À noite", [], 10, corpus_version=1)
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,32 @@
+import json
+
+from benchmarks.harness import compare, save_result, summarize
+from benchmarks.synthetic_corpus import SyntheticCorpus
+
+
+def test_summarize_reports_percentiles_and_errors():
+    result = summarize([0.001 * i for i in range(1, 101)], elapsed=2.0, errors=3)
+
+    assert result["requests"] == 103 and result["errors"] == 3
+    assert result["throughput_rps"] == 50.0
+    assert result["latency_ms"]["p50"] == 50.5
+    assert result["latency_ms"]["max"] == 100.0
+
+
+def test_synthetic_corpus_is_reproducible():
+    first, second = SyntheticCorpus(documents=5, seed=7), SyntheticCorpus(documents=5, seed=7)
+    assert list(first.documents()) == list(second.documents())
+    assert first.questions(10) == second.questions(10)
+    assert list(SyntheticCorpus(documents=5, seed=8).documents()) != list(first.documents())
+
+
+def test_compare_reports_relative_change(tmp_path, capsys):
+    baseline = save_result("e2e", {"requests": 10}, {"all": {"latency_ms": {"p95": 100.0}}},
+                           output=str(tmp_path / "a.json"))
+    candidate = save_result("e2e", {"requests": 10}, {"all": {"latency_ms": {"p95": 80.0}}},
+                            output=str(tmp_path / "b.json"))
+    assert json.loads((tmp_path / "a.json").read_text(encoding="utf-8"))["scenario"] == "e2e"
+
+    compare(baseline, candidate)
+    line = next(line for line in capsys.readouterr().out.splitlines() if line.startswith("all.latency_ms.p95"))
+    assert line.split()[-1] == "-20.0%"
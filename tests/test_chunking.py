@@ -0,0 +1,57 @@
+import pytest
+
+from backend.services.chunking_service import ChunkingService
+
+FRASES = " ".join(
+    f"A turma {i} do curso de soldagem tem aulas à noite na unidade de Recife." for i in range(20)
+)
+
+
+def test_chunk_offsets_point_into_the_original_text():
+    chunks = ChunkingService(chunk_size=200, chunk_overlap=50).split("cursos.txt", FRASES)
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert chunk.text == FRASES[chunk.start:chunk.end]
+        assert len(chunk.text) <= 200
+        assert chunk.chunk_id == f"cursos.txt:{chunk.start}"
+    # Os chunks cobrem o texto do início ao fim, em ordem
+    assert chunks[0].start == 0 and chunks[-1].end == len(FRASES)
+    for a, b in zip(chunks, chunks[1:]):
+        assert a.start < b.start
+        # Sobreposição ou, no máximo, o espaço entre duas frases
+        assert b.start <= a.end or not FRASES[a.end:b.start].strip()
+
+
+def test_chunks_end_at_sentence_boundaries_with_overlap():
+    chunks = ChunkingService(chunk_size=200, chunk_overlap=80).split("cursos.txt", FRASES)
+
+    for chunk in chunks:
+        assert chunk.text.startswith("A turma") and chunk.text.endswith(".")
+    # A última frase de um chunk se repete no início do seguinte
+    for a, b in zip(chunks, chunks[1:]):
+        last_sentence = a.text[a.text.rindex("A turma"):]
+        assert b.text.startswith(last_sentence)
+
+
+def test_long_sentences_are_split_between_words():
+    text = "palavra " * 300
+    chunks = ChunkingService(chunk_size=100, chunk_overlap=20).split("longo.txt", text.strip())
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert len(chunk.text) <= 100
+        assert chunk.text.split() and all(word == "palavra" for word in chunk.text.split())
+    assert chunks[-1].end == len(text.strip())
+
+
+def test_short_document_is_a_single_chunk():
+    text = "Aulas à noite.\nInscrições abertas."
+    chunks = ChunkingService().split("curto.txt", text)
+    assert [(chunk.start, chunk.end) for chunk in chunks] == [(0, len(text))]
+
+
+@pytest.mark.parametrize("size, overlap", [(0, 0), (100, 100), (100, -1)])
+def test_invalid_settings_are_rejected(size, overlap):
+    with pytest.raises(ValueError):
+        ChunkingService(chunk_size=size, chunk_overlap=overlap).split("x.txt", "texto")
@@ -0,0 +1,65 @@
+import sys
+import types
+
+from backend.models.schemas import DocumentChunk, TokenUsage
+from backend.services import tokenizer
+from backend.services.context_assembler import ContextAssembler
+from backend.services.providers import TemplateChatProvider
+from backend.services.tokenizer import count_tokens
+
+
+def chunk(text, name="a.txt", start=0):
+    return DocumentChunk(filename=name, text=text, start=start, end=start + len(text))
+
+
+SENTENCES = "O curso tem quarenta vagas. As aulas são à noite. O certificado é nacional."
+
+
+def test_chunks_that_fit_are_kept_in_order():
+    assembler = ContextAssembler(max_tokens=1000)
+    context, used = assembler.assemble([chunk("primeiro"), chunk("segundo", start=10)])
+    assert context == "primeiro\nsegundo"
+    assert [c.text for c in used] == ["primeiro", "segundo"]
+
+
+def test_last_chunk_is_cut_at_a_sentence_end_and_the_rest_dropped():
+    first = chunk("Trecho mais relevante.")
+    budget = count_tokens(first.text) + count_tokens("\n") + count_tokens("O curso tem quarenta vagas.")
+    assembler = ContextAssembler(max_tokens=budget)
+
+    context, used = assembler.assemble([first, chunk(SENTENCES, "b.txt"), chunk("descartado", "c.txt")])
+
+    assert [c.filename for c in used] == ["a.txt", "b.txt"]
+    assert used[1].text == "O curso tem quarenta vagas."
+    assert used[1].end == used[1].start + len(used[1].text)
+    assert count_tokens(context) <= budget
+
+
+def test_first_chunk_without_a_fitting_sentence_is_cut_at_a_word():
+    assembler = ContextAssembler(max_tokens=count_tokens("O curso tem"))
+    _, used = assembler.assemble([chunk(SENTENCES)])
+    assert len(used) == 1 and SENTENCES.startswith(used[0].text)
+    assert count_tokens(used[0].text) <= assembler.max_tokens
+
+
+def test_counting_falls_back_to_estimate_when_tiktoken_cannot_download(monkeypatch):
+    calls = []
+
+    def get_encoding(name):
+        calls.append(name)
+        raise ConnectionError("sem rede")
+
+    fake = types.SimpleNamespace(get_encoding=get_encoding, encoding_for_model=lambda model: get_encoding(model))
+    monkeypatch.setitem(sys.modules, "tiktoken", fake)
+    tokenizer._encoding.cache_clear()
+    try:
+        assert count_tokens("abcdef", "gpt-4o") == tokenizer.estimate_tokens("abcdef")
+        usage = TemplateChatProvider().count_usage([{"role": "user", "content": "pergunta"}], "resposta")
+        assert isinstance(usage, TokenUsage) and usage.completion_tokens > 0
+        # A falha fica em cache: o download não é tentado a cada requisição
+        attempts = len(calls)
+        count_tokens("outro texto", "gpt-4o")
+        ContextAssembler(max_tokens=100, model="gpt-4o").assemble([chunk(SENTENCES)])
+        assert len(calls) == attempts
+    finally:
+        tokenizer._encoding.cache_clear()
@@ -0,0 +1,156 @@
+import asyncio
+import os
+import pytest
+from fastapi.testclient import TestClient
+
+
+class FakeDocumentService:
+    def list_documents(self):
+        return [{"filename": "a.txt", "size": 1, "hash": "h", "added_at": 0.0}], "etag"
+
+
+class FakeIndexService:
+    def __init__(self, due: bool):
+        self.document_service = FakeDocumentService()
+        self.due = due
+        self.syncs = []
+        self.deleted_in_loop = []
+
+    def sync_due(self):
+        return self.due
+
+    def sync(self, force: bool = False):
+        self.syncs.append(force)
+
+    def delete_document(self, filename):
+        try:
+            asyncio.get_running_loop()
+            self.deleted_in_loop.append(True)
+        except RuntimeError:
+            self.deleted_in_loop.append(False)
+        return True
+
+
+@pytest.fixture
+def client_for():
+    from backend.main import app
+    from backend.routers.dependencies import get_document_service, get_index, get_ready_index
+
+    def make(index_service, ready=True):
+        async def override():
+            return index_service
+
+        async def ready_override():
+            return index_service if ready else None
+
+        async def documents_override():
+            return index_service.document_service
+        app.dependency_overrides[get_index] = override
+        app.dependency_overrides[get_ready_index] = ready_override
+        app.dependency_overrides[get_document_service] = documents_override
+        return TestClient(app)
+
+    yield make
+    app.dependency_overrides.clear()
+
+
+def test_listing_does_not_force_a_sync(client_for):
+    index_service = FakeIndexService(due=False)
+    client = client_for(index_service)
+
+    response = client.get("/documents")
+    assert response.status_code == 200
+    assert index_service.syncs == []
+
+    # Sem alterações, o ETag continua válido
+    cached = client.get("/documents", headers={"If-None-Match": response.headers["etag"]})
+    assert cached.status_code == 304
+    assert index_service.syncs == []
+
+
+def test_listing_syncs_when_interval_elapsed(client_for):
+    index_service = FakeIndexService(due=True)
+    client_for(index_service).get("/documents")
+    assert index_service.syncs == [False]
+
+
+def test_listing_during_warmup_does_not_need_the_index(client_for):
+    index_service = FakeIndexService(due=True)
+    response = client_for(index_service, ready=False).get("/documents")
+    assert response.status_code == 200
+    assert response.json()["items"][0]["filename"] == "a.txt"
+    assert index_service.syncs == []
+
+
+def test_delete_runs_outside_the_event_loop(client_for):
+    index_service = FakeIndexService(due=False)
+    response = client_for(index_service).delete("/documents/a.txt")
+    assert response.status_code == 200
+    assert index_service.deleted_in_loop == [False]
+
+
+class FakeIngestionService:
+    def __init__(self, tmp_path):
+        self.tmp_path = tmp_path
+        self.received = []
+
+    def new_upload_dir(self):
+        path = self.tmp_path / f"upload-{len(self.received)}"
+        path.mkdir()
+        return str(path)
+
+    def submit(self, upload_dir):
+        from datetime import datetime
+        from backend.models.schemas import IngestionJob
+
+        for root, _, files in os.walk(upload_dir):
+            for name in files:
+                with open(os.path.join(root, name), "rb") as f:
+                    self.received.append((name, f.read()))
+        return IngestionJob(job_id="job", created_at=datetime.now())
+
+
+def test_raw_bulk_upload_is_written_in_full(client_for, tmp_path, monkeypatch):
+    from backend.routers import document_router
+
+    ingestion = FakeIngestionService(tmp_path)
+    monkeypatch.setattr(document_router, "get_ingestion_service", lambda: ingestion)
+    client = client_for(FakeIndexService(due=False))
+    body = os.urandom(3 * 1024 * 1024 + 123)
+
+    response = client.post("/documents/bulk?filename=lote.zip", content=body,
+                           headers={"content-type": "application/zip"})
+    assert response.status_code == 202
+    assert ingestion.received == [("lote.zip", body)]
+
+    empty = client.post("/documents/bulk?filename=vazio.zip", content=b"",
+                        headers={"content-type": "application/zip"})
+    assert empty.status_code == 400
+
+
+def test_listing_pages_metadata_and_changes_etag(client_for, index_service):
+    for i in range(5):
+        index_service.create_document(f"doc{i}.txt", f"Conteúdo do documento {i} sobre cursos do SENAI.")
+    client = client_for(index_service)
+
+    page = client.get("/documents", params={"offset": 1, "limit": 2})
+    assert page.status_code == 200
+    body = page.json()
+    assert (body["total"], body["offset"], body["limit"]) == (5, 1, 2)
+    assert [item["filename"] for item in body["items"]] == ["doc1.txt", "doc2.txt"]
+    # Só metadados na listagem; o conteúdo fica em GET /documents/{filename}
+    assert "content" not in body["items"][0]
+    document = client.get("/documents/doc1.txt").json()
+    assert document["content"] == "Conteúdo do documento 1 sobre cursos do SENAI."
+    assert document["hash"] == body["items"][0]["hash"]
+
+    etag = page.headers["etag"]
+    assert client.get("/documents", params={"offset": 1, "limit": 2},
+                      headers={"If-None-Match": etag}).status_code == 304
+    # Outra página tem outro ETag
+    assert client.get("/documents", headers={"If-None-Match": etag}).status_code == 200
+
+    index_service.create_document("doc5.txt", "Novo documento.")
+    changed = client.get("/documents", params={"offset": 1, "limit": 2}, headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.json()["total"] == 6
+    assert changed.headers["etag"] != etag
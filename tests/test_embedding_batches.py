@@ -0,0 +1,68 @@
+import threading
+import time
+
+import pytest
+
+from backend.services.openai_service import OpenAIService
+from backend.services.providers import HashingEmbeddingProvider
+
+
+class RecordingEmbeddingProvider(HashingEmbeddingProvider):
+    """Registra os lotes recebidos e o máximo de requisições simultâneas"""
+
+    def __init__(self):
+        super().__init__(dimensions=8)
+        self.batches = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def embed(self, texts):
+        with self._lock:
+            self.batches.append(list(texts))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.02)
+        with self._lock:
+            self.active -= 1
+        return super().embed(texts)
+
+
+def make_service(monkeypatch, batch_size, concurrency, max_tokens=250000):
+    monkeypatch.setenv("EMBEDDING_BATCH_SIZE", str(batch_size))
+    monkeypatch.setenv("EMBEDDING_MAX_CONCURRENCY", str(concurrency))
+    monkeypatch.setenv("EMBEDDING_BATCH_MAX_TOKENS", str(max_tokens))
+    provider = RecordingEmbeddingProvider()
+    return OpenAIService(embedding_provider=provider), provider
+
+
+def test_batches_keep_input_order_with_bounded_concurrency(monkeypatch):
+    service, provider = make_service(monkeypatch, batch_size=10, concurrency=3)
+    texts = [f"curso número {i} do SENAI" for i in range(95)]
+
+    embeddings = service.get_embeddings(texts)
+
+    assert [len(batch) for batch in provider.batches].count(10) == 9 and len(provider.batches) == 10
+    assert 1 < provider.max_active <= 3
+    assert embeddings == HashingEmbeddingProvider(dimensions=8).embed(texts)
+
+
+def test_batches_respect_the_token_limit(monkeypatch):
+    service, provider = make_service(monkeypatch, batch_size=100, concurrency=1, max_tokens=100)
+    texts = ["soldagem " * 20] * 5
+
+    assert len(service.get_embeddings(texts)) == 5
+    # Cada texto passa de metade do limite: um texto por requisição
+    assert [len(batch) for batch in provider.batches] == [1, 1, 1, 1, 1]
+    assert provider.max_active == 1
+
+
+def test_batch_errors_are_reported(monkeypatch):
+    service, provider = make_service(monkeypatch, batch_size=2, concurrency=2)
+
+    def failing(texts):
+        raise RuntimeError("429 Too Many Requests")
+
+    provider.embed = failing
+    with pytest.raises(Exception, match="429"):
+        service.get_embeddings(["a", "b", "c"])
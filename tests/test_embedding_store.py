@@ -0,0 +1,49 @@
+import numpy as np
+
+from backend.services.embedding_store import EmbeddingStore, content_hash
+from backend.services.providers import HashingEmbeddingProvider
+
+TEXT = "O SENAI oferece cursos de soldagem em Recife, com quarenta vagas por turma e aulas à noite."
+
+
+class OfflineEmbeddingProvider(HashingEmbeddingProvider):
+    def embed(self, texts):
+        raise RuntimeError("embeddings indisponíveis")
+
+
+def test_embeddings_persist_by_content_and_model(tmp_path):
+    path = str(tmp_path / "embeddings.db")
+    store = EmbeddingStore(path)
+    store.put(TEXT, "modelo-a", [1.0, 2.0, 3.0])
+    store.put(TEXT, "modelo-b@2", [4.0, 5.0])
+
+    reopened = EmbeddingStore(path)
+    assert np.array_equal(reopened.get(TEXT, "modelo-a"), np.float32([1.0, 2.0, 3.0]))
+    assert np.array_equal(reopened.get(TEXT, "modelo-b@2"), np.float32([4.0, 5.0]))
+    assert reopened.get(TEXT, "modelo-c") is None
+    assert reopened.get("outro texto", "modelo-a") is None
+    assert reopened.count() == 2
+
+
+def test_get_many_reads_more_hashes_than_one_query_accepts(tmp_path):
+    store = EmbeddingStore(str(tmp_path / "embeddings.db"))
+    texts = [f"trecho {i}" for i in range(1200)]
+    store.put_many({content_hash(text): [float(i)] for i, text in enumerate(texts)}, "modelo")
+
+    found = store.get_many(texts + ["ausente"], "modelo")
+    assert len(found) == 1200
+    assert found[content_hash("trecho 999")][0] == 999.0
+
+
+def test_restart_reuses_stored_embeddings(index_service, documents_dir):
+    from backend.services.document_service import DocumentService
+    from backend.services.index_service import IndexService
+    from backend.services.openai_service import OpenAIService
+
+    index_service.create_document("cursos.txt", TEXT)
+
+    # Com a API fora do ar, o índice é refeito só com os embeddings armazenados
+    restarted = IndexService(openai_service=OpenAIService(embedding_provider=OfflineEmbeddingProvider()),
+                             document_service=DocumentService(str(documents_dir)))
+    assert "cursos.txt" in restarted.indexed_documents
+    assert len(restarted.index) == len(index_service.index) == 1
@@ -0,0 +1,71 @@
+import pytest
+
+TEXT = "O SENAI oferece cursos de soldagem em Recife, com quarenta vagas por turma e aulas à noite."
+
+
+def test_sync_retries_file_after_embedding_failure(index_service, documents_dir, flaky_embeddings):
+    (documents_dir / "novo.txt").write_text(TEXT, encoding="utf-8")
+
+    with pytest.raises(RuntimeError):
+        index_service.sync(force=True)
+    assert "novo.txt" not in index_service.indexed_documents
+
+    flaky_embeddings.failing = False
+    index_service.sync(force=True)
+    assert "novo.txt" in index_service.indexed_documents
+
+
+def test_create_document_is_indexed_by_next_sync_after_failure(index_service, documents_dir, flaky_embeddings):
+    with pytest.raises(RuntimeError):
+        index_service.create_document("post.txt", TEXT)
+    # O arquivo foi gravado, mas não indexado
+    assert (documents_dir / "post.txt").exists()
+    assert "post.txt" not in index_service.indexed_documents
+
+    flaky_embeddings.failing = False
+    index_service.sync()
+    assert "post.txt" in index_service.indexed_documents
+
+
+def test_sync_does_not_reindex_unchanged_files(index_service, documents_dir, flaky_embeddings):
+    flaky_embeddings.failing = False
+    (documents_dir / "a.txt").write_text(TEXT, encoding="utf-8")
+    index_service.sync(force=True)
+    calls = flaky_embeddings.calls
+
+    index_service.sync(force=True)
+    assert flaky_embeddings.calls == calls
+    assert "a.txt" in index_service.indexed_documents
+
+
+def test_delete_document_does_not_block_searches_during_disk_io(index_service, documents_dir, monkeypatch):
+    import threading
+
+    index_service.create_document("a.txt", TEXT)
+    index_service.create_document("b.txt", "Inscrições abertas para o curso de eletricista em Caruaru.")
+    deleting, release = threading.Event(), threading.Event()
+    original = index_service.document_service.delete_document
+
+    def slow_delete(filename):
+        deleting.set()
+        release.wait(5)
+        return original(filename)
+
+    monkeypatch.setattr(index_service.document_service, "delete_document", slow_delete)
+    worker = threading.Thread(target=index_service.delete_document, args=("a.txt",))
+    worker.start()
+    assert deleting.wait(5)
+
+    searched = []
+    reader = threading.Thread(target=lambda: searched.append(index_service.lexical_search("soldagem", 3)))
+    reader.start()
+    reader.join(1)
+    blocked = reader.is_alive()
+    release.set()
+    worker.join(5)
+    reader.join(5)
+
+    assert not blocked
+    assert searched[0][0].filename == "a.txt"
+    assert "a.txt" not in index_service.indexed_documents and not (documents_dir / "a.txt").exists()
+    assert [chunk.filename for chunk in index_service.lexical_search("soldagem", 3)] == []
@@ -0,0 +1,22 @@
+from datetime import datetime
+
+import pytest
+
+from backend.models.schemas import IngestionJob
+from backend.services.ingestion_service import IngestionService
+
+TEXT = "O SENAI oferece cursos de soldagem em Recife, com quarenta vagas por turma e aulas à noite."
+
+
+def test_failed_batch_is_indexed_by_next_sync(index_service, documents_dir, flaky_embeddings):
+    job = IngestionJob(job_id="teste", created_at=datetime.now())
+    batch = {"lote1.txt": TEXT, "lote2.txt": TEXT.replace("Recife", "Olinda")}
+
+    with pytest.raises(RuntimeError):
+        IngestionService(batch_size=10)._ingest_batch(index_service, batch, job)
+    assert (documents_dir / "lote1.txt").exists()
+    assert not index_service.indexed_documents
+
+    flaky_embeddings.failing = False
+    index_service.sync()
+    assert set(index_service.indexed_documents) == set(batch)
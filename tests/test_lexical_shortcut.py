@@ -0,0 +1,23 @@
+def _write_corpus(documents_dir, count):
+    for i in range(count):
+        (documents_dir / f"doc{i}.txt").write_text(
+            f"Documento {i} sobre cursos técnicos da unidade {i} em Pernambuco.", encoding="utf-8")
+    (documents_dir / "sigla.txt").write_text(
+        "O SESI oferece atendimento odontológico aos trabalhadores da indústria.", encoding="utf-8")
+
+
+def test_shortcut_is_not_used_on_small_corpus(index_service, documents_dir):
+    _write_corpus(documents_dir, 5)
+    index_service.sync(force=True)
+    # Em uma base pequena, qualquer termo aparece em poucos chunks
+    assert index_service.lexical_shortcut("SESI", 3) is None
+
+
+def test_shortcut_answers_rare_term_on_large_corpus(index_service, documents_dir):
+    _write_corpus(documents_dir, 80)
+    index_service.sync(force=True)
+
+    chunks = index_service.lexical_shortcut("SESI", 3)
+    assert chunks and chunks[0].filename == "sigla.txt"
+    # Termo presente em quase todos os chunks não é raro
+    assert index_service.lexical_shortcut("Pernambuco", 3) is None
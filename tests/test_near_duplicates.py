@@ -0,0 +1,60 @@
+import pytest
+
+from backend.services.near_duplicates import SimHashIndex, simhash
+
+CURSO = ("O SENAI oferece cursos de soldagem em Recife, com quarenta vagas por turma, aulas à noite e "
+         "certificado reconhecido pela indústria. As inscrições ficam abertas até o fim do mês na unidade "
+         "do bairro do Cabo e pelo site oficial, com atendimento de segunda a sexta.")
+# O mesmo texto com uma palavra trocada
+CURSO_REVISADO = CURSO.replace("quarenta", "trinta")
+OUTRO = ("Inscrições abertas para o curso de eletricista industrial em Caruaru, com aulas aos sábados, "
+         "material didático incluído e estágio garantido nas empresas parceiras da região do Agreste.")
+
+
+@pytest.fixture
+def service(index_service):
+    index_service.near_duplicates = SimHashIndex(max_distance=6)
+    return index_service
+
+
+def test_near_duplicates_share_one_vector(service, flaky_embeddings):
+    flaky_embeddings.failing = False
+    service.create_document("curso.txt", CURSO)
+    calls = flaky_embeddings.calls
+    service.create_document("curso_revisado.txt", CURSO_REVISADO)
+
+    # Nenhum embedding novo: o chunk revisado usa o vetor do original
+    assert flaky_embeddings.calls == calls
+    assert len(service.index) == 1
+    assert len({service._chunk_keys[chunk_id] for chunk_id in service.chunks}) == 1
+
+
+def test_deleting_a_document_keeps_the_vector_shared_with_another(service):
+    service.create_document("curso.txt", CURSO)
+    service.create_document("curso_revisado.txt", CURSO_REVISADO)
+
+    assert service.delete_document("curso.txt")
+    assert len(service.index) == 1
+    results = service.search(service.embed_query("cursos de soldagem em Recife"), 1)
+    assert [chunk.filename for chunk in results] == ["curso_revisado.txt"]
+    assert results[0].text == CURSO_REVISADO
+
+    assert service.delete_document("curso_revisado.txt")
+    assert len(service.index) == 0 and len(service.near_duplicates) == 0
+
+
+def test_different_texts_are_not_merged(service):
+    assert bin(simhash(CURSO) ^ simhash(OUTRO)).count("1") > 6
+    service.create_document("curso.txt", CURSO)
+    service.create_document("outro.txt", OUTRO)
+
+    assert len(service.index) == 2
+    results = service.search(service.embed_query("curso de eletricista em Caruaru"), 1)
+    assert results[0].filename == "outro.txt"
+
+
+def test_near_duplicate_detection_is_off_by_default(index_service):
+    index_service.create_document("curso.txt", CURSO)
+    index_service.create_document("curso_revisado.txt", CURSO_REVISADO)
+    assert not index_service.near_duplicates.enabled
+    assert len(index_service.index) == 2
@@ -0,0 +1,65 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.services.observability import (
+    Counter,
+    Histogram,
+    RequestContextMiddleware,
+    current_request_id,
+    current_stages,
+    timed,
+)
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("etapa_seconds", "Tempo da etapa", ["stage"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value, stage="embed")
+
+    lines = histogram.render()
+    assert 'etapa_seconds_bucket{stage="embed",le="0.1"} 1' in lines
+    assert 'etapa_seconds_bucket{stage="embed",le="1"} 3' in lines
+    assert 'etapa_seconds_bucket{stage="embed",le="+Inf"} 4' in lines
+    assert 'etapa_seconds_count{stage="embed"} 4' in lines
+    assert 'etapa_seconds_sum{stage="embed"} 4.25' in lines
+
+
+def test_counter_keeps_one_series_per_label():
+    counter = Counter("tokens_total", "Tokens", ["kind"])
+    counter.inc(10, kind="prompt")
+    counter.inc(5, kind="prompt")
+    counter.inc(2, kind="completion")
+
+    assert counter.render()[2:] == ['tokens_total{kind="completion"} 2', 'tokens_total{kind="prompt"} 15']
+
+
+def test_middleware_tracks_request_id_and_stages():
+    app = FastAPI()
+    app.add_middleware(RequestContextMiddleware)
+
+    @app.get("/etapas")
+    async def etapas():
+        with timed("embed_query"):
+            pass
+        with timed("generate"):
+            pass
+        return {"request_id": current_request_id(), "stages": sorted(current_stages())}
+
+    client = TestClient(app)
+    response = client.get("/etapas", headers={"X-Request-ID": "abc123"})
+    assert response.headers["x-request-id"] == "abc123"
+    assert response.json() == {"request_id": "abc123", "stages": ["embed_query", "generate"]}
+    # Sem o cabeçalho, um id é gerado
+    assert client.get("/etapas").headers["x-request-id"]
+
+
+def test_metrics_endpoint_exposes_stage_timings():
+    from backend.main import app
+
+    with timed("teste_metrics"):
+        pass
+    response = TestClient(app).get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'rag_stage_duration_seconds_count{stage="teste_metrics"} 1' in response.text
+    assert "# TYPE http_request_duration_seconds histogram" in response.text
@@ -0,0 +1,97 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.services.profiler import ProfilingMiddleware, RequestProfiler
+
+
+@pytest.fixture
+def profiler(tmp_path):
+    profiler = RequestProfiler(str(tmp_path / "profiles"))
+    profiler.configure(paths=["/ask"], interval_ms=1)
+    return profiler
+
+
+def client_for(profiler):
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware, profiler=profiler)
+
+    @app.get("/ask")
+    async def ask(delay: float = 0, busy: float = 0):
+        await asyncio.sleep(delay)
+        # Trabalho de CPU no event loop, que aparece nas pilhas amostradas
+        end = time.perf_counter() + busy
+        while time.perf_counter() < end:
+            pass
+        return {"ok": True}
+
+    @app.get("/health")
+    async def health():
+        return {"ok": True}
+
+    return TestClient(app)
+
+
+def test_disabled_by_default(profiler):
+    assert not profiler.enabled
+    client_for(profiler).get("/ask")
+    assert profiler.list_profiles() == []
+
+
+def test_sampled_requests_write_a_profile(profiler):
+    profiler.configure(sample_rate=1.0)
+    client = client_for(profiler)
+    client.get("/health")
+    client.get("/ask", params={"busy": 0.05})
+
+    profiles = profiler.list_profiles()
+    assert len(profiles) == 1
+    profile = profiles[0]
+    assert (profile["reason"], profile["path"], profile["status"]) == ("sampled", "/ask", 200)
+    assert profile["samples"] > 0
+    with open(profiler.profile_path(profile["name"]), encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    # Formato "collapsed": pilha separada por ";" e a contagem no final
+    assert lines and all(";" in line and line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any("ask (test_profiler.py" in line for line in lines)
+
+
+def test_only_slow_requests_are_captured_with_slow_ms(profiler):
+    profiler.configure(slow_ms=30)
+    client = client_for(profiler)
+    client.get("/ask")
+    client.get("/ask", params={"delay": 0.2})
+
+    profiles = profiler.list_profiles()
+    assert [profile["reason"] for profile in profiles] == ["slow"]
+    assert profiles[0]["duration_ms"] >= 200
+
+
+def test_old_profiles_are_pruned(profiler):
+    profiler.configure(sample_rate=1.0)
+    profiler.max_files = 2
+    client = client_for(profiler)
+    for _ in range(4):
+        client.get("/ask")
+    assert len(profiler.list_profiles()) == 2
+
+
+def test_profile_names_cannot_leave_the_profile_dir(profiler):
+    assert profiler.profile_path("../usage.folded") is None
+    assert profiler.profile_path("inexistente.folded") is None
+
+
+def test_admin_endpoints_require_the_token(monkeypatch):
+    from backend.main import app
+
+    client = TestClient(app)
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    assert client.get("/admin/profiling").status_code == 404
+
+    monkeypatch.setenv("ADMIN_TOKEN", "segredo")
+    assert client.get("/admin/profiling").status_code == 401
+    response = client.get("/admin/profiling", headers={"Authorization": "Bearer segredo"})
+    assert response.status_code == 200 and "sample_rate" in response.json()
@@ -0,0 +1,62 @@
+import pytest
+
+
+def test_providers_must_implement_the_abstract_methods():
+    from backend.services.providers import ChatProvider, EmbeddingProvider
+
+    class NoEmbed(EmbeddingProvider):
+        name, model = "parcial", "parcial"
+
+    class NoComplete(ChatProvider):
+        model = "parcial"
+
+    with pytest.raises(TypeError):
+        NoEmbed()
+    with pytest.raises(TypeError):
+        NoComplete()
+
+
+def test_local_providers_run_without_an_api_key(monkeypatch):
+    from backend.services.openai_service import OpenAIService
+    from backend.services.providers import HashingEmbeddingProvider, TemplateChatProvider
+
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setenv("LLM_PROVIDER", "local")
+    service = OpenAIService()
+    assert isinstance(service.embedding_provider, HashingEmbeddingProvider)
+    assert isinstance(service.chat_provider, TemplateChatProvider)
+
+    answer, usage = service.get_completion(
+        "Quantas vagas tem o curso?", "O curso de soldagem tem quarenta vagas. As aulas são à noite."
+    )
+    assert "quarenta vagas" in answer
+    assert usage.prompt_tokens > 0 and usage.completion_tokens > 0
+
+
+def test_hashing_embeddings_are_deterministic_and_similarity_preserving():
+    import numpy as np
+    from backend.services.providers import HashingEmbeddingProvider
+
+    provider = HashingEmbeddingProvider(dimensions=256)
+    soldagem, soldagem_noite, eletrica = provider.embed([
+        "curso de soldagem em Recife",
+        "curso de soldagem em Recife à noite",
+        "inscrições para eletricista em Caruaru",
+    ])
+    assert soldagem == HashingEmbeddingProvider(dimensions=256).embed(["curso de soldagem em Recife"])[0]
+    assert len(soldagem) == 256 and np.linalg.norm(soldagem) == pytest.approx(1.0)
+    assert np.dot(soldagem, soldagem_noite) > np.dot(soldagem, eletrica)
+
+
+def test_provider_selection_by_environment(monkeypatch):
+    from backend.services.providers import create_chat_provider, create_embedding_provider
+
+    monkeypatch.setenv("LLM_PROVIDER", "openai")
+    monkeypatch.setenv("EMBEDDING_PROVIDER", "local")
+    monkeypatch.setenv("CHAT_PROVIDER", "local")
+    assert create_embedding_provider().name == "local"
+    assert create_chat_provider().model == "local-template"
+
+    monkeypatch.setenv("EMBEDDING_PROVIDER", "desconhecido")
+    with pytest.raises(ValueError):
+        create_embedding_provider()
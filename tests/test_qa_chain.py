@@ -0,0 +1,118 @@
+import asyncio
+
+TEXT = "O SENAI oferece cursos de soldagem em Recife, com quarenta vagas por turma e aulas à noite."
+
+
+def test_concurrent_identical_streams_share_one_completion(index_service, documents_dir):
+    from backend.chains.qa_chain import QAChain
+
+    index_service.create_document("cursos.txt", TEXT)
+    qa_chain = QAChain(index_service)
+    qa_chain.answer_cache.enabled = False
+    original = qa_chain.openai_service.astream_completion
+    calls = []
+
+    async def counted(prompt, context=""):
+        calls.append(prompt)
+        await asyncio.sleep(0.05)
+        async for event in original(prompt, context):
+            yield event
+
+    qa_chain.openai_service.astream_completion = counted
+
+    async def ask():
+        return [event async for event in qa_chain.astream_answer("Quantas vagas tem o curso de soldagem?")]
+
+    async def main():
+        return await asyncio.gather(*(ask() for _ in range(4)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    answers = [events[-1][1][0] for events in results]
+    assert len(set(answers)) == 1 and answers[0]
+    # Apenas o primeiro consumidor contabiliza os tokens
+    usages = sorted(events[-1][1][1].total_tokens for events in results)
+    assert usages[:3] == [0, 0, 0] and usages[3] > 0
+
+
+def test_stream_usage_is_logged_once_even_if_the_client_disconnects(index_service, documents_dir, monkeypatch):
+    from backend.chains import qa_chain as qa_chain_module
+    from backend.chains.qa_chain import QAChain
+
+    logged = []
+    monkeypatch.setattr(qa_chain_module.usage_writer, "log", lambda *args: logged.append(args))
+    index_service.create_document("cursos.txt", TEXT)
+    qa_chain = QAChain(index_service)
+    qa_chain.answer_cache.enabled = False
+    original = qa_chain.openai_service.astream_completion
+
+    async def slow(prompt, context=""):
+        await asyncio.sleep(0.05)
+        async for event in original(prompt, context):
+            yield event
+
+    qa_chain.openai_service.astream_completion = slow
+
+    async def disconnect_after_context():
+        stream = qa_chain.astream_answer("Quantas vagas tem o curso de soldagem?")
+        async for event, _ in stream:
+            if event == "context":
+                break
+        await stream.aclose()
+
+    async def main():
+        await asyncio.gather(disconnect_after_context(), disconnect_after_context())
+        # O produtor continua e termina depois que os clientes saíram
+        while qa_chain._stream_flight._streams:
+            await asyncio.sleep(0.01)
+
+    asyncio.run(main())
+    assert len(logged) == 1
+    question, answer, total_tokens = logged[0][:3]
+    assert question == "Quantas vagas tem o curso de soldagem?" and answer and total_tokens > 0
+
+
+def test_answers_from_the_lexical_fallback_are_not_cached(index_service, documents_dir, monkeypatch):
+    from backend.chains.qa_chain import QAChain
+
+    index_service.create_document("cursos.txt", TEXT)
+    qa_chain = QAChain(index_service)
+
+    def unavailable(query):
+        raise RuntimeError("429 Too Many Requests")
+
+    async def aunavailable(query):
+        unavailable(query)
+
+    monkeypatch.setattr(index_service, "embed_query", unavailable)
+    monkeypatch.setattr(index_service, "aembed_query", aunavailable)
+    answer, chunks, usage = qa_chain.get_answer("Quantas vagas tem o curso de soldagem?")
+    assert answer and chunks and usage.total_tokens > 0
+    assert asyncio.run(qa_chain.aget_answer("Quantas vagas tem o curso de soldagem?"))[2].total_tokens > 0
+    assert len(qa_chain.answer_cache._entries) == 0
+
+    # Com o embedding de volta, a resposta completa vai para o cache normalmente
+    monkeypatch.undo()
+    qa_chain.get_answer("Quantas vagas tem o curso de soldagem?")
+    assert qa_chain.get_answer("Quantas vagas tem o curso de soldagem?")[2].total_tokens == 0
+
+
+def test_sync_context_falls_back_when_the_embedding_times_out(index_service, documents_dir, monkeypatch):
+    import threading
+    import time
+
+    from backend.chains.qa_chain import QAChain
+
+    index_service.create_document("cursos.txt", TEXT)
+    monkeypatch.setenv("EMBEDDING_TIMEOUT", "0.05")
+    qa_chain = QAChain(index_service)
+    release = threading.Event()
+    monkeypatch.setattr(index_service, "embed_query", lambda query: release.wait(5))
+
+    started = time.monotonic()
+    try:
+        chunks = qa_chain.get_relevant_context("Quantas vagas tem o curso de soldagem?")
+    finally:
+        release.set()
+    assert time.monotonic() - started < 2
+    assert chunks and chunks[0].filename == "cursos.txt"
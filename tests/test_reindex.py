@@ -0,0 +1,64 @@
+import threading
+import time
+
+from backend.services.providers import HashingEmbeddingProvider
+
+SOLDAGEM = "O SENAI oferece cursos de soldagem em Recife, com quarenta vagas por turma e aulas à noite."
+ELETRICA = "Inscrições abertas para o curso de eletricista em Caruaru, com aulas aos sábados."
+MECANICA = "A oficina de mecânica automotiva de Petrolina recebe turmas pela manhã."
+
+
+class GatedEmbeddingProvider(HashingEmbeddingProvider):
+    """Provedor local que só gera embeddings depois de `release`"""
+
+    def __init__(self, dimensions):
+        super().__init__(dimensions=dimensions)
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def embed(self, texts):
+        self.started.set()
+        assert self.release.wait(5)
+        return super().embed(texts)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_dimension_change_reindexes_in_background(index_service, documents_dir):
+    from backend.services.document_service import DocumentService
+    from backend.services.index_service import IndexService
+    from backend.services.openai_service import OpenAIService
+
+    index_service.create_document("soldagem.txt", SOLDAGEM)
+    index_service.create_document("eletrica.txt", ELETRICA)
+    old_dimensions = index_service.index.dimensions
+
+    provider = GatedEmbeddingProvider(dimensions=64)
+    service = IndexService(openai_service=OpenAIService(embedding_provider=provider),
+                           document_service=DocumentService(str(documents_dir)))
+    assert provider.started.wait(5)
+
+    # Até a troca, as buscas usam o índice e os embeddings da configuração anterior
+    assert service.reindexing and service.index.dimensions == old_dimensions
+    results = service.search(service.embed_query("cursos de soldagem em Recife"), 1)
+    assert results[0].filename == "soldagem.txt"
+
+    # Um documento adicionado durante a reindexação também entra no novo índice
+    service.create_document("mecanica.txt", MECANICA)
+    provider.release.set()
+    wait_for(lambda: not service.reindexing)
+
+    assert service.index.dimensions == 64 and service.embedder.embeddings_key == provider.key
+    assert set(service.index.keys()) == set(service._key_texts) == set(service._chunk_keys.values())
+    assert set(service.indexed_documents) == {"soldagem.txt", "eletrica.txt", "mecanica.txt"}
+    query = service.embed_query("oficina de mecânica automotiva")
+    assert len(query) == 64
+    assert service.search(query, 1)[0].filename == "mecanica.txt"
+    # Um embedding da configuração anterior é gerado de novo quando o texto é informado
+    stale = index_service.embed_query("cursos de soldagem em Recife")
+    assert service.search(stale, 1, "cursos de soldagem em Recife")[0].filename == "soldagem.txt"
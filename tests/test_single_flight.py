@@ -0,0 +1,112 @@
+import time
+import asyncio
+import threading
+import pytest
+from backend.services.single_flight import AsyncSingleFlight, AsyncStreamFlight, SingleFlight
+
+
+def test_single_flight_propagates_errors_to_waiting_threads():
+    flight = SingleFlight()
+    started = threading.Event()
+    # Os três seguidores e o líder
+    arrived = threading.Barrier(4)
+    calls, errors = [], []
+
+    def fail():
+        calls.append(1)
+        started.set()
+        # Falha só depois que os seguidores chegaram a do()
+        arrived.wait(5)
+        time.sleep(0.1)
+        raise RuntimeError("upstream caiu")
+
+    def call(follower):
+        if follower:
+            started.wait(5)
+            arrived.wait(5)
+        try:
+            flight.do("chave", fail)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=call, args=(i > 0,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == [1]
+    assert errors == ["upstream caiu"] * 4
+    # Depois do erro, uma nova chamada executa a função de novo
+    assert flight.do("chave", lambda: "ok") == ("ok", False)
+
+
+def test_async_single_flight_propagates_errors_to_every_caller():
+    calls = []
+
+    async def fail():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream caiu")
+
+    async def call(flight):
+        with pytest.raises(RuntimeError, match="upstream caiu"):
+            await flight.do("chave", fail)
+
+    async def main():
+        flight = AsyncSingleFlight()
+        await asyncio.gather(*(call(flight) for _ in range(4)))
+        assert "chave" not in flight._calls
+
+        async def ok():
+            return "ok"
+        return await flight.do("chave", ok)
+
+    assert asyncio.run(main()) == ("ok", False)
+    assert calls == [1]
+
+
+def test_stream_flight_shares_one_producer():
+    calls = []
+
+    async def produce():
+        calls.append(1)
+        for i in range(3):
+            await asyncio.sleep(0.01)
+            yield i
+
+    async def consume(flight):
+        return [item async for item in flight.stream("chave", produce)]
+
+    async def main():
+        flight = AsyncStreamFlight()
+        return await asyncio.gather(*(consume(flight) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert results[0] == [(0, False), (1, False), (2, False)]
+    for result in results[1:]:
+        assert result == [(0, True), (1, True), (2, True)]
+
+
+def test_stream_flight_propagates_errors_to_every_consumer():
+    async def produce():
+        yield "context"
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream caiu")
+
+    async def consume(flight):
+        received = []
+        with pytest.raises(RuntimeError, match="upstream caiu"):
+            async for event, _ in flight.stream("chave", produce):
+                received.append(event)
+        return received
+
+    async def main():
+        flight = AsyncStreamFlight()
+        results = await asyncio.gather(*(consume(flight) for _ in range(3)))
+        # Depois do erro, uma nova chamada inicia outro stream
+        assert "chave" not in flight._streams
+        return results
+
+    assert asyncio.run(main()) == [["context"]] * 3
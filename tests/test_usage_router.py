@@ -0,0 +1,34 @@
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def client():
+    from backend.main import app
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("method, path", [
+    ("get", "/usage/archive/2024-01"), ("post", "/usage/compact"), ("get", "/usage/top-questions")
+])
+def test_prompt_data_and_compaction_require_admin(client, monkeypatch, method, path):
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    assert getattr(client, method)(path).status_code == 404
+
+    monkeypatch.setenv("ADMIN_TOKEN", "segredo")
+    assert getattr(client, method)(path).status_code == 401
+    assert getattr(client, method)(path, headers={"X-Admin-Token": "errado"}).status_code == 401
+
+
+def test_compaction_with_admin_token(client, monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "segredo")
+    response = client.post("/usage/compact", headers={"Authorization": "Bearer segredo"})
+    assert response.status_code == 200
+    assert set(response.json()) == {"archived", "deleted"}
+
+
+def test_top_questions_with_admin_token(client, monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "segredo")
+    response = client.get("/usage/top-questions", headers={"X-Admin-Token": "segredo"})
+    assert response.status_code == 200
+    assert "questions" in response.json()
@@ -0,0 +1,53 @@
+from sqlalchemy import func, select
+
+from backend.db.database import Usage, engine
+from backend.db.usage_writer import UsageWriter
+
+
+def count_logs():
+    with engine.connect() as connection:
+        return connection.execute(select(func.count()).select_from(Usage)).scalar()
+
+
+def test_close_writes_pending_records():
+    before = count_logs()
+    # Lote grande e intervalo longo: nada seria gravado antes do close()
+    writer = UsageWriter(flush_size=1000, flush_interval=60)
+    for i in range(5):
+        writer.log(f"pergunta {i}", "resposta", 10, prompt_tokens=7, completion_tokens=3)
+
+    writer.close()
+
+    assert writer.stats() == {"queued": 0, "written": 5, "dropped": 0, "failed": 0}
+    assert count_logs() == before + 5
+
+
+def test_records_are_written_in_batches(monkeypatch):
+    writer = UsageWriter(flush_size=10, flush_interval=5)
+    batches = []
+    write = writer._write
+    monkeypatch.setattr(writer, "_write", lambda batch: (batches.append(len(batch)), write(batch)))
+    before = count_logs()
+
+    for i in range(25):
+        writer.log(f"pergunta {i}", "resposta", 10)
+    writer.close()
+
+    # Lotes completos assim que atingem flush_size; o restante no encerramento
+    assert sum(batches) == 25 and max(batches) == 10 and len(batches) <= 5
+    assert count_logs() == before + 25
+
+
+def test_full_queue_drops_records_instead_of_blocking(monkeypatch):
+    writer = UsageWriter(flush_size=1000, flush_interval=60, max_queue_size=3)
+    # Sem a thread de gravação, a fila só enche
+    monkeypatch.setattr(writer, "start", lambda: None)
+    for i in range(5):
+        writer.log(f"pergunta {i}", "resposta", 10)
+
+    assert writer.stats() == {"queued": 3, "written": 0, "dropped": 2, "failed": 0}
+
+
+def test_usage_database_uses_wal():
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA journal_mode").scalar().lower() == "wal"
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from backend.services.vector_index import VectorIndex
+
+
+def random_vectors(count, dimensions=16, seed=0):
+    return np.random.default_rng(seed).normal(size=(count, dimensions)).astype(np.float32)
+
+
+def brute_force(keys, vectors, query, top_k):
+    """Similaridade de cosseno calculada vetor a vetor, como antes do índice"""
+    scores = [
+        float(np.dot(vector, query) / (np.linalg.norm(vector) * np.linalg.norm(query)))
+        for vector in vectors
+    ]
+    ranked = sorted(zip(keys, scores), key=lambda item: item[1], reverse=True)
+    return ranked[:top_k]
+
+
+def test_search_matches_brute_force_ranking():
+    vectors = random_vectors(300)
+    keys = [f"v{i}" for i in range(300)]
+    # Capacidade inicial pequena para exercitar o crescimento da matriz
+    index = VectorIndex(initial_capacity=4)
+    index.add_many(keys, vectors)
+
+    for query in random_vectors(5, seed=1):
+        results = index.search(query, top_k=10)
+        expected = brute_force(keys, vectors, query, 10)
+        assert [key for key, _ in results] == [key for key, _ in expected]
+        assert np.allclose([score for _, score in results], [score for _, score in expected], atol=1e-5)
+        assert all(a[1] >= b[1] for a, b in zip(results, results[1:]))
+
+
+def test_add_with_existing_key_replaces_the_vector():
+    index = VectorIndex()
+    index.add_many(["a", "b"], [[1.0, 0.0], [0.0, 1.0]])
+    index.add("a", [0.0, 2.0])
+
+    assert len(index) == 2 and index.keys() == ["a", "b"]
+    assert index.search([0.0, 1.0], top_k=2)[0][1] == pytest.approx(1.0)
+    assert index.search([1.0, 0.0], top_k=1)[0][1] == pytest.approx(0.0)
+
+
+def test_remove_keeps_the_remaining_vectors_searchable():
+    vectors = random_vectors(50)
+    keys = [f"v{i}" for i in range(50)]
+    index = VectorIndex()
+    index.add_many(keys, vectors)
+
+    assert index.remove("v3") and not index.remove("v3")
+    assert "v3" not in index and len(index) == 49
+    # A última linha ocupou a posição removida
+    assert index.search(vectors[49], top_k=1)[0][0] == "v49"
+    assert "v3" not in [key for key, _ in index.search(vectors[3], top_k=49)]
+    remaining = [(key, vector) for key, vector in zip(keys, vectors) if key != "v3"]
+    expected = brute_force([key for key, _ in remaining], [vector for _, vector in remaining], vectors[3], 5)
+    assert [key for key, _ in index.search(vectors[3], top_k=5)] == [key for key, _ in expected]
+
+
+def test_empty_index_and_dimension_mismatch():
+    index = VectorIndex()
+    assert index.search([1.0, 0.0]) == []
+
+    index.add("a", [1.0, 0.0, 0.0])
+    assert index.search([1.0, 0.0, 0.0], top_k=0) == []
+    assert index.search([1.0, 0.0, 0.0], top_k=5) == [("a", pytest.approx(1.0))]
+    with pytest.raises(ValueError):
+        index.add("b", [1.0, 0.0])
+    with pytest.raises(ValueError):
+        index.search([1.0, 0.0])
@@ -0,0 +1,94 @@
+import glob
+import os
+
+import numpy as np
+import pytest
+
+from backend.services.vector_index import VectorIndex
+from backend.services.vector_snapshot import MappedVectorIndex, quantize, save_snapshot
+
+
+def random_matrix(count=200, dimensions=32, seed=0):
+    return VectorIndex.normalize(np.random.default_rng(seed).normal(size=(count, dimensions)))
+
+
+def snapshot_size(path):
+    return sum(os.path.getsize(name) for name in glob.glob(f"{path}-*.npy"))
+
+
+@pytest.mark.parametrize("quantization", ["float32", "float16", "int8"])
+def test_round_trip(tmp_path, quantization):
+    matrix = random_matrix()
+    keys = [f"k{i}" for i in range(len(matrix))]
+    path = str(tmp_path / "vectors")
+    manifest = save_snapshot(path, keys, matrix, quantization, {"model": "m"})
+
+    index = MappedVectorIndex(path, manifest)
+    assert len(index) == 200 and index.keys() == keys and "k7" in index
+    loaded_keys, loaded = index.vectors()
+    assert loaded_keys == keys
+    assert np.allclose(loaded, matrix, atol=0.02)
+    assert index.search(matrix[7], top_k=1)[0][0] == "k7"
+
+
+def test_quantized_snapshots_are_smaller(tmp_path):
+    matrix = random_matrix(count=500, dimensions=128)
+    keys = [f"k{i}" for i in range(len(matrix))]
+    sizes = {}
+    for quantization in ("float32", "float16", "int8"):
+        path = str(tmp_path / quantization)
+        save_snapshot(path, keys, matrix, quantization)
+        sizes[quantization] = snapshot_size(path)
+    assert sizes["float16"] < 0.55 * sizes["float32"]
+    assert sizes["int8"] < 0.3 * sizes["float32"]
+
+
+def test_int8_scales_reproduce_the_vectors():
+    matrix = random_matrix()
+    codes, scales = quantize(matrix, "int8")
+    assert codes.dtype == np.int8 and scales.shape == (len(matrix),)
+    assert np.all(np.abs(codes).max(axis=1) == 127)
+    dequantized = codes.astype(np.float32) * scales[:, None]
+    assert np.abs(dequantized - matrix).max() <= scales.max() / 2 + 1e-6
+    # Quantizar os vetores dequantizados reproduz os mesmos códigos
+    assert np.array_equal(quantize(dequantized, "int8")[0], codes)
+
+
+def test_int8_rescores_candidates_with_exact_vectors(tmp_path):
+    matrix = random_matrix()
+    keys = [f"k{i}" for i in range(len(matrix))]
+    path = str(tmp_path / "vectors")
+    manifest = save_snapshot(path, keys, matrix, "int8")
+    requested = []
+
+    def exact_vectors(candidate_keys):
+        requested.append(len(candidate_keys))
+        return {key: matrix[int(key[1:])] for key in candidate_keys}
+
+    index = MappedVectorIndex(path, manifest, rescore_factor=4, exact_vectors=exact_vectors)
+    query = random_matrix(count=1, seed=1)[0]
+    results = index.search(query, top_k=5)
+
+    assert requested == [20]
+    expected = sorted(((key, float(vector @ query)) for key, vector in zip(keys, matrix)),
+                      key=lambda item: item[1], reverse=True)[:5]
+    assert [key for key, _ in results] == [key for key, _ in expected]
+    assert np.allclose([score for _, score in results], [score for _, score in expected], atol=1e-5)
+
+
+def test_removed_and_replaced_vectors_are_masked(tmp_path):
+    matrix = random_matrix()
+    keys = [f"k{i}" for i in range(len(matrix))]
+    path = str(tmp_path / "vectors")
+    index = MappedVectorIndex(path, save_snapshot(path, keys, matrix, "float16"))
+
+    assert index.remove("k7") and not index.remove("k7")
+    assert "k7" not in index and len(index) == 199
+    assert all(key != "k7" for key, _ in index.search(matrix[7], top_k=10))
+
+    # Substituído: o vetor novo (em memória) vale no lugar do snapshot
+    index.add("k8", matrix[9])
+    assert len(index) == 199 and index.pending_changes == 3
+    assert {key for key, _ in index.search(matrix[9], top_k=2)} == {"k8", "k9"}
+    vector_keys, _ = index.vectors()
+    assert vector_keys.count("k8") == 1 and "k7" not in vector_keys
@@ -0,0 +1,53 @@
+import asyncio
+import threading
+
+from backend.services.warmup import Warmup
+
+
+class ControlledWarmup(Warmup):
+    """Warmup cujo índice só fica pronto quando o teste libera"""
+
+    def __init__(self):
+        super().__init__(wait_timeout=5)
+        self.release = threading.Event()
+
+    def _build(self):
+        self.stage = "indexing"
+        self._report_progress(3, 10, 42)
+        self.release.wait(5)
+        return object()
+
+
+def test_waiting_requests_do_not_hold_executor_threads():
+    warmup = ControlledWarmup()
+
+    async def main():
+        threads_before = threading.active_count()
+        waiters = [asyncio.ensure_future(warmup.await_ready(5)) for _ in range(50)]
+        await asyncio.sleep(0.05)
+        # Nenhuma thread do executor por requisição esperando
+        assert threading.active_count() <= threads_before + 1
+        assert not any(waiter.done() for waiter in waiters)
+        warmup.release.set()
+        return await asyncio.gather(*waiters)
+
+    assert asyncio.run(main()) == [True] * 50
+
+
+def test_await_ready_times_out_while_warming():
+    warmup = ControlledWarmup()
+    try:
+        assert asyncio.run(warmup.await_ready(0.05)) is False
+    finally:
+        warmup.release.set()
+
+
+def test_progress_reports_indexed_counts_while_warming():
+    warmup = ControlledWarmup()
+    warmup.start()
+    try:
+        progress = warmup.progress()
+        assert progress["status"] == "warming"
+        assert (progress["documents"], progress["documents_total"], progress["vectors"]) == (3, 10, 42)
+    finally:
+        warmup.release.set()